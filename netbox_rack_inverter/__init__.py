@@ -25,5 +25,40 @@ class RackInverterConfig(PluginConfig):
     base_url = "netbox_rack_inverter"
     min_version = "4.5.0"
     max_version = "4.5.99"
+    graphql_schema = "graphql.schema.schema"
+    default_settings = {
+        # "pessimistic" locks the rack and every affected row for the whole
+        # toggle; "optimistic" plans without locks and applies with
+        # conditional updates, retrying on conflict.
+        "concurrency_mode": "pessimistic",
+        "optimistic_retries": 3,
+        # Dotted paths of metrics sinks receiving per-phase timings, e.g.
+        # "netbox_rack_inverter.metrics.LoggingSink".
+        "metrics_sinks": [],
+        # Fraction (0.0-1.0) of toggles, undos and button renders to run under
+        # cProfile. Profiles slower than profile_min_duration seconds are kept
+        # in profile_dir (default: a directory under the system temp dir).
+        "profile_sample_rate": 0.0,
+        "profile_min_duration": 0.0,
+        "profile_dir": "",
+        "profile_max_files": 100,
+        # Seconds to cache the rack button's permission state; 0 disables it.
+        "button_cache_timeout": 300,
+        # Database alias (e.g. a replica) for read-only queries: permission
+        # diagnostics, eligibility, previews, exports and toggle history.
+        # Empty uses the default routing.
+        "read_database": "",
+        # Seconds a toggle, undo or plan apply waits for another operation
+        # on the same rack to finish before giving up; 0 fails at once.
+        "rack_lock_timeout": 0,
+        # "full" saves each moved device and reservation with a full NetBox
+        # changelog snapshot; "fields" writes them set-based and records only
+        # the changed position or units (no event rules or webhooks).
+        "changelog_snapshots": "full",
+    }
+
+    def ready(self):
+        super().ready()
+        from . import signals  # noqa: F401
 
 config = RackInverterConfig
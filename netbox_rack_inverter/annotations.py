@@ -0,0 +1,122 @@
+"""
+Rack queryset annotations describing what a toggle would find.
+"""
+
+from decimal import Decimal
+
+from dcim.models import Device, RackReservation
+from django.db.models import (
+    BooleanField,
+    Case,
+    Count,
+    DecimalField,
+    Exists,
+    ExpressionWrapper,
+    F,
+    Func,
+    IntegerField,
+    Max,
+    Min,
+    OuterRef,
+    PositiveSmallIntegerField,
+    Q,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, Greatest, Least
+
+__all__ = (
+    "annotate_occupied_units",
+    "annotate_toggle_eligibility",
+)
+
+
+class _ArrayMin(Func):
+    template = "(SELECT MIN(unit) FROM unnest(%(expressions)s) AS unit)"
+    output_field = PositiveSmallIntegerField()
+
+
+class _ArrayMax(Func):
+    template = "(SELECT MAX(unit) FROM unnest(%(expressions)s) AS unit)"
+    output_field = PositiveSmallIntegerField()
+
+
+class _ReservedUnitBound(Func):
+    # Aggregates over every unit of every reservation in the rack.
+    template = (
+        f"(SELECT %(function)s(unit) FROM {RackReservation._meta.db_table} AS reservation, "
+        "unnest(reservation.units) AS unit WHERE reservation.rack_id = %(expressions)s)"
+    )
+    output_field = DecimalField(max_digits=5, decimal_places=1)
+
+
+def _device_top_unit():
+    # Mirror plan_rack_toggle(), which treats missing or sub-unit heights as 1U.
+    return ExpressionWrapper(
+        F("position") + Greatest(Coalesce(F("device_type__u_height"), Value(Decimal(1))), Value(Decimal(1))) - 1,
+        output_field=DecimalField(max_digits=5, decimal_places=1),
+    )
+
+
+def _count_per_rack(queryset):
+    counts = queryset.order_by().values("rack").annotate(count=Count("pk")).values("count")
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def annotate_toggle_eligibility(queryset):
+    """
+    Annotate a Rack queryset with what a toggle would find, in the same
+    query:
+
+    - `mounted_device_count` and `reservation_count`
+    - `has_invalid_devices` and `has_invalid_reservations`, set when an
+      object occupies units outside the rack (the condition that makes
+      plan_rack_toggle() raise RackUnitRangeError)
+    - `toggle_eligible`, set when neither flag is
+    """
+    top_unit = OuterRef("starting_unit") + OuterRef("u_height") - 1
+    mounted_devices = Device.objects.filter(rack=OuterRef("pk"), position__isnull=False)
+    reservations = RackReservation.objects.filter(rack=OuterRef("pk"))
+
+    invalid_devices = mounted_devices.alias(top=_device_top_unit()).filter(
+        Q(position__lt=OuterRef("starting_unit")) | Q(top__gt=top_unit)
+    )
+    invalid_reservations = reservations.alias(
+        min_unit=_ArrayMin(F("units")),
+        max_unit=_ArrayMax(F("units")),
+    ).filter(Q(min_unit__lt=OuterRef("starting_unit")) | Q(max_unit__gt=top_unit))
+
+    return queryset.annotate(
+        mounted_device_count=_count_per_rack(mounted_devices),
+        reservation_count=_count_per_rack(reservations),
+        has_invalid_devices=Exists(invalid_devices),
+        has_invalid_reservations=Exists(invalid_reservations),
+        toggle_eligible=Case(
+            When(Q(has_invalid_devices=True) | Q(has_invalid_reservations=True), then=Value(False)),
+            default=Value(True),
+            output_field=BooleanField(),
+        ),
+    )
+
+
+def annotate_occupied_units(queryset):
+    """
+    Annotate a Rack queryset with `occupied_unit_min` and `occupied_unit_max`,
+    the lowest and highest units taken by mounted devices or reservations.
+    Both are None for an empty rack.
+    """
+    mounted_devices = Device.objects.filter(rack=OuterRef("pk"), position__isnull=False).order_by().values("rack")
+    unit_field = DecimalField(max_digits=5, decimal_places=1)
+    return queryset.annotate(
+        occupied_unit_min=Least(
+            Subquery(mounted_devices.annotate(unit=Min("position")).values("unit"), output_field=unit_field),
+            _ReservedUnitBound(F("pk"), function="MIN"),
+            output_field=unit_field,
+        ),
+        occupied_unit_max=Greatest(
+            Subquery(mounted_devices.annotate(unit=Max(_device_top_unit())).values("unit"), output_field=unit_field),
+            _ReservedUnitBound(F("pk"), function="MAX"),
+            output_field=unit_field,
+        ),
+    )
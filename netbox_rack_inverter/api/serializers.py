@@ -1,3 +1,72 @@
 """
-No plugin REST API serializers are defined.
+REST API serializers for Netbox Rack Inverter.
 """
+
+from dcim.api.serializers import RackSerializer
+from netbox.api.serializers import BaseModelSerializer
+from rest_framework import serializers
+from users.api.serializers import UserSerializer
+
+from ..models import IDEMPOTENCY_KEY_MAX_LENGTH, RackEligibility, RackToggle, validate_idempotency_key
+
+
+class RackToggleSerializer(BaseModelSerializer):
+    rack = RackSerializer(nested=True, read_only=True)
+    user = UserSerializer(nested=True, read_only=True)
+
+    class Meta:
+        model = RackToggle
+        fields = (
+            "id",
+            "url",
+            "display_url",
+            "display",
+            "rack",
+            "user",
+            "created",
+            "duration",
+            "desc_units",
+            "undone",
+            "idempotency_key",
+            "device_positions",
+            "reservation_units",
+        )
+        brief_fields = ("id", "url", "display", "rack", "desc_units", "undone")
+
+
+class RackEligibilitySerializer(BaseModelSerializer):
+    rack = RackSerializer(nested=True, read_only=True)
+
+    class Meta:
+        model = RackEligibility
+        fields = (
+            "id",
+            "url",
+            "display",
+            "rack",
+            "mounted_device_count",
+            "reservation_count",
+            "has_invalid_devices",
+            "has_invalid_reservations",
+            "toggle_eligible",
+            "occupied_unit_min",
+            "occupied_unit_max",
+            "last_refreshed",
+        )
+        brief_fields = ("id", "url", "display", "rack", "toggle_eligible")
+
+
+class RackToggleUndoSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+
+
+class RackToggleRequestSerializer(serializers.Serializer):
+    desc_units = serializers.BooleanField(required=False, allow_null=True, default=None)
+    idempotency_key = serializers.CharField(
+        max_length=IDEMPOTENCY_KEY_MAX_LENGTH,
+        required=False,
+        allow_blank=True,
+        default="",
+        validators=[validate_idempotency_key],
+    )
+    optimistic = serializers.BooleanField(required=False, allow_null=True, default=None)
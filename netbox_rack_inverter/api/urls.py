@@ -8,7 +8,25 @@ For Django REST Framework routers, see:
 https://www.django-rest-framework.org/api-guide/routers/
 """
 
+from django.urls import path
+from netbox.api.routers import NetBoxRouter
+
+from . import views
+
 app_name = "netbox_rack_inverter"
 
-urlpatterns = []
+router = NetBoxRouter()
+router.register("rack-toggles", views.RackToggleViewSet)
+router.register("rack-eligibility", views.RackEligibilityViewSet)
 
+urlpatterns = [
+    path(
+        "racks/<int:pk>/toggle-units-order/",
+        views.RackToggleUnitsOrderView.as_view(),
+        name="rack_toggle_units_order",
+    ),
+    path("toggle-plans/apply/", views.RackTogglePlanApplyView.as_view(), name="toggle_plan_apply"),
+    path("rack-toggles/undo/", views.RackToggleBulkUndoView.as_view(), name="racktoggle_bulk_undo"),
+    path("rack-toggles/<int:pk>/undo/", views.RackToggleUndoView.as_view(), name="racktoggle_undo"),
+    *router.urls,
+]
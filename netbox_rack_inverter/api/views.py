@@ -1,4 +1,206 @@
 """
-No plugin REST API viewsets are defined.
+REST API views for Netbox Rack Inverter.
 """
 
+from dcim.api.serializers import RackSerializer
+from dcim.models import Rack
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from netbox.api.viewsets import NetBoxReadOnlyModelViewSet
+from rest_framework import status
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import BasePermission
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from users.models import Token
+
+from .. import filtersets, metrics, routing
+from ..models import RackEligibility, RackToggle, validate_idempotency_key
+from ..undo import undo_rack_toggle
+from ..utils import RackLayoutConflict, RackUnitRangeError, toggle_rack_units_order
+from .serializers import (
+    RackEligibilitySerializer,
+    RackToggleRequestSerializer,
+    RackToggleSerializer,
+    RackToggleUndoSerializer,
+)
+
+
+class IsAuthenticatedWithWriteToken(BasePermission):
+    """
+    Require an authenticated user and, for token auth, a write-enabled token.
+    Object permissions are enforced by the operation itself.
+    """
+
+    def has_permission(self, request, view):
+        if isinstance(request.auth, Token) and not request.auth.write_enabled:
+            return False
+        return bool(request.user and request.user.is_authenticated)
+
+
+class RackToggleViewSet(NetBoxReadOnlyModelViewSet):
+    queryset = RackToggle.objects.select_related("rack", "user")
+    serializer_class = RackToggleSerializer
+    filterset_class = filtersets.RackToggleFilterSet
+
+    def get_queryset(self):
+        return routing.for_read(super().get_queryset())
+
+
+class RackEligibilityViewSet(NetBoxReadOnlyModelViewSet):
+    queryset = RackEligibility.objects.select_related("rack")
+    serializer_class = RackEligibilitySerializer
+    filterset_class = filtersets.RackEligibilityFilterSet
+
+    def get_queryset(self):
+        return routing.for_read(super().get_queryset())
+
+
+class RackToggleUnitsOrderView(APIView):
+    """
+    Switch a rack's unit order while preserving physical placement.
+
+    Pass `desc_units` to request a specific orientation; a request for the
+    current orientation is a no-op. Pass `idempotency_key` (or an
+    `Idempotency-Key` header) to make retries return the original toggle.
+    Pass `optimistic` to override the `concurrency_mode` setting.
+    """
+
+    permission_classes = [IsAuthenticatedWithWriteToken]
+
+    def post(self, request, pk):
+        rack = get_object_or_404(Rack, pk=pk)
+        serializer = RackToggleRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        idempotency_key = serializer.validated_data["idempotency_key"] or request.headers.get("Idempotency-Key", "")
+        if idempotency_key:
+            # The header bypasses the serializer; reject it before anything is written.
+            try:
+                validate_idempotency_key(idempotency_key)
+            except DjangoValidationError as e:
+                return Response({"idempotency_key": e.messages}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            with metrics.track("toggle", source="api", rack=rack.pk) as operation:
+                toggle, created = toggle_rack_units_order(
+                    rack,
+                    user=request.user,
+                    desc_units=serializer.validated_data["desc_units"],
+                    idempotency_key=idempotency_key,
+                    request_id=getattr(request, "id", None),
+                    optimistic=serializer.validated_data["optimistic"],
+                )
+                operation.outcome = "toggled" if created else "noop"
+        except (RackUnitRangeError, RackLayoutConflict) as e:
+            return Response({"detail": str(e)}, status=status.HTTP_409_CONFLICT)
+
+        if created:
+            rack.desc_units = toggle.desc_units
+        context = {"request": request}
+        return Response(
+            {
+                "rack": RackSerializer(rack, nested=True, context=context).data,
+                "desc_units": rack.desc_units,
+                "changed": created,
+                "toggle": RackToggleSerializer(toggle, context=context).data if toggle else None,
+            },
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+
+class RackToggleUndoView(APIView):
+    """
+    Undo a single recorded rack toggle.
+    """
+
+    permission_classes = [IsAuthenticatedWithWriteToken]
+
+    def post(self, request, pk):
+        toggle = get_object_or_404(RackToggle.objects.select_related("rack"), pk=pk)
+        if not request.user.has_perm("dcim.view_rack", toggle.rack):
+            raise PermissionDenied("You do not have permission to view this rack.")
+
+        try:
+            with metrics.track("undo", source="api", rack=toggle.rack_id):
+                toggle = undo_rack_toggle(toggle, user=request.user, request_id=getattr(request, "id", None))
+        except RackLayoutConflict as e:
+            return Response({"detail": str(e)}, status=status.HTTP_409_CONFLICT)
+
+        return Response(RackToggleSerializer(toggle, context={"request": request}).data)
+
+
+class RackToggleBulkUndoView(APIView):
+    """
+    Undo many recorded rack toggles in one request. Accepts a list of objects
+    with an `id` attribute; either every toggle is undone or none are.
+    """
+
+    permission_classes = [IsAuthenticatedWithWriteToken]
+
+    def post(self, request):
+        serializer = RackToggleUndoSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        pks = [item["id"] for item in serializer.validated_data]
+        toggles = {toggle.pk: toggle for toggle in RackToggle.objects.filter(pk__in=pks).select_related("rack")}
+
+        missing = sorted(set(pks) - set(toggles))
+        if missing:
+            return Response(
+                {"detail": f"Unknown rack toggle ID(s): {', '.join(map(str, missing))}"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        undone = []
+        try:
+            with metrics.track("bulk_undo", source="api"), transaction.atomic():
+                # Undo the newest toggles first so stacked toggles of the same
+                # rack unwind in order.
+                for pk in sorted(toggles, reverse=True):
+                    toggle = toggles[pk]
+                    if not request.user.has_perm("dcim.view_rack", toggle.rack):
+                        raise PermissionDenied(f"You do not have permission to view rack {toggle.rack}.")
+                    undone.append(undo_rack_toggle(toggle, user=request.user, request_id=getattr(request, "id", None)))
+        except RackLayoutConflict as e:
+            return Response({"detail": f"Toggle {pk}: {e}"}, status=status.HTTP_409_CONFLICT)
+
+        return Response(RackToggleSerializer(undone, many=True, context={"request": request}).data)
+
+
+class RackTogglePlanApplyView(APIView):
+    """
+    Apply a plan file generated by `generate_rack_toggle_plan`. Each rack is
+    applied in its own transaction; racks whose layout changed since the
+    plan was made are reported as conflicts and left untouched.
+    """
+
+    permission_classes = [IsAuthenticatedWithWriteToken]
+
+    def post(self, request):
+        # Imported on first use to keep worker boot and URLconf loading
+        # cheap; only this view needs it.
+        from .. import plans
+
+        try:
+            plan = plans.load_plan(request.data)
+        except plans.PlanFileError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = plans.apply_plan(plan, user=request.user, request_id=getattr(request, "id", None))
+        context = {"request": request}
+        return Response(
+            {
+                "id": plan["id"],
+                "results": [
+                    {
+                        "rack_id": result.rack_id,
+                        "status": result.status,
+                        "error": result.error,
+                        "toggle": RackToggleSerializer(result.toggle, nested=True, context=context).data
+                        if result.toggle
+                        else None,
+                    }
+                    for result in results
+                ],
+            }
+        )
@@ -0,0 +1,224 @@
+"""
+Caches of the rack button's permission state and of device type heights.
+
+Entries are keyed on a hash of the user's relevant object permissions, the
+rack, a per-rack layout version and a global permission generation. Signal
+handlers in `signals` bump the rack version when a device, reservation,
+rack or toggle changes, and the permission generation when an
+ObjectPermission changes, so stale entries are simply never read again and
+expire on their own.
+
+Set-based writes bypass signals and must call `invalidate_rack()` themselves.
+
+Rendered button fragments are cached too, keyed on everything the template
+reads. They are rendered with a placeholder CSRF token that is swapped for
+the requesting user's token when served.
+
+Device type heights, the only part of a device type that toggle planning
+needs, are kept in a process-local dict. It is cleared whenever a shared
+generation key changes, which `signals` bumps when a device type is saved or
+deleted.
+"""
+
+import hashlib
+import json
+import threading
+import uuid
+
+from dcim.models import DeviceType
+from django.core.cache import cache
+from django.db import transaction
+from netbox.authentication import ObjectPermissionBackend
+from netbox.plugins import get_plugin_config
+
+from . import __version__
+
+__all__ = (
+    "CSRF_TOKEN_PLACEHOLDER",
+    "get_button_state",
+    "get_device_type_heights",
+    "get_rendered_fragment",
+    "get_permission_set_hash",
+    "invalidate_device_types",
+    "invalidate_permissions",
+    "invalidate_rack",
+)
+
+KEY_PREFIX = "netbox_rack_inverter"
+CSRF_TOKEN_PLACEHOLDER = "netbox-rack-inverter-csrf-token-placeholder"
+PERMISSION_GENERATION_KEY = f"{KEY_PREFIX}:permission-generation"
+DEVICE_TYPE_GENERATION_KEY = f"{KEY_PREFIX}:device-type-generation"
+
+# Permissions that decide whether the toggle button is enabled.
+BUTTON_PERMISSIONS = (
+    "dcim.view_rack",
+    "dcim.change_rack",
+    "dcim.change_device",
+    "dcim.change_rackreservation",
+)
+
+
+def _rack_version_key(rack_pk):
+    return f"{KEY_PREFIX}:rack-version:{rack_pk}"
+
+
+def get_permission_set_hash(user):
+    """
+    Return a hash identifying the user's button-relevant object permissions.
+
+    Users with identical permissions share cache entries, unless their
+    constraints reference the `$user` token.
+    """
+    if not user.is_active:
+        return "inactive"
+    if user.is_superuser:
+        return "superuser"
+
+    # The backend memoizes permissions on the user object, so this reuses the
+    # query already made by the view permission check.
+    permissions = ObjectPermissionBackend().get_all_permissions(user) or {}
+    relevant = {name: permissions[name] for name in BUTTON_PERMISSIONS if name in permissions}
+    serialized = json.dumps(relevant, sort_keys=True, default=str)
+    if "$user" in serialized:
+        serialized = f"{user.pk}:{serialized}"
+    return hashlib.sha256(serialized.encode()).hexdigest()[:32]
+
+
+def _get_versions(rack_pk):
+    rack_version_key = _rack_version_key(rack_pk)
+    versions = cache.get_many([rack_version_key, PERMISSION_GENERATION_KEY])
+    rack_version = versions.get(rack_version_key)
+    if rack_version is None:
+        rack_version = uuid.uuid4().hex
+        # Another worker may have initialized the version concurrently.
+        if not cache.add(rack_version_key, rack_version, None):
+            rack_version = cache.get(rack_version_key, rack_version)
+    return rack_version, versions.get(PERMISSION_GENERATION_KEY, "0")
+
+
+def get_button_state(user, rack, compute):
+    """
+    Return the cached button state for `user` and `rack`, calling `compute()`
+    to build it on a miss. Caching is disabled when `button_cache_timeout`
+    is 0.
+    """
+    timeout = get_plugin_config("netbox_rack_inverter", "button_cache_timeout")
+    if not timeout:
+        return compute()
+
+    rack_version, permission_generation = _get_versions(rack.pk)
+    # last_updated guards against version keys outliving a database restore.
+    rack_updated = rack.last_updated.timestamp() if rack.last_updated else ""
+    key = ":".join(
+        (
+            f"{KEY_PREFIX}:button",
+            get_permission_set_hash(user),
+            str(rack.pk),
+            f"{rack_updated}",
+            rack_version,
+            permission_generation,
+        )
+    )
+    state = cache.get(key)
+    if state is None:
+        state = compute()
+        cache.set(key, state, timeout)
+    return state
+
+
+def get_rendered_fragment(template_name, context, render):
+    """
+    Return the cached HTML for `template_name` rendered with `context`,
+    calling `render()` on a miss. `context` must hold every value the
+    template reads, and must not hold a CSRF token.
+    """
+    timeout = get_plugin_config("netbox_rack_inverter", "button_cache_timeout")
+    if not timeout:
+        return render()
+
+    serialized = json.dumps([template_name, context], sort_keys=True, default=str)
+    # The plugin version keeps fragments from outliving template changes.
+    key = f"{KEY_PREFIX}:fragment:{__version__}:{hashlib.sha256(serialized.encode()).hexdigest()}"
+    html = cache.get(key)
+    if html is None:
+        html = render()
+        cache.set(key, html, timeout)
+    return html
+
+
+class _DeviceTypeHeights:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.generation = None
+        self.heights = {}
+
+    def clear(self):
+        with self.lock:
+            self.generation = None
+            self.heights = {}
+
+
+_device_type_heights = _DeviceTypeHeights()
+
+
+def get_device_type_heights(device_type_pks):
+    """
+    Return {device type pk: u_height} for the given device types, loading
+    only those not cached in this process yet.
+    """
+    # Read the generation before the database, so heights loaded while a
+    # change commits are stored under the old generation and dropped.
+    generation = cache.get(DEVICE_TYPE_GENERATION_KEY, "0")
+    local = _device_type_heights
+    with local.lock:
+        if local.generation != generation:
+            local.generation = generation
+            local.heights = {}
+        heights = local.heights
+
+    device_type_pks = set(device_type_pks)
+    result = {pk: heights[pk] for pk in device_type_pks if pk in heights}
+    if missing := device_type_pks - result.keys():
+        # Always the default database: a lagging replica could cache a
+        # height that the generation has already invalidated.
+        loaded = dict(DeviceType.objects.filter(pk__in=missing).values_list("pk", "u_height"))
+        with local.lock:
+            if local.generation == generation:
+                local.heights.update(loaded)
+        result.update(loaded)
+    return result
+
+
+def _bump(key):
+    cache.set(key, uuid.uuid4().hex, None)
+
+
+def _bump_now_and_on_commit(key):
+    # Bump immediately so this transaction's own reads miss, and again on
+    # commit so entries computed by other workers from pre-commit data are
+    # discarded too.
+    _bump(key)
+    transaction.on_commit(lambda: _bump(key))
+
+
+def invalidate_rack(rack_pk):
+    """
+    Invalidate cached button state for a rack.
+    """
+    if rack_pk is not None:
+        _bump_now_and_on_commit(_rack_version_key(rack_pk))
+
+
+def invalidate_device_types():
+    """
+    Invalidate cached device type heights in every process.
+    """
+    _device_type_heights.clear()
+    _bump_now_and_on_commit(DEVICE_TYPE_GENERATION_KEY)
+
+
+def invalidate_permissions():
+    """
+    Invalidate all cached button state.
+    """
+    _bump_now_and_on_commit(PERMISSION_GENERATION_KEY)
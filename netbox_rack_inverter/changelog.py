@@ -0,0 +1,165 @@
+"""
+Set-based writes of rack toggles and the changelog entries recorded for them.
+"""
+
+from core.choices import ObjectChangeActionChoices
+from core.models import ObjectChange
+from dcim.models import Device, RackReservation
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.fields import ArrayField
+from django.db.models import Case, DecimalField, PositiveSmallIntegerField, Q, Value, When
+from django.utils import timezone
+
+from . import eligibility, metrics
+from .exceptions import RackLayoutConflict
+from .remap import format_unit
+
+__all__ = (
+    "conditional_update",
+    "record_field_changes",
+    "write_changed_fields",
+    "write_snapshotted_objects",
+)
+
+
+def record_field_changes(model, changes, *, field, user, request_id, object_reprs):
+    """
+    Write changelog entries for a set-based update of a single field.
+
+    `changes` is an iterable of (pk, value before, value after). Only the
+    changed field is recorded, which is enough for NetBox to render the diff.
+    """
+    content_type = ContentType.objects.get_for_model(model)
+    ObjectChange.objects.bulk_create(
+        ObjectChange(
+            user=user,
+            user_name=user.username,
+            request_id=request_id,
+            action=ObjectChangeActionChoices.ACTION_UPDATE,
+            changed_object_type=content_type,
+            changed_object_id=pk,
+            object_repr=object_reprs.get(pk, f"{model._meta.verbose_name} {pk}")[:200],
+            prechange_data={field: before},
+            postchange_data={field: after},
+        )
+        for pk, before, after in changes
+    )
+
+
+def conditional_update(model, field, rows, *, output_field, rack_id, clear_first=False):
+    """
+    Set `field` on every row to a new value, but only if each row is still in
+    rack `rack_id` and holds its expected value. Raises RackLayoutConflict if
+    any row has drifted.
+
+    `rows` is a list of (pk, expected value, new value).
+    """
+    expected = Q()
+    for pk, current_value, _ in rows:
+        expected |= Q(pk=pk, **{field: current_value})
+    queryset = model.objects.filter(expected, rack_id=rack_id)
+
+    if clear_first:
+        # Clear the field before assigning new values so unique constraints
+        # such as (rack, position, face) never see two rows swap in place.
+        matched = queryset.update(**{field: None})
+        queryset = model.objects.filter(pk__in=[pk for pk, _, _ in rows], rack_id=rack_id)
+        if matched != len(rows):
+            raise RackLayoutConflict(
+                f"{matched} of {len(rows)} {model._meta.verbose_name_plural} still match the recorded layout."
+            )
+
+    matched = queryset.update(
+        **{
+            field: Case(
+                *(When(pk=pk, then=Value(new_value, output_field=output_field)) for pk, _, new_value in rows),
+                output_field=output_field,
+            ),
+            "last_updated": timezone.now(),
+        }
+    )
+    if matched != len(rows):
+        raise RackLayoutConflict(
+            f"{matched} of {len(rows)} {model._meta.verbose_name_plural} still match the recorded layout."
+        )
+
+
+def write_snapshotted_objects(device_changes, reservation_changes):
+    # Load, snapshot and save() each moved object, so NetBox records full
+    # changelog entries and runs event rules.
+    remapped_device_positions = {pk: after for pk, _, after in device_changes}
+    remapped_reservation_units = {pk: after for pk, _, after in reservation_changes}
+
+    with metrics.phase("read"):
+        devices = list(Device.objects.filter(pk__in=remapped_device_positions).order_by("pk"))
+        reservations = list(RackReservation.objects.filter(pk__in=remapped_reservation_units).order_by("pk"))
+
+    with metrics.phase("changelog"):
+        for device in devices:
+            device.snapshot()
+        for reservation in reservations:
+            reservation.snapshot()
+
+    with metrics.phase("write"):
+        if devices:
+            for device in devices:
+                device.position = None
+            Device.objects.bulk_update(devices, ["position"])
+
+            for device in devices:
+                device.position = remapped_device_positions[device.id]
+                device.save(update_fields=["position"])
+
+        for reservation in reservations:
+            reservation.units = remapped_reservation_units[reservation.id]
+            reservation.save(update_fields=["units"])
+
+
+def write_changed_fields(rack, device_changes, reservation_changes, *, user, request_id):
+    # The "fields" changelog mode: set-based writes of the moved objects'
+    # position or units, with changelog entries holding only that field.
+    # The rows are locked, so the conditional updates always match.
+    with metrics.phase("write"):
+        if device_changes:
+            conditional_update(
+                Device,
+                "position",
+                device_changes,
+                output_field=DecimalField(max_digits=4, decimal_places=1),
+                rack_id=rack.pk,
+                clear_first=True,
+            )
+        if reservation_changes:
+            conditional_update(
+                RackReservation,
+                "units",
+                reservation_changes,
+                output_field=ArrayField(base_field=PositiveSmallIntegerField()),
+                rack_id=rack.pk,
+            )
+
+    with metrics.phase("changelog"):
+        if device_changes:
+            device_pks = [pk for pk, _, _ in device_changes]
+            record_field_changes(
+                Device,
+                [(pk, format_unit(before), format_unit(after)) for pk, before, after in device_changes],
+                field="position",
+                user=user,
+                request_id=request_id,
+                object_reprs={
+                    pk: name for pk, name in Device.objects.filter(pk__in=device_pks).values_list("pk", "name") if name
+                },
+            )
+        if reservation_changes:
+            record_field_changes(
+                RackReservation,
+                reservation_changes,
+                field="units",
+                user=user,
+                request_id=request_id,
+                object_reprs=dict.fromkeys([pk for pk, _, _ in reservation_changes], f"Reservation for rack {rack}"),
+            )
+
+    # Set-based writes bypass the signals that maintain eligibility.
+    eligibility.schedule_refresh(rack.pk)
@@ -0,0 +1,108 @@
+"""
+Maintenance of the materialized RackEligibility table.
+
+Signal handlers call `schedule_refresh()` for every rack whose devices,
+reservations or geometry changed. Racks are collected per thread and
+refreshed together once the surrounding transaction commits, so a bulk edit
+touching hundreds of devices in one rack refreshes its row once.
+
+Set-based writes bypass signals and must call `schedule_refresh()`
+themselves.
+
+The eligibility list view, its filter set, plan exports and plan generation
+read these rows instead of recomputing eligibility from devices and
+reservations.
+"""
+
+import threading
+
+from dcim.models import Rack
+from django.db import transaction
+from django.db.models import F
+
+from .annotations import annotate_occupied_units, annotate_toggle_eligibility
+from .models import RackEligibility
+
+__all__ = (
+    "ELIGIBILITY_FIELDS",
+    "annotate_materialized_eligibility",
+    "refresh_rack_eligibility",
+    "schedule_refresh",
+)
+
+ELIGIBILITY_FIELDS = (
+    "mounted_device_count",
+    "reservation_count",
+    "has_invalid_devices",
+    "has_invalid_reservations",
+    "toggle_eligible",
+    "occupied_unit_min",
+    "occupied_unit_max",
+)
+
+_pending = threading.local()
+
+
+def annotate_materialized_eligibility(queryset):
+    """
+    Annotate a Rack queryset with the ELIGIBILITY_FIELDS of each rack's
+    RackEligibility row, read with a single join. The values are None for a
+    rack without a row, which `rebuild_rack_eligibility` creates.
+    """
+    return queryset.annotate(**{name: F(f"toggle_eligibility__{name}") for name in ELIGIBILITY_FIELDS})
+
+
+def refresh_rack_eligibility(rack_pks=None, *, batch_size=1000):
+    """
+    Recompute the RackEligibility rows of the given racks, or of every rack
+    when `rack_pks` is None. Returns the number of rows written.
+    """
+    racks = annotate_occupied_units(annotate_toggle_eligibility(Rack.objects.order_by("pk")))
+    if rack_pks is not None:
+        racks = racks.filter(pk__in=rack_pks)
+
+    written = 0
+    batch = []
+    for values in racks.values("pk", *ELIGIBILITY_FIELDS).iterator(chunk_size=batch_size):
+        batch.append(RackEligibility(rack_id=values.pop("pk"), **values))
+        if len(batch) >= batch_size:
+            written += _upsert(batch)
+            batch = []
+    if batch:
+        written += _upsert(batch)
+    return written
+
+
+def _upsert(rows):
+    # List last_refreshed so updated rows pick up the new auto_now value.
+    RackEligibility.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["rack"],
+        update_fields=[*ELIGIBILITY_FIELDS, "last_refreshed"],
+    )
+    return len(rows)
+
+
+def _flush():
+    rack_pks = getattr(_pending, "rack_pks", None)
+    _pending.rack_pks = None
+    if rack_pks:
+        refresh_rack_eligibility(rack_pks)
+
+
+def schedule_refresh(*rack_pks):
+    """
+    Refresh the eligibility of the given racks once the current transaction
+    commits (immediately in autocommit mode).
+    """
+    rack_pks = {pk for pk in rack_pks if pk is not None}
+    if not rack_pks:
+        return
+    if getattr(_pending, "rack_pks", None) is None:
+        _pending.rack_pks = set()
+    _pending.rack_pks.update(rack_pks)
+    # Every call registers a callback; the first to run refreshes all pending
+    # racks and the rest find nothing left to do. Racks left pending by a
+    # rolled-back transaction are refreshed with the next commit.
+    transaction.on_commit(_flush)
@@ -0,0 +1,34 @@
+"""
+Exceptions raised by rack toggle operations.
+"""
+
+__all__ = (
+    "RackBusy",
+    "RackLayoutConflict",
+    "RackUnitRangeError",
+)
+
+
+class RackLayoutConflict(Exception):
+    """
+    The rack no longer matches the layout an operation was prepared against.
+    """
+
+
+class RackBusy(RackLayoutConflict):
+    """
+    Another operation of the plugin is changing the rack.
+    """
+
+
+class RackUnitRangeError(Exception):
+    """
+    One or more mounted objects occupy units outside the rack's unit range.
+    """
+
+    def __init__(self, message=None):
+        super().__init__(
+            message
+            or "Cannot switch rack unit order because one or more mounted objects have "
+            "positions outside the rack's unit range."
+        )
@@ -0,0 +1,149 @@
+"""
+Streaming export of rack toggle plans.
+
+Plans are computed on the fly for batches of racks and written out row by
+row, so memory use depends on the batch size rather than on the number of
+racks exported.
+"""
+
+import csv
+import json
+from itertools import batched
+
+from dcim.models import Device, Rack, RackReservation
+
+from .utils import RackUnitRangeError, plan_rack_toggle, read_rack_layouts
+
+__all__ = (
+    "EXPORT_FORMATS",
+    "PLAN_COLUMNS",
+    "iter_plan_rows",
+    "stream_plan",
+)
+
+PLAN_COLUMNS = (
+    "rack_id",
+    "rack",
+    "desc_units",
+    "target_desc_units",
+    "object_type",
+    "object_id",
+    "object_name",
+    "before",
+    "after",
+    "error",
+)
+
+
+def _restricted(queryset, user):
+    return queryset if user is None else queryset.restrict(user, "view")
+
+
+def iter_plan_rows(racks, *, user=None, batch_size=100):
+    """
+    Yield one row per device and reservation a toggle of each rack in `racks`
+    would rewrite, as dicts keyed by PLAN_COLUMNS. A rack that cannot be
+    toggled yields a single row holding the error.
+
+    When `user` is given, devices and reservations the user cannot view are
+    left out. Everything is read from the same database as `racks`. Racks
+    whose RackEligibility row marks them ineligible get their error row
+    without their devices and reservations being read.
+    """
+    rack_rows = (
+        racks.order_by("pk")
+        .values_list("pk", "name", "desc_units", "toggle_eligibility__toggle_eligible")
+        .iterator(chunk_size=batch_size)
+    )
+    for chunk in batched(rack_rows, batch_size):
+        planned = [pk for pk, _, _, eligible in chunk if eligible is not False]
+        layouts = read_rack_layouts(Rack.objects.using(racks.db).filter(pk__in=planned))
+        device_names = dict(
+            _restricted(Device.objects.using(racks.db).filter(rack_id__in=planned), user).values_list("pk", "name")
+        )
+        reservation_names = dict(
+            _restricted(RackReservation.objects.using(racks.db).filter(rack_id__in=planned), user).values_list(
+                "pk", "description"
+            )
+        )
+
+        for pk, name, desc_units, eligible in chunk:
+            row = {
+                "rack_id": pk,
+                "rack": name,
+                "desc_units": desc_units,
+                "target_desc_units": not desc_units,
+            }
+            if eligible is False:
+                yield {**dict.fromkeys(PLAN_COLUMNS), **row, "error": str(RackUnitRangeError())}
+                continue
+            if pk not in layouts:
+                # Deleted since the chunk was read.
+                continue
+            rack, devices, reservations = layouts[pk]
+            try:
+                device_positions, reservation_units = plan_rack_toggle(
+                    starting_unit=rack["starting_unit"] or 1,
+                    rack_u_height=rack["u_height"],
+                    devices=devices,
+                    reservations=reservations,
+                )
+            except RackUnitRangeError as e:
+                yield {**dict.fromkeys(PLAN_COLUMNS), **row, "error": str(e)}
+                continue
+
+            for object_type, changes, names in (
+                ("device", device_positions, device_names),
+                ("reservation", reservation_units, reservation_names),
+            ):
+                for pk, before, after in changes:
+                    if pk in names:
+                        yield {
+                            **row,
+                            "object_type": object_type,
+                            "object_id": pk,
+                            "object_name": names[pk],
+                            "before": before,
+                            "after": after,
+                            "error": None,
+                        }
+
+
+class _Echo:
+    # csv.writer only needs an object with write(); return the line instead
+    # of buffering it.
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if isinstance(value, list):
+        return ",".join(str(unit) for unit in value)
+    return "" if value is None else value
+
+
+def _iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(PLAN_COLUMNS)
+    for row in rows:
+        yield writer.writerow([_csv_value(row[column]) for column in PLAN_COLUMNS])
+
+
+def _iter_jsonl(rows):
+    for row in rows:
+        # Device positions are Decimals.
+        yield json.dumps(row, default=float) + "\n"
+
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", _iter_csv),
+    "jsonl": ("application/x-ndjson", _iter_jsonl),
+}
+
+
+def stream_plan(rows, export_format):
+    """
+    Serialize plan rows lazily. Raises KeyError for an unknown format.
+    """
+    _, serialize = EXPORT_FORMATS[export_format]
+    return serialize(rows)
@@ -1,3 +1,121 @@
 """
-No plugin model filtersets are defined.
+Filter sets for Netbox Rack Inverter.
 """
+
+import django_filters
+from dcim.filtersets import RackFilterSet
+from dcim.models import Rack, Site
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from netbox.filtersets import BaseFilterSet
+
+from .models import RackEligibility, RackToggle
+
+__all__ = (
+    "RackEligibilityFilterSet",
+    "RackToggleEligibilityFilterSet",
+    "RackToggleFilterSet",
+)
+
+
+class RackToggleEligibilityFilterSet(RackFilterSet):
+    """
+    The core rack filters plus filters on toggle eligibility, read from the
+    racks' RackEligibility rows.
+    """
+
+    toggle_eligible = django_filters.BooleanFilter(
+        method="filter_eligibility",
+        label="Toggle eligible",
+    )
+    has_invalid_devices = django_filters.BooleanFilter(
+        method="filter_eligibility",
+        label="Has out-of-range devices",
+    )
+    has_invalid_reservations = django_filters.BooleanFilter(
+        method="filter_eligibility",
+        label="Has out-of-range reservations",
+    )
+
+    def filter_eligibility(self, queryset, name, value):
+        if value is None:
+            return queryset
+        return queryset.filter(**{f"toggle_eligibility__{name}": value})
+
+
+class RackEligibilityFilterSet(BaseFilterSet):
+    """
+    Filters for the materialized rack eligibility.
+    """
+
+    rack_id = django_filters.ModelMultipleChoiceFilter(
+        queryset=Rack.objects.all(),
+        field_name="rack",
+        label="Rack (ID)",
+    )
+    site_id = django_filters.ModelMultipleChoiceFilter(
+        queryset=Site.objects.all(),
+        field_name="rack__site",
+        label="Site (ID)",
+    )
+
+    class Meta:
+        model = RackEligibility
+        fields = (
+            "id",
+            "mounted_device_count",
+            "reservation_count",
+            "has_invalid_devices",
+            "has_invalid_reservations",
+            "toggle_eligible",
+            "last_refreshed",
+        )
+
+
+class RackToggleFilterSet(BaseFilterSet):
+    """
+    Filters for the toggle history.
+    """
+
+    q = django_filters.CharFilter(
+        method="search",
+        label="Search",
+    )
+    rack_id = django_filters.ModelMultipleChoiceFilter(
+        queryset=Rack.objects.all(),
+        field_name="rack",
+        label="Rack (ID)",
+    )
+    rack = django_filters.ModelMultipleChoiceFilter(
+        queryset=Rack.objects.all(),
+        field_name="rack__name",
+        to_field_name="name",
+        label="Rack (name)",
+    )
+    site_id = django_filters.ModelMultipleChoiceFilter(
+        queryset=Site.objects.all(),
+        field_name="rack__site",
+        label="Site (ID)",
+    )
+    user_id = django_filters.ModelMultipleChoiceFilter(
+        queryset=get_user_model().objects.all(),
+        field_name="user",
+        label="User (ID)",
+    )
+    user = django_filters.ModelMultipleChoiceFilter(
+        queryset=get_user_model().objects.all(),
+        field_name="user__username",
+        to_field_name="username",
+        label="User (name)",
+    )
+
+    class Meta:
+        model = RackToggle
+        fields = ("id", "created", "duration", "desc_units", "undone", "idempotency_key")
+
+    def search(self, queryset, name, value):
+        if not value.strip():
+            return queryset
+        return queryset.filter(
+            Q(rack__name__icontains=value) | Q(user__username__icontains=value) | Q(idempotency_key__icontains=value)
+        )
@@ -1,3 +1,87 @@
 """
-No plugin model forms are defined.
+Forms for Netbox Rack Inverter.
 """
+
+from dcim.forms import RackFilterForm
+from dcim.models import Rack, Site
+from django import forms
+from django.contrib.auth import get_user_model
+from netbox.forms import NetBoxModelFilterSetForm
+from utilities.forms import BOOLEAN_WITH_BLANK_CHOICES
+from utilities.forms.fields import DynamicModelMultipleChoiceField
+from utilities.forms.rendering import FieldSet
+from utilities.forms.widgets import DateTimePicker
+
+from .models import RackToggle
+
+__all__ = (
+    "RackToggleEligibilityFilterForm",
+    "RackToggleFilterForm",
+)
+
+
+class RackToggleEligibilityFilterForm(RackFilterForm):
+    fieldsets = (
+        *RackFilterForm.fieldsets,
+        FieldSet("toggle_eligible", "has_invalid_devices", "has_invalid_reservations", name="Toggle eligibility"),
+    )
+    toggle_eligible = forms.NullBooleanField(
+        required=False,
+        label="Toggle eligible",
+        widget=forms.Select(choices=BOOLEAN_WITH_BLANK_CHOICES),
+    )
+    has_invalid_devices = forms.NullBooleanField(
+        required=False,
+        label="Has out-of-range devices",
+        widget=forms.Select(choices=BOOLEAN_WITH_BLANK_CHOICES),
+    )
+    has_invalid_reservations = forms.NullBooleanField(
+        required=False,
+        label="Has out-of-range reservations",
+        widget=forms.Select(choices=BOOLEAN_WITH_BLANK_CHOICES),
+    )
+
+
+class RackToggleFilterForm(NetBoxModelFilterSetForm):
+    model = RackToggle
+    fieldsets = (
+        FieldSet("q", "filter_id"),
+        FieldSet("site_id", "rack_id", "user_id", name="Toggle"),
+        FieldSet("created__gte", "created__lte", "desc_units", "undone", name="Attributes"),
+    )
+    site_id = DynamicModelMultipleChoiceField(
+        queryset=Site.objects.all(),
+        required=False,
+        label="Site",
+    )
+    rack_id = DynamicModelMultipleChoiceField(
+        queryset=Rack.objects.all(),
+        required=False,
+        query_params={"site_id": "$site_id"},
+        label="Rack",
+    )
+    user_id = DynamicModelMultipleChoiceField(
+        queryset=get_user_model().objects.all(),
+        required=False,
+        label="User",
+    )
+    created__gte = forms.DateTimeField(
+        required=False,
+        label="Toggled after",
+        widget=DateTimePicker(),
+    )
+    created__lte = forms.DateTimeField(
+        required=False,
+        label="Toggled before",
+        widget=DateTimePicker(),
+    )
+    desc_units = forms.NullBooleanField(
+        required=False,
+        label="Descending units",
+        widget=forms.Select(choices=BOOLEAN_WITH_BLANK_CHOICES),
+    )
+    undone = forms.NullBooleanField(
+        required=False,
+        label="Undone",
+        widget=forms.Select(choices=BOOLEAN_WITH_BLANK_CHOICES),
+    )
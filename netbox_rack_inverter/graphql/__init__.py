@@ -0,0 +1,6 @@
+"""
+GraphQL API for Netbox Rack Inverter.
+
+For more information on plugin GraphQL schemas, see:
+https://netboxlabs.com/docs/netbox/plugins/development/graphql-api/
+"""
@@ -0,0 +1,35 @@
+"""
+GraphQL filters for Netbox Rack Inverter.
+"""
+
+import strawberry_django
+from strawberry_django import auto
+
+from ..models import RackEligibility, RackToggle
+
+__all__ = (
+    "RackEligibilityFilter",
+    "RackToggleFilter",
+)
+
+
+@strawberry_django.filter_type(RackToggle, lookups=True)
+class RackToggleFilter:
+    id: auto
+    rack: auto
+    user: auto
+    created: auto
+    desc_units: auto
+    undone: auto
+    idempotency_key: auto
+
+
+@strawberry_django.filter_type(RackEligibility, lookups=True)
+class RackEligibilityFilter:
+    id: auto
+    rack: auto
+    mounted_device_count: auto
+    reservation_count: auto
+    has_invalid_devices: auto
+    has_invalid_reservations: auto
+    toggle_eligible: auto
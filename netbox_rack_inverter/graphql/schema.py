@@ -0,0 +1,104 @@
+"""
+GraphQL schema for Netbox Rack Inverter.
+
+Registered through `RackInverterConfig.graphql_schema`. NetBox's GraphQL API
+is read-only, so toggles and undos are only available through the REST API.
+"""
+
+import strawberry
+import strawberry_django
+from dcim.models import Device, Rack, RackReservation
+from strawberry.types import Info
+
+from .. import metrics, routing
+from ..utils import RackUnitRangeError, plan_rack_toggle, read_rack_layouts
+from .types import (
+    DevicePositionChangeType,
+    RackEligibilityType,
+    RackTogglePreviewType,
+    RackToggleType,
+    ReservationUnitsChangeType,
+)
+
+__all__ = ("RackInverterQuery",)
+
+
+def _preview(rack, devices, reservations, *, visible_device_pks, visible_reservation_pks):
+    try:
+        device_positions, reservation_units = plan_rack_toggle(
+            starting_unit=rack["starting_unit"] or 1,
+            rack_u_height=rack["u_height"],
+            devices=devices,
+            reservations=reservations,
+        )
+        error = None
+    except RackUnitRangeError as e:
+        device_positions, reservation_units = [], []
+        error = str(e)
+
+    return RackTogglePreviewType(
+        rack_id=rack["pk"],
+        rack_name=rack["name"],
+        desc_units=rack["desc_units"],
+        target_desc_units=not rack["desc_units"],
+        eligible=error is None,
+        error=error,
+        device_count=len(devices),
+        reservation_count=len(reservations),
+        device_positions=[
+            DevicePositionChangeType(device_id=pk, before=float(before), after=float(after))
+            for pk, before, after in device_positions
+            if pk in visible_device_pks
+        ],
+        reservation_units=[
+            ReservationUnitsChangeType(reservation_id=pk, before=before, after=after)
+            for pk, before, after in reservation_units
+            if pk in visible_reservation_pks
+        ],
+    )
+
+
+@strawberry.type(name="Query")
+class RackInverterQuery:
+    rack_toggle: RackToggleType = strawberry_django.field()
+    rack_toggle_list: list[RackToggleType] = strawberry_django.field()
+    rack_eligibility: RackEligibilityType = strawberry_django.field()
+    rack_eligibility_list: list[RackEligibilityType] = strawberry_django.field()
+
+    @strawberry.field
+    def rack_toggle_preview(self, info: Info, rack_ids: list[strawberry.ID]) -> list[RackTogglePreviewType]:
+        """
+        Preview the toggle of every given rack the user can view. Layouts are
+        loaded for all racks at once, so the number of queries does not grow
+        with the number of racks.
+        """
+        user = info.context.request.user
+        with metrics.track("preview", source="graphql"):
+            racks = routing.for_read(Rack.objects.restrict(user, "view").filter(pk__in=[int(pk) for pk in rack_ids]))
+            layouts = read_rack_layouts(racks)
+            metrics.record_rows("rack", len(layouts))
+            visible_device_pks = set(
+                Device.objects.using(racks.db)
+                .restrict(user, "view")
+                .filter(rack_id__in=list(layouts))
+                .values_list("pk", flat=True)
+            )
+            visible_reservation_pks = set(
+                RackReservation.objects.using(racks.db)
+                .restrict(user, "view")
+                .filter(rack_id__in=list(layouts))
+                .values_list("pk", flat=True)
+            )
+            return [
+                _preview(
+                    rack,
+                    devices,
+                    reservations,
+                    visible_device_pks=visible_device_pks,
+                    visible_reservation_pks=visible_reservation_pks,
+                )
+                for rack, devices, reservations in layouts.values()
+            ]
+
+
+schema = [RackInverterQuery]
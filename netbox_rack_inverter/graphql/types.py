@@ -0,0 +1,78 @@
+"""
+GraphQL object types for Netbox Rack Inverter.
+"""
+
+from typing import TYPE_CHECKING, Annotated
+
+import strawberry
+import strawberry_django
+from netbox.graphql.types import BaseObjectType
+
+from .. import routing
+from ..models import RackEligibility, RackToggle
+from .filters import RackEligibilityFilter, RackToggleFilter
+
+if TYPE_CHECKING:
+    from dcim.graphql.types import RackType
+    from users.graphql.types import UserType
+
+__all__ = (
+    "DevicePositionChangeType",
+    "RackEligibilityType",
+    "RackTogglePreviewType",
+    "RackToggleType",
+    "ReservationUnitsChangeType",
+)
+
+
+@strawberry_django.type(RackToggle, fields="__all__", filters=RackToggleFilter, pagination=True)
+class RackToggleType(BaseObjectType):
+    rack: Annotated["RackType", strawberry.lazy("dcim.graphql.types")]
+    user: Annotated["UserType", strawberry.lazy("users.graphql.types")] | None
+
+    @classmethod
+    def get_queryset(cls, queryset, info, **kwargs):
+        return routing.for_read(super().get_queryset(queryset, info, **kwargs))
+
+
+@strawberry_django.type(RackEligibility, fields="__all__", filters=RackEligibilityFilter, pagination=True)
+class RackEligibilityType(BaseObjectType):
+    rack: Annotated["RackType", strawberry.lazy("dcim.graphql.types")]
+
+    @classmethod
+    def get_queryset(cls, queryset, info, **kwargs):
+        return routing.for_read(super().get_queryset(queryset, info, **kwargs))
+
+
+@strawberry.type
+class DevicePositionChangeType:
+    device_id: strawberry.ID
+    before: float
+    after: float
+
+
+@strawberry.type
+class ReservationUnitsChangeType:
+    reservation_id: strawberry.ID
+    before: list[int]
+    after: list[int]
+
+
+@strawberry.type
+class RackTogglePreviewType:
+    """
+    The remap plan a toggle of the rack would apply, without applying it.
+    """
+
+    rack_id: strawberry.ID
+    rack_name: str
+    desc_units: bool
+    target_desc_units: bool
+    eligible: bool
+    error: str | None
+    device_count: int
+    reservation_count: int
+    # Only objects the requesting user can view are listed; the counts and
+    # eligibility cover every object in the rack.
+    device_positions: list[DevicePositionChangeType]
+    reservation_units: list[ReservationUnitsChangeType]
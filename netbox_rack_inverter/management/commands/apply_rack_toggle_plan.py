@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from netbox_rack_inverter.plans import PlanFileError, apply_plan, load_plan
+
+
+class Command(BaseCommand):
+    help = "Apply a plan file written by generate_rack_toggle_plan"
+
+    def add_arguments(self, parser):
+        parser.add_argument("plan_file", help="Plan file to apply")
+        parser.add_argument(
+            "--user",
+            required=True,
+            help="Username recorded on the toggles and changelog entries; its permissions are enforced",
+        )
+
+    def handle(self, *args, plan_file, user, **options):
+        try:
+            user = get_user_model().objects.get(username=user)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"Unknown user: {user}") from None
+        try:
+            with open(plan_file) as fp:
+                plan = load_plan(fp.read())
+        except (OSError, PlanFileError) as e:
+            raise CommandError(str(e)) from None
+
+        failed = 0
+        for result in apply_plan(plan, user=user):
+            if result.error:
+                failed += 1
+                self.stderr.write(f"Rack {result.rack_id}: {result.status}: {result.error}")
+            else:
+                self.stdout.write(f"Rack {result.rack_id}: {result.status}")
+
+        if failed:
+            raise CommandError(f"{failed} of {len(plan['racks'])} rack(s) were not applied.")
+        self.stdout.write(self.style.SUCCESS(f"Applied plan {plan['id']} to {len(plan['racks'])} rack(s)."))
@@ -0,0 +1,50 @@
+from dcim.models import Rack
+from django.core.management.base import BaseCommand
+
+from netbox_rack_inverter import routing
+from netbox_rack_inverter.export import EXPORT_FORMATS, iter_plan_rows, stream_plan
+
+
+class Command(BaseCommand):
+    help = "Stream the toggle plan of racks as CSV or JSON lines without changing anything"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format",
+            choices=sorted(EXPORT_FORMATS),
+            default="csv",
+            dest="export_format",
+            help="Output format (default: csv)",
+        )
+        parser.add_argument(
+            "--rack",
+            action="append",
+            type=int,
+            dest="racks",
+            metavar="ID",
+            help="Only export this rack (may be repeated)",
+        )
+        parser.add_argument(
+            "--site",
+            action="append",
+            type=int,
+            dest="sites",
+            metavar="ID",
+            help="Only export racks at this site (may be repeated)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of racks planned per batch (default: 100)",
+        )
+
+    def handle(self, *args, export_format="csv", racks=None, sites=None, batch_size=100, **options):
+        queryset = routing.for_read(Rack.objects.all())
+        if racks:
+            queryset = queryset.filter(pk__in=racks)
+        if sites:
+            queryset = queryset.filter(site_id__in=sites)
+
+        for chunk in stream_plan(iter_plan_rows(queryset, batch_size=batch_size), export_format):
+            self.stdout.write(chunk, ending="")
@@ -0,0 +1,58 @@
+from dcim.models import Rack
+from django.core.management.base import BaseCommand
+
+from netbox_rack_inverter import routing
+from netbox_rack_inverter.plans import build_plan, dump_plan
+
+
+class Command(BaseCommand):
+    help = "Write a plan file for toggling racks, to be applied later with apply_rack_toggle_plan"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rack",
+            action="append",
+            type=int,
+            dest="racks",
+            metavar="ID",
+            help="Plan this rack (may be repeated)",
+        )
+        parser.add_argument(
+            "--site",
+            action="append",
+            type=int,
+            dest="sites",
+            metavar="ID",
+            help="Plan every rack at this site (may be repeated)",
+        )
+        parser.add_argument(
+            "--output",
+            "-o",
+            help="Plan file to write (default: standard output)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of racks read per batch (default: 100)",
+        )
+
+    def handle(self, *args, racks=None, sites=None, output=None, batch_size=100, **options):
+        queryset = routing.for_read(Rack.objects.all())
+        if racks:
+            queryset = queryset.filter(pk__in=racks)
+        if sites:
+            queryset = queryset.filter(site_id__in=sites)
+
+        plan = build_plan(queryset, batch_size=batch_size)
+        if output:
+            with open(output, "w") as fp:
+                dump_plan(plan, fp)
+        else:
+            dump_plan(plan, self.stdout)
+            self.stdout.write("")
+
+        for skipped in plan["skipped"]:
+            self.stderr.write(f"Skipped rack {skipped['rack_id']}: {skipped['error']}")
+        # Report on stderr so a plan written to stdout stays valid JSON.
+        self.stderr.write(f"Planned {len(plan['racks'])} rack(s), skipped {len(plan['skipped'])}.")
@@ -0,0 +1,77 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from netbox_rack_inverter.testing.synthetic import generate_topology
+
+
+class Command(BaseCommand):
+    help = "Generate a reproducible synthetic topology of sites, racks, devices and reservations for load testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sites", type=int, default=10, help="Number of sites (default: 10)")
+        parser.add_argument("--racks", type=int, default=1000, help="Number of racks (default: 1000)")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed gives the same topology")
+        parser.add_argument(
+            "--fill",
+            type=float,
+            default=0.6,
+            help="Chance (0-1) that each free unit starts a device (default: 0.6)",
+        )
+        parser.add_argument(
+            "--reservation-rate",
+            type=float,
+            default=0.2,
+            help="Fraction (0-1) of racks that get reservations (default: 0.2)",
+        )
+        parser.add_argument(
+            "--prefix",
+            default="synthetic",
+            help='Prefix of every generated name; must not be in use yet (default: "synthetic")',
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of racks written per transaction (default: 500)",
+        )
+        parser.add_argument("--user", help='Username owning the reservations (default: a "synthetic" user)')
+
+    def handle(self, *args, user=None, **options):
+        if options["sites"] < 1 or options["racks"] < 0:
+            raise CommandError("--sites must be at least 1 and --racks must not be negative.")
+        if not (0 <= options["fill"] <= 1 and 0 <= options["reservation_rate"] <= 1):
+            raise CommandError("--fill and --reservation-rate must be between 0 and 1.")
+        if user is not None:
+            try:
+                user = get_user_model().objects.get(username=user)
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"Unknown user: {user}") from None
+
+        started = time.perf_counter()
+
+        def progress(summary):
+            self.stdout.write(f"{summary.racks}/{options['racks']} racks, {summary.devices} devices")
+
+        try:
+            summary = generate_topology(
+                sites=options["sites"],
+                racks=options["racks"],
+                seed=options["seed"],
+                fill=options["fill"],
+                reservation_rate=options["reservation_rate"],
+                prefix=options["prefix"],
+                batch_size=options["batch_size"],
+                user=user,
+                progress=progress if options["verbosity"] > 1 else None,
+            )
+        except ValueError as e:
+            raise CommandError(str(e)) from None
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {summary.sites} site(s), {summary.racks} rack(s), {summary.devices} device(s) and "
+                f"{summary.reservations} reservation(s) in {time.perf_counter() - started:.1f}s."
+            )
+        )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from netbox_rack_inverter.eligibility import refresh_rack_eligibility
+
+
+class Command(BaseCommand):
+    help = "Recompute the materialized toggle eligibility of racks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rack",
+            action="append",
+            type=int,
+            dest="racks",
+            metavar="ID",
+            help="Only rebuild this rack (may be repeated)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows written per query (default: 1000)",
+        )
+
+    def handle(self, *args, racks=None, batch_size=1000, **options):
+        written = refresh_rack_eligibility(racks, batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt toggle eligibility for {written} rack(s)."))
@@ -0,0 +1,242 @@
+"""
+Timing instrumentation for Netbox Rack Inverter.
+
+Operations (a toggle, an undo, a button render) are wrapped in `track()`.
+Code running inside an operation marks its phases with `phase()` and reports
+rows written with `record_rows()`. When the operation finishes, one
+`OperationMetrics` record is handed to every sink listed in the
+`metrics_sinks` plugin setting.
+
+Sinks are classes implementing `emit(metrics)`. Two are provided:
+
+- `LoggingSink` writes one log line per operation.
+- `PrometheusSink` feeds counters and histograms that are exported by
+  `MetricsView` (and by NetBox's own `/metrics` endpoint when enabled).
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import cache
+
+from django.utils.module_loading import import_string
+from netbox.plugins import get_plugin_config
+
+from . import profiling
+
+__all__ = (
+    "LoggingSink",
+    "MetricsSink",
+    "OperationMetrics",
+    "PrometheusSink",
+    "get_sinks",
+    "phase",
+    "record_rows",
+    "track",
+)
+
+logger = logging.getLogger(__name__)
+
+# Phases spent waiting for the rack's advisory lock and for row locks.
+LOCK_WAIT_PHASES = ("rack_lock", "lock")
+
+_current_operation = ContextVar("netbox_rack_inverter_operation", default=None)
+
+
+@dataclass
+class OperationMetrics:
+    """
+    Timings collected for a single operation.
+    """
+
+    operation: str
+    labels: dict = field(default_factory=dict)
+    outcome: str = "success"
+    duration: float = 0.0
+    phases: dict = field(default_factory=dict)
+    rows: dict = field(default_factory=dict)
+
+
+class MetricsSink:
+    """
+    Base class for metrics sinks.
+    """
+
+    def emit(self, metrics):
+        raise NotImplementedError
+
+
+class LoggingSink(MetricsSink):
+    """
+    Log one line per operation to the `netbox_rack_inverter.metrics` logger.
+    """
+
+    logger = logging.getLogger("netbox_rack_inverter.metrics")
+
+    def emit(self, metrics):
+        phases = " ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in metrics.phases.items())
+        rows = " ".join(f"{kind}={count}" for kind, count in metrics.rows.items())
+        labels = " ".join(f"{name}={value}" for name, value in metrics.labels.items())
+        self.logger.info(
+            "%s outcome=%s duration=%.1fms %s %s %s",
+            metrics.operation,
+            metrics.outcome,
+            metrics.duration * 1000,
+            labels,
+            phases,
+            rows,
+        )
+
+
+class PrometheusSink(MetricsSink):
+    """
+    Record operations as Prometheus counters and histograms.
+
+    Metrics are registered with the default `prometheus_client` registry, so
+    they honour `PROMETHEUS_MULTIPROC_DIR` like the rest of NetBox's metrics.
+    """
+
+    namespace = "netbox_rack_inverter"
+
+    def __init__(self):
+        self.operations, self.duration, self.phases, self.rows, self.lock_wait = _get_prometheus_metrics(self.namespace)
+
+    def emit(self, metrics):
+        operation = metrics.operation
+        self.operations.labels(operation=operation, outcome=metrics.outcome).inc()
+        self.duration.labels(operation=operation).observe(metrics.duration)
+        for name, seconds in metrics.phases.items():
+            self.phases.labels(operation=operation, phase=name).observe(seconds)
+        for kind, count in metrics.rows.items():
+            self.rows.labels(operation=operation, kind=kind).observe(count)
+        lock_waits = [metrics.phases[name] for name in LOCK_WAIT_PHASES if name in metrics.phases]
+        if lock_waits:
+            self.lock_wait.labels(operation=operation).observe(sum(lock_waits))
+
+    @classmethod
+    def render(cls):
+        """
+        Return the plugin's metrics in the Prometheus text exposition format.
+        """
+        from prometheus_client import REGISTRY, CollectorRegistry, generate_latest, multiprocess
+
+        registry = REGISTRY
+        if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+
+        prefixes = (cls.namespace, f"# HELP {cls.namespace}", f"# TYPE {cls.namespace}")
+        lines = generate_latest(registry).decode().splitlines()
+        return "".join(f"{line}\n" for line in lines if line.startswith(prefixes))
+
+
+@cache
+def _get_prometheus_metrics(namespace):
+    # Metric objects may only be registered once per process.
+    from prometheus_client import Counter, Histogram
+
+    duration_buckets = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+    return (
+        Counter(
+            f"{namespace}_operations_total",
+            "Rack inverter operations by outcome",
+            ["operation", "outcome"],
+        ),
+        Histogram(
+            f"{namespace}_operation_duration_seconds",
+            "Total duration of rack inverter operations",
+            ["operation"],
+            buckets=duration_buckets,
+        ),
+        Histogram(
+            f"{namespace}_phase_duration_seconds",
+            "Duration of each phase of rack inverter operations",
+            ["operation", "phase"],
+            buckets=duration_buckets,
+        ),
+        Histogram(
+            f"{namespace}_rows_touched",
+            "Rows written per operation",
+            ["operation", "kind"],
+            buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500, 1000),
+        ),
+        Histogram(
+            f"{namespace}_lock_wait_seconds",
+            "Time spent acquiring the rack lock and row locks",
+            ["operation"],
+            buckets=duration_buckets,
+        ),
+    )
+
+
+@cache
+def _load_sinks(paths):
+    return tuple(import_string(path)() for path in paths)
+
+
+def get_sinks():
+    """
+    Return the configured metrics sinks.
+    """
+    return _load_sinks(tuple(get_plugin_config("netbox_rack_inverter", "metrics_sinks") or ()))
+
+
+@contextmanager
+def track(operation, **labels):
+    """
+    Collect metrics for one operation and emit them to every sink on exit.
+    Yields the OperationMetrics record so callers can set its `outcome`.
+    Sampled operations are also profiled (see `profiling`).
+    """
+    with profiling.profile(operation, labels):
+        sinks = get_sinks()
+        metrics = OperationMetrics(operation, labels)
+        if not sinks:
+            yield metrics
+            return
+
+        token = _current_operation.set(metrics)
+        start = time.perf_counter()
+        try:
+            yield metrics
+        except BaseException as e:
+            metrics.outcome = type(e).__name__
+            raise
+        finally:
+            metrics.duration = time.perf_counter() - start
+            _current_operation.reset(token)
+            for sink in sinks:
+                try:
+                    sink.emit(metrics)
+                except Exception:
+                    # Instrumentation must never break the operation it observes.
+                    logger.exception("Metrics sink %s failed", type(sink).__name__)
+
+
+@contextmanager
+def phase(name):
+    """
+    Time a phase of the current operation. Does nothing outside `track()`.
+    """
+    metrics = _current_operation.get()
+    if metrics is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.phases[name] = metrics.phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def record_rows(kind, count):
+    """
+    Record the number of rows of `kind` written by the current operation.
+    """
+    metrics = _current_operation.get()
+    if metrics is not None:
+        metrics.rows[kind] = metrics.rows.get(kind, 0) + count
@@ -0,0 +1,65 @@
+# Generated by Django 5.2 on 2026-10-19
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("dcim", "0200_populate_mac_addresses"),
+        ("netbox_rack_inverter", "0003_cleanup_legacy_scaffold"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RackToggle",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("desc_units", models.BooleanField(help_text="Rack unit order after the toggle")),
+                (
+                    "device_positions",
+                    models.JSONField(
+                        default=list,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        help_text="[device ID, position before, position after] for each mounted device",
+                    ),
+                ),
+                (
+                    "reservation_units",
+                    models.JSONField(
+                        default=list,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        help_text="[reservation ID, units before, units after] for each reservation",
+                    ),
+                ),
+                ("undone", models.BooleanField(default=False)),
+                (
+                    "rack",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="unit_order_toggles",
+                        to="dcim.rack",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "rack toggle",
+                "verbose_name_plural": "rack toggles",
+                "ordering": ("-pk",),
+            },
+        ),
+    ]
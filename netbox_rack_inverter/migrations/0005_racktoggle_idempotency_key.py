@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("netbox_rack_inverter", "0004_racktoggle"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="racktoggle",
+            name="idempotency_key",
+            field=models.CharField(
+                blank=True,
+                help_text="Client-supplied key identifying retries of the same toggle request",
+                max_length=100,
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="racktoggle",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("idempotency_key", ""), _negated=True),
+                fields=("rack", "idempotency_key"),
+                name="netbox_rack_inverter_racktoggle_unique_rack_idempotency_key",
+                violation_error_message="A toggle with this idempotency key already exists for the rack.",
+            ),
+        ),
+    ]
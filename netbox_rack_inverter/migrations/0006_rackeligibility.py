@@ -0,0 +1,117 @@
+# Generated by Django 5.2 on 2026-10-19
+
+from itertools import batched
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_rack_eligibility(apps, schema_editor):
+    """
+    Create the RackEligibility row of every existing rack. Uses historical
+    models, so the checks mirror annotate_toggle_eligibility() and
+    annotate_occupied_units() in Python; `rebuild_rack_eligibility`
+    recomputes the rows with the live code.
+    """
+    db = schema_editor.connection.alias
+    Rack = apps.get_model("dcim", "Rack")
+    Device = apps.get_model("dcim", "Device")
+    RackReservation = apps.get_model("dcim", "RackReservation")
+    RackEligibility = apps.get_model("netbox_rack_inverter", "RackEligibility")
+
+    racks = Rack.objects.using(db).order_by("pk").values_list("pk", "starting_unit", "u_height")
+    for batch in batched(racks.iterator(chunk_size=BACKFILL_BATCH_SIZE), BACKFILL_BATCH_SIZE):
+        rows = {
+            pk: {
+                "bounds": (starting_unit, starting_unit + u_height - 1),
+                "units": [],
+                "row": RackEligibility(rack_id=pk),
+            }
+            for pk, starting_unit, u_height in batch
+        }
+        devices = (
+            Device.objects.using(db)
+            .filter(rack_id__in=rows, position__isnull=False)
+            .values_list("rack_id", "position", "device_type__u_height")
+        )
+        for rack_pk, position, height in devices:
+            rack = rows[rack_pk]
+            low, high = rack["bounds"]
+            top = position + max(height or 1, 1) - 1
+            rack["row"].mounted_device_count += 1
+            rack["row"].has_invalid_devices |= position < low or top > high
+            rack["units"] += [position, top]
+        reservations = RackReservation.objects.using(db).filter(rack_id__in=rows).values_list("rack_id", "units")
+        for rack_pk, units in reservations:
+            rack = rows[rack_pk]
+            low, high = rack["bounds"]
+            rack["row"].reservation_count += 1
+            if units:
+                rack["row"].has_invalid_reservations |= min(units) < low or max(units) > high
+                rack["units"] += [min(units), max(units)]
+
+        for rack in rows.values():
+            row = rack["row"]
+            row.toggle_eligible = not (row.has_invalid_devices or row.has_invalid_reservations)
+            if rack["units"]:
+                row.occupied_unit_min = min(rack["units"])
+                row.occupied_unit_max = max(rack["units"])
+        RackEligibility.objects.using(db).bulk_create([rack["row"] for rack in rows.values()])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("dcim", "0200_populate_mac_addresses"),
+        ("netbox_rack_inverter", "0005_racktoggle_idempotency_key"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RackEligibility",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ("mounted_device_count", models.PositiveIntegerField(default=0)),
+                ("reservation_count", models.PositiveIntegerField(default=0)),
+                ("has_invalid_devices", models.BooleanField(default=False)),
+                ("has_invalid_reservations", models.BooleanField(default=False)),
+                ("toggle_eligible", models.BooleanField(db_index=True, default=True)),
+                (
+                    "occupied_unit_min",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=1,
+                        help_text="Lowest unit occupied by a mounted device or reservation",
+                        max_digits=5,
+                        null=True,
+                    ),
+                ),
+                (
+                    "occupied_unit_max",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=1,
+                        help_text="Highest unit occupied by a mounted device or reservation",
+                        max_digits=5,
+                        null=True,
+                    ),
+                ),
+                ("last_refreshed", models.DateTimeField(auto_now=True)),
+                (
+                    "rack",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="toggle_eligibility",
+                        to="dcim.rack",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "rack eligibility",
+                "verbose_name_plural": "rack eligibility",
+                "ordering": ("rack",),
+            },
+        ),
+        migrations.RunPython(backfill_rack_eligibility, migrations.RunPython.noop),
+    ]
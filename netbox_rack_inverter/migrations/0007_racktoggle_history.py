@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("netbox_rack_inverter", "0006_rackeligibility"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="racktoggle",
+            name="duration",
+            field=models.FloatField(blank=True, help_text="Seconds taken to apply the toggle", null=True),
+        ),
+        migrations.AddIndex(
+            model_name="racktoggle",
+            index=models.Index(fields=["rack", "-created"], name="rackinv_toggle_rack_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="racktoggle",
+            index=models.Index(fields=["user", "-created"], name="rackinv_toggle_user_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="racktoggle",
+            index=models.Index(fields=["-created"], name="rackinv_toggle_created_idx"),
+        ),
+    ]
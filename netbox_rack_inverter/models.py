@@ -1,6 +1,153 @@
 """
-This plugin intentionally defines no custom database models.
+Models for Netbox Rack Inverter.
 
 Rack unit re-orientation is implemented by mutating NetBox core models
-(`dcim.Rack`, `dcim.Device`, and `dcim.RackReservation`) only.
+(`dcim.Rack`, `dcim.Device`, and `dcim.RackReservation`). The plugin only
+stores bookkeeping about those changes.
 """
+
+import re
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.urls import reverse
+from utilities.querysets import RestrictedQuerySet
+
+IDEMPOTENCY_KEY_MAX_LENGTH = 100
+_IDEMPOTENCY_KEY_PATTERN = re.compile(r"[\x21-\x7e]+")
+
+
+def validate_idempotency_key(value):
+    """
+    Reject an idempotency key that does not fit RackToggle.idempotency_key or
+    holds anything but printable ASCII, before a toggle writes anything.
+    """
+    if len(value) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise ValidationError(f"Idempotency keys are limited to {IDEMPOTENCY_KEY_MAX_LENGTH} characters.")
+    if not _IDEMPOTENCY_KEY_PATTERN.fullmatch(value):
+        raise ValidationError("Idempotency keys may only contain printable ASCII characters without spaces.")
+
+
+class RackToggle(models.Model):
+    """
+    A recorded rack unit order toggle.
+
+    Serves as the toggle history: which rack was switched, when, by whom and
+    how long it took. It also holds a compact snapshot of every position the toggle rewrote so the
+    change can be undone by restoring values directly instead of running the
+    remap again.
+    """
+
+    rack = models.ForeignKey(
+        to="dcim.Rack",
+        on_delete=models.CASCADE,
+        related_name="unit_order_toggles",
+    )
+    user = models.ForeignKey(
+        to=settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        blank=True,
+        null=True,
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    duration = models.FloatField(
+        blank=True,
+        null=True,
+        help_text="Seconds taken to apply the toggle",
+    )
+    desc_units = models.BooleanField(help_text="Rack unit order after the toggle")
+    device_positions = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        default=list,
+        help_text="[device ID, position before, position after] for each mounted device",
+    )
+    reservation_units = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        default=list,
+        help_text="[reservation ID, units before, units after] for each reservation",
+    )
+    undone = models.BooleanField(default=False)
+    idempotency_key = models.CharField(
+        max_length=IDEMPOTENCY_KEY_MAX_LENGTH,
+        blank=True,
+        help_text="Client-supplied key identifying retries of the same toggle request",
+    )
+
+    objects = RestrictedQuerySet.as_manager()
+
+    class Meta:
+        ordering = ("-pk",)
+        constraints = (
+            models.UniqueConstraint(
+                fields=("rack", "idempotency_key"),
+                condition=~models.Q(idempotency_key=""),
+                name="%(app_label)s_%(class)s_unique_rack_idempotency_key",
+                violation_error_message="A toggle with this idempotency key already exists for the rack.",
+            ),
+        )
+        # History is read per rack, per user or across all racks, newest first.
+        indexes = (
+            models.Index(fields=("rack", "-created"), name="rackinv_toggle_rack_idx"),
+            models.Index(fields=("user", "-created"), name="rackinv_toggle_user_idx"),
+            models.Index(fields=("-created",), name="rackinv_toggle_created_idx"),
+        )
+        verbose_name = "rack toggle"
+        verbose_name_plural = "rack toggles"
+
+    def __str__(self):
+        target_mode_label = "descending" if self.desc_units else "ascending"
+        return f"{self.rack} to {target_mode_label} units (#{self.pk})"
+
+    def get_absolute_url(self):
+        return reverse("plugins:netbox_rack_inverter:racktoggle", args=[self.pk])
+
+
+class RackEligibility(models.Model):
+    """
+    Precomputed toggle eligibility of a rack.
+
+    Mirrors `annotations.annotate_toggle_eligibility()` plus the occupied unit
+    range, so reports and bulk planners can read one row per rack instead
+    of scanning devices and reservations. Kept current by the handlers in
+    `signals`; `manage.py rebuild_rack_eligibility` recomputes every row.
+    """
+
+    rack = models.OneToOneField(
+        to="dcim.Rack",
+        on_delete=models.CASCADE,
+        related_name="toggle_eligibility",
+    )
+    mounted_device_count = models.PositiveIntegerField(default=0)
+    reservation_count = models.PositiveIntegerField(default=0)
+    has_invalid_devices = models.BooleanField(default=False)
+    has_invalid_reservations = models.BooleanField(default=False)
+    toggle_eligible = models.BooleanField(default=True, db_index=True)
+    occupied_unit_min = models.DecimalField(
+        max_digits=5,
+        decimal_places=1,
+        blank=True,
+        null=True,
+        help_text="Lowest unit occupied by a mounted device or reservation",
+    )
+    occupied_unit_max = models.DecimalField(
+        max_digits=5,
+        decimal_places=1,
+        blank=True,
+        null=True,
+        help_text="Highest unit occupied by a mounted device or reservation",
+    )
+    last_refreshed = models.DateTimeField(auto_now=True)
+
+    objects = RestrictedQuerySet.as_manager()
+
+    class Meta:
+        ordering = ("rack",)
+        verbose_name = "rack eligibility"
+        verbose_name_plural = "rack eligibility"
+
+    def __str__(self):
+        state = "eligible" if self.toggle_eligible else "not eligible"
+        return f"{self.rack}: {state}"
@@ -2,4 +2,17 @@
 Navigation menu items for Netbox Rack Inverter.
 """
 
-menu_items = ()
+from netbox.plugins import PluginMenuItem
+
+menu_items = (
+    PluginMenuItem(
+        link="plugins:netbox_rack_inverter:rack_toggle_eligibility",
+        link_text="Rack Toggle Eligibility",
+        permissions=["dcim.view_rack"],
+    ),
+    PluginMenuItem(
+        link="plugins:netbox_rack_inverter:racktoggle_list",
+        link_text="Rack Toggle History",
+        permissions=["netbox_rack_inverter.view_racktoggle"],
+    ),
+)
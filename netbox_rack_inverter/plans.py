@@ -0,0 +1,234 @@
+"""
+Offline toggle plan files.
+
+A plan file records, for each rack, the fingerprint of its layout when the
+plan was made and the positions and reservation units a toggle would
+write. Plans can be generated ahead of time and applied later with
+`apply_plan()`, which skips racks whose layout has changed since.
+
+Plan files are JSON:
+
+    {
+        "format": "netbox-rack-inverter-plan",
+        "version": 1,
+        "id": "<uuid>",
+        "generated": "<ISO 8601 timestamp>",
+        "racks": [
+            {
+                "rack_id": 1,
+                "fingerprint": "<sha256>",
+                "desc_units": true,
+                "device_positions": [[device ID, before, after], ...],
+                "reservation_units": [[reservation ID, units before, units after], ...]
+            }
+        ],
+        "skipped": [{"rack_id": 2, "error": "..."}]
+    }
+"""
+
+import json
+import uuid
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from itertools import batched
+
+from dcim.models import Rack
+from django.core.exceptions import PermissionDenied
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from . import metrics
+from .models import RackToggle
+from .utils import (
+    RackBusy,
+    RackLayoutConflict,
+    RackUnitRangeError,
+    apply_planned_toggle,
+    get_rack_layout_fingerprint,
+    plan_rack_toggle,
+    read_rack_layouts,
+)
+
+__all__ = (
+    "PLAN_FORMAT",
+    "PLAN_VERSION",
+    "PlanFileError",
+    "PlanResult",
+    "apply_plan",
+    "build_plan",
+    "dump_plan",
+    "load_plan",
+)
+
+PLAN_FORMAT = "netbox-rack-inverter-plan"
+PLAN_VERSION = 1
+
+
+class PlanFileError(ValueError):
+    """
+    A plan file is malformed or was written by an unsupported version.
+    """
+
+
+@dataclass
+class PlanResult:
+    rack_id: int
+    status: str
+    toggle: RackToggle | None = None
+    error: str = ""
+
+
+def build_plan(racks, *, batch_size=100):
+    """
+    Plan a toggle of every rack in the `racks` queryset, reading from the
+    same database as `racks`. Racks that cannot be toggled are listed under
+    "skipped" with the reason; those whose RackEligibility row marks them
+    ineligible are skipped without reading their devices and reservations.
+    """
+    plan = {
+        "format": PLAN_FORMAT,
+        "version": PLAN_VERSION,
+        "id": str(uuid.uuid4()),
+        "generated": timezone.now().isoformat(),
+        "racks": [],
+        "skipped": [],
+    }
+    rack_rows = (
+        racks.order_by("pk").values_list("pk", "toggle_eligibility__toggle_eligible").iterator(chunk_size=batch_size)
+    )
+    for chunk in batched(rack_rows, batch_size):
+        planned = []
+        for pk, eligible in chunk:
+            if eligible is False:
+                plan["skipped"].append({"rack_id": pk, "error": str(RackUnitRangeError())})
+            else:
+                planned.append(pk)
+        layouts = read_rack_layouts(Rack.objects.using(racks.db).filter(pk__in=planned))
+        for rack, devices, reservations in layouts.values():
+            try:
+                device_positions, reservation_units = plan_rack_toggle(
+                    starting_unit=rack["starting_unit"] or 1,
+                    rack_u_height=rack["u_height"],
+                    devices=devices,
+                    reservations=reservations,
+                )
+            except RackUnitRangeError as e:
+                plan["skipped"].append({"rack_id": rack["pk"], "error": str(e)})
+                continue
+            plan["racks"].append(
+                {
+                    "rack_id": rack["pk"],
+                    "fingerprint": get_rack_layout_fingerprint(
+                        desc_units=rack["desc_units"],
+                        starting_unit=rack["starting_unit"],
+                        u_height=rack["u_height"],
+                        devices=devices,
+                        reservations=reservations,
+                    ),
+                    "desc_units": not rack["desc_units"],
+                    "device_positions": device_positions,
+                    "reservation_units": reservation_units,
+                }
+            )
+    return plan
+
+
+def dump_plan(plan, fp):
+    """
+    Write `plan` to the file object `fp` as compact JSON.
+    """
+    json.dump(plan, fp, cls=DjangoJSONEncoder, separators=(",", ":"))
+
+
+def _is_object_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_position(value):
+    # Decimal positions are written as strings by DjangoJSONEncoder.
+    if isinstance(value, bool) or not isinstance(value, int | float | str):
+        return False
+    try:
+        return Decimal(str(value)).is_finite()
+    except InvalidOperation:
+        return False
+
+
+def _is_unit_list(value):
+    return isinstance(value, list) and all(_is_object_id(unit) for unit in value)
+
+
+def _validate_rows(rows, is_value, kind, rack_id):
+    for row in rows:
+        if not (isinstance(row, list) and len(row) == 3 and _is_object_id(row[0])):
+            raise ValueError(f"invalid {kind} row for rack {rack_id}: {row!r}")
+        if not (is_value(row[1]) and is_value(row[2])):
+            raise ValueError(f"invalid {kind} values for rack {rack_id}: {row!r}")
+
+
+def load_plan(data):
+    """
+    Parse and validate a plan from a JSON string, bytes or an already
+    decoded dict. Raises PlanFileError if it is not a supported plan.
+    """
+    if isinstance(data, str | bytes):
+        try:
+            data = json.loads(data)
+        except ValueError as e:
+            raise PlanFileError(f"The plan file is not valid JSON: {e}") from None
+
+    if not isinstance(data, dict) or data.get("format") != PLAN_FORMAT:
+        raise PlanFileError("This is not a rack toggle plan file.")
+    if data.get("version") != PLAN_VERSION:
+        raise PlanFileError(f"Unsupported plan file version: {data.get('version')}")
+    try:
+        uuid.UUID(str(data["id"]))
+        for entry in data["racks"]:
+            int(entry["rack_id"])
+            str(entry["fingerprint"])
+            _validate_rows(entry["device_positions"], _is_position, "device position", entry["rack_id"])
+            _validate_rows(entry["reservation_units"], _is_unit_list, "reservation units", entry["rack_id"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise PlanFileError(f"Malformed plan file: {e}") from None
+    return data
+
+
+def apply_plan(plan, *, user, request_id=None):
+    """
+    Apply every rack of a loaded plan, each in its own transaction. Racks
+    whose layout changed since the plan was made, or that `user` may not
+    change, are skipped. Applying the same plan again is a no-op for racks
+    it already toggled.
+
+    Returns a PlanResult per rack, with status "applied", "already applied",
+    "conflict", "busy" (another operation held the rack; apply the plan
+    again later) or "denied".
+    """
+    results = []
+    with metrics.track("plan_apply"):
+        metrics.record_rows("rack", len(plan["racks"]))
+        for entry in plan["racks"]:
+            rack_pk = int(entry["rack_id"])
+            try:
+                with metrics.track("toggle", source="plan", rack=rack_pk) as operation:
+                    toggle, created = apply_planned_toggle(
+                        rack_pk,
+                        fingerprint=entry["fingerprint"],
+                        device_positions=entry["device_positions"],
+                        reservation_units=entry["reservation_units"],
+                        user=user,
+                        idempotency_key=f"plan:{plan['id']}",
+                        request_id=request_id,
+                    )
+                    operation.outcome = "toggled" if created else "noop"
+            except RackBusy as e:
+                results.append(PlanResult(rack_pk, "busy", error=str(e)))
+            except RackLayoutConflict as e:
+                results.append(PlanResult(rack_pk, "conflict", error=str(e)))
+            except PermissionDenied as e:
+                results.append(PlanResult(rack_pk, "denied", error=str(e)))
+            except Rack.DoesNotExist:
+                results.append(PlanResult(rack_pk, "conflict", error="The rack no longer exists."))
+            else:
+                results.append(PlanResult(rack_pk, "applied" if created else "already applied", toggle=toggle))
+    return results
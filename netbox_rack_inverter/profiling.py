@@ -0,0 +1,173 @@
+"""
+Sampled cProfile capture for Netbox Rack Inverter.
+
+When `profile_sample_rate` is above zero, that fraction of operations wrapped
+in `metrics.track()` (toggles, undos and button renders) runs under cProfile.
+Profiles of operations slower than `profile_min_duration` seconds are written
+to `profile_dir` as `.pstats` files, which superusers can browse and download
+from the plugin's profile list. Only the newest `profile_max_files` are kept.
+"""
+
+import logging
+import os
+import random
+import re
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import UTC, datetime
+
+from django.utils import timezone
+from netbox.plugins import get_plugin_config
+
+__all__ = (
+    "StoredProfile",
+    "get_profile_dir",
+    "get_profile_path",
+    "list_profiles",
+    "profile",
+)
+
+logger = logging.getLogger(__name__)
+
+PROFILE_NAME_RE = re.compile(
+    r"^(?P<timestamp>\d{8}T\d{6})-(?P<operation>[a-z_]+)-r(?P<rack>\d*)-(?P<duration>\d+)ms-[0-9a-f]{8}\.pstats$"
+)
+
+_profiling = ContextVar("netbox_rack_inverter_profiling", default=False)
+
+
+@dataclass(frozen=True)
+class StoredProfile:
+    """
+    A profile file written to the profile directory.
+    """
+
+    name: str
+    operation: str
+    rack_id: int | None
+    duration_ms: int
+    created: datetime
+    size: int
+
+
+def _setting(name):
+    return get_plugin_config("netbox_rack_inverter", name)
+
+
+def get_profile_dir():
+    """
+    Return the directory profiles are written to.
+    """
+    return _setting("profile_dir") or os.path.join(tempfile.gettempdir(), "netbox_rack_inverter_profiles")
+
+
+def get_profile_path(name):
+    """
+    Return the path of a stored profile. Raises FileNotFoundError for names
+    that are not profile files, so callers cannot reach outside the directory.
+    """
+    if not PROFILE_NAME_RE.match(name):
+        raise FileNotFoundError(name)
+    path = os.path.join(get_profile_dir(), name)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(name)
+    return path
+
+
+def list_profiles():
+    """
+    Return the stored profiles, newest first.
+    """
+    try:
+        names = os.listdir(get_profile_dir())
+    except FileNotFoundError:
+        return []
+
+    profiles = []
+    for name in sorted(names, reverse=True):
+        if not (match := PROFILE_NAME_RE.match(name)):
+            continue
+        try:
+            size = os.path.getsize(os.path.join(get_profile_dir(), name))
+        except OSError:
+            # Pruned by another worker since the directory was listed.
+            continue
+        profiles.append(
+            StoredProfile(
+                name=name,
+                operation=match["operation"],
+                rack_id=int(match["rack"]) if match["rack"] else None,
+                duration_ms=int(match["duration"]),
+                created=datetime.strptime(match["timestamp"], "%Y%m%dT%H%M%S").replace(tzinfo=UTC),
+                size=size,
+            )
+        )
+    return profiles
+
+
+def _save(profiler, operation, labels, duration):
+    directory = get_profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    name = "{timestamp}-{operation}-r{rack}-{duration}ms-{token}.pstats".format(
+        timestamp=timezone.now().strftime("%Y%m%dT%H%M%S"),
+        operation=operation,
+        rack=labels.get("rack") or "",
+        duration=round(duration * 1000),
+        token=uuid.uuid4().hex[:8],
+    )
+    path = os.path.join(directory, name)
+    # Write under a temporary name so listings never see a partial file.
+    profiler.dump_stats(f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+
+    max_files = _setting("profile_max_files")
+    if max_files:
+        stale = sorted(n for n in os.listdir(directory) if PROFILE_NAME_RE.match(n))[:-max_files]
+        for stale_name in stale:
+            try:
+                os.remove(os.path.join(directory, stale_name))
+            except FileNotFoundError:
+                pass
+    return path
+
+
+@contextmanager
+def profile(operation, labels):
+    """
+    Run the enclosed block under cProfile for a sampled fraction of calls.
+    Nested operations are covered by the outermost profile.
+    """
+    sample_rate = _setting("profile_sample_rate") or 0
+    if not sample_rate or _profiling.get() or random.random() >= sample_rate:
+        yield
+        return
+
+    # Profiling is off by default, so cProfile is only loaded once an
+    # operation is actually sampled.
+    import cProfile
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler (for example a debugger or APM agent) is active.
+        yield
+        return
+
+    token = _profiling.set(True)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        duration = time.perf_counter() - start
+        _profiling.reset(token)
+        if duration >= (_setting("profile_min_duration") or 0):
+            try:
+                _save(profiler, operation, labels, duration)
+            except OSError:
+                logger.exception("Could not write %s profile to %s", operation, get_profile_dir())
@@ -0,0 +1,133 @@
+"""
+Rack unit remapping math for Netbox Rack Inverter.
+
+These functions are pure and do not touch the database. `get_remap_table()`
+precomputes both of them for every position of one object height in one rack
+geometry, for plans that cover many racks of the same few geometries.
+"""
+
+from decimal import Decimal
+from functools import lru_cache
+
+# Distinct (starting unit, rack height, object height) tables kept.
+REMAP_TABLE_CACHE_SIZE = 1024
+HALF_UNIT = Decimal("0.5")
+
+
+def remap_position_for_descending_units(
+    *,
+    position: int,
+    device_height: int,
+    rack_starting_unit: int,
+    rack_u_height: int,
+) -> int:
+    """
+    Convert an ascending rack position to its descending equivalent while
+    preserving physical placement within the rack.
+    """
+    top_unit = rack_starting_unit + rack_u_height - 1
+    return top_unit - (position - rack_starting_unit) - device_height + 1
+
+
+def is_valid_unit_span_for_rack(
+    *,
+    position: int,
+    object_height: int,
+    rack_starting_unit: int,
+    rack_u_height: int,
+) -> bool:
+    """
+    Return True if an object's occupied unit span is fully inside the rack.
+    """
+    if rack_u_height < 1 or object_height < 1:
+        return False
+
+    lowest_unit = rack_starting_unit
+    highest_unit = rack_starting_unit + rack_u_height - 1
+    object_low = position
+    object_high = position + object_height - 1
+    return lowest_unit <= object_low <= highest_unit and lowest_unit <= object_high <= highest_unit
+
+
+def format_unit(value) -> str | None:
+    """
+    Return a unit position or height as a one-decimal-place string ("3.0"),
+    the form used in layout fingerprints and changelog entries. Ints, floats
+    and Decimals of the same value give the same string.
+    """
+    if value is None:
+        return None
+    return str(Decimal(str(value)).quantize(Decimal("0.1")))
+
+
+class RemapTable:
+    """
+    Descending positions of objects of one height in one rack geometry,
+    keyed by ascending position. Built by `get_remap_table()`.
+
+    Whole-unit int positions map to the values the scalar functions return
+    for ints; Decimal positions on the half-unit grid map to one-decimal-place
+    Decimals, as read from NetBox's position columns.
+    """
+
+    __slots__ = ("rack_starting_unit", "rack_u_height", "object_height", "_by_unit", "_by_half_unit")
+
+    def __init__(self, *, rack_starting_unit, rack_u_height, object_height):
+        self.rack_starting_unit = rack_starting_unit
+        self.rack_u_height = rack_u_height
+        self.object_height = object_height
+        # Equal int and Decimal keys collide, hence a dict per type.
+        self._by_unit = {
+            position: self._compute(position)
+            for position in range(rack_starting_unit, rack_starting_unit + rack_u_height)
+        }
+        first = Decimal(rack_starting_unit).quantize(HALF_UNIT)
+        self._by_half_unit = {
+            position: self._compute(position)
+            for position in (first + HALF_UNIT * index for index in range(max(2 * rack_u_height - 1, 0)))
+        }
+
+    def _compute(self, position):
+        if not is_valid_unit_span_for_rack(
+            position=position,
+            object_height=self.object_height,
+            rack_starting_unit=self.rack_starting_unit,
+            rack_u_height=self.rack_u_height,
+        ):
+            return None
+        return remap_position_for_descending_units(
+            position=position,
+            device_height=self.object_height,
+            rack_starting_unit=self.rack_starting_unit,
+            rack_u_height=self.rack_u_height,
+        )
+
+    def remap(self, position):
+        """
+        Return the descending position of an object at `position`, or None
+        if it does not fit in the rack.
+        """
+        if type(position) is int:
+            entries = self._by_unit
+        elif type(position) is Decimal:
+            entries = self._by_half_unit
+        else:
+            return self._compute(position)
+        try:
+            return entries[position]
+        except KeyError:
+            # Outside the rack or off the half-unit grid.
+            return self._compute(position)
+
+
+@lru_cache(maxsize=REMAP_TABLE_CACHE_SIZE, typed=True)
+def get_remap_table(rack_starting_unit: int, rack_u_height: int, object_height) -> RemapTable:
+    """
+    Return the (cached) RemapTable for objects of `object_height` in a rack
+    of the given geometry.
+    """
+    return RemapTable(
+        rack_starting_unit=rack_starting_unit,
+        rack_u_height=rack_u_height,
+        object_height=object_height,
+    )
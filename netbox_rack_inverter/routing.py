@@ -0,0 +1,35 @@
+"""
+Database routing for the plugin's read-only queries.
+
+Permission diagnostics, eligibility reports, previews, plan exports and
+toggle history may read from a replica named by the `read_database`
+setting. Toggles, undos, plan applies and eligibility refreshes always use
+the default routing: they must see their own writes and anything committed
+just before them.
+
+When `read_database` is unset, querysets are left alone so any configured
+DATABASE_ROUTERS still decide where reads go.
+"""
+
+from netbox.plugins import get_plugin_config
+
+__all__ = (
+    "for_read",
+    "get_read_database",
+)
+
+
+def get_read_database():
+    """
+    Return the database alias for read-only queries, or None for the
+    default routing.
+    """
+    return get_plugin_config("netbox_rack_inverter", "read_database") or None
+
+
+def for_read(queryset):
+    """
+    Route `queryset` to the read database, if one is configured.
+    """
+    alias = get_read_database()
+    return queryset.using(alias) if alias else queryset
@@ -1,5 +1,21 @@
 """
-No plugin search indexes are defined.
+Search indexes for Netbox Rack Inverter.
 """
 
-indexes = ()
+from netbox.search import SearchIndex
+
+from .models import RackToggle
+
+
+class RackToggleIndex(SearchIndex):
+    model = RackToggle
+    # Most toggles come from the UI without an idempotency key, so they are
+    # indexed by rack name as well.
+    fields = (
+        ("rack", 100),
+        ("idempotency_key", 500),
+    )
+    display_attrs = ("rack", "user", "desc_units", "created")
+
+
+indexes = (RackToggleIndex,)
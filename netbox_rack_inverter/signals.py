@@ -0,0 +1,108 @@
+"""
+Signal handlers for Netbox Rack Inverter.
+
+Connected in `RackInverterConfig.ready()`. They keep the button state and
+device type height caches (`caching`) and the materialized rack eligibility
+(`eligibility`) current.
+"""
+
+from dcim.models import Device, DeviceType, Rack, RackReservation
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from users.models import ObjectPermission
+
+from . import caching, eligibility
+from .models import RackToggle
+
+
+def _get_previous_value(instance, field, attname, update_fields=None):
+    # Saves limited to other fields cannot have changed the value.
+    if update_fields is not None and field not in update_fields and attname not in update_fields:
+        return getattr(instance, attname)
+    # Objects edited through NetBox views and the API carry a pre-change
+    # snapshot; fall back to the database otherwise.
+    snapshot = getattr(instance, "_prechange_snapshot", None)
+    if snapshot and field in snapshot:
+        return snapshot[field]
+    return type(instance).objects.filter(pk=instance.pk).values_list(attname, flat=True).first()
+
+
+@receiver(pre_save, sender=Device)
+@receiver(pre_save, sender=RackReservation)
+def remember_previous_rack(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance._state.adding:
+        return
+    instance._rack_inverter_previous_rack_id = _get_previous_value(instance, "rack", "rack_id", update_fields)
+
+
+@receiver(post_save, sender=Device)
+@receiver(post_save, sender=RackReservation)
+@receiver(post_delete, sender=Device)
+@receiver(post_delete, sender=RackReservation)
+def rack_contents_changed(sender, instance, **kwargs):
+    rack_ids = {instance.rack_id, getattr(instance, "_rack_inverter_previous_rack_id", None)} - {None}
+    for rack_id in rack_ids:
+        caching.invalidate_rack(rack_id)
+    eligibility.schedule_refresh(*rack_ids)
+
+
+@receiver(post_save, sender=RackToggle)
+@receiver(post_delete, sender=RackToggle)
+def rack_toggle_changed(sender, instance, **kwargs):
+    caching.invalidate_rack(instance.rack_id)
+
+
+@receiver(post_save, sender=Rack)
+def rack_changed(sender, instance, raw=False, **kwargs):
+    caching.invalidate_rack(instance.pk)
+    if not raw:
+        eligibility.schedule_refresh(instance.pk)
+
+
+@receiver(post_delete, sender=Rack)
+def rack_deleted(sender, instance, **kwargs):
+    caching.invalidate_rack(instance.pk)
+
+
+@receiver(pre_save, sender=DeviceType)
+def remember_previous_height(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance._state.adding:
+        return
+    instance._rack_inverter_previous_u_height = _get_previous_value(instance, "u_height", "u_height", update_fields)
+
+
+@receiver(post_save, sender=DeviceType)
+def device_type_changed(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    previous_u_height = getattr(instance, "_rack_inverter_previous_u_height", None)
+    if previous_u_height is not None and float(previous_u_height) == float(instance.u_height):
+        return
+    # Raw saves (fixture loading) do not record the previous height.
+    caching.invalidate_device_types()
+    if previous_u_height is None:
+        return
+    eligibility.schedule_refresh(
+        *Device.objects.filter(device_type=instance, position__isnull=False)
+        .values_list("rack_id", flat=True)
+        .distinct()
+    )
+
+
+@receiver(post_delete, sender=DeviceType)
+def device_type_deleted(sender, instance, **kwargs):
+    caching.invalidate_device_types()
+
+
+@receiver(post_save, sender=ObjectPermission)
+@receiver(post_delete, sender=ObjectPermission)
+def invalidate_object_permission(sender, instance, **kwargs):
+    caching.invalidate_permissions()
+
+
+@receiver(m2m_changed, sender=ObjectPermission.object_types.through)
+@receiver(m2m_changed, sender=ObjectPermission.users.through)
+@receiver(m2m_changed, sender=ObjectPermission.groups.through)
+def invalidate_object_permission_assignments(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        caching.invalidate_permissions()
@@ -1,3 +1,115 @@
 """
-No plugin model tables are defined.
+Tables for Netbox Rack Inverter.
 """
+
+import django_tables2 as tables
+from dcim.models import Rack
+from netbox.tables import NetBoxTable, columns
+
+from .models import RackToggle
+
+__all__ = (
+    "RackToggleEligibilityTable",
+    "RackToggleTable",
+)
+
+
+class RackToggleEligibilityTable(NetBoxTable):
+    """
+    Racks with the annotations added by `eligibility.annotate_materialized_eligibility()`.
+    """
+
+    name = tables.Column(linkify=True)
+    site = tables.Column(linkify=True)
+    location = tables.Column(linkify=True)
+    desc_units = columns.BooleanColumn(verbose_name="Descending units")
+    mounted_device_count = tables.Column(verbose_name="Mounted devices")
+    reservation_count = tables.Column(verbose_name="Reservations")
+    has_invalid_devices = columns.BooleanColumn(verbose_name="Out-of-range devices")
+    has_invalid_reservations = columns.BooleanColumn(verbose_name="Out-of-range reservations")
+    toggle_eligible = columns.BooleanColumn(verbose_name="Toggle eligible")
+
+    class Meta(NetBoxTable.Meta):
+        model = Rack
+        fields = (
+            "pk",
+            "id",
+            "name",
+            "site",
+            "location",
+            "u_height",
+            "starting_unit",
+            "desc_units",
+            "mounted_device_count",
+            "reservation_count",
+            "has_invalid_devices",
+            "has_invalid_reservations",
+            "toggle_eligible",
+        )
+        default_columns = (
+            "name",
+            "site",
+            "u_height",
+            "desc_units",
+            "mounted_device_count",
+            "reservation_count",
+            "has_invalid_devices",
+            "has_invalid_reservations",
+            "toggle_eligible",
+        )
+
+
+class RackToggleTable(NetBoxTable):
+    """
+    The toggle history.
+    """
+
+    id = tables.Column(linkify=True, verbose_name="ID")
+    rack = tables.Column(linkify=True)
+    site = tables.Column(accessor="rack__site", linkify=True, verbose_name="Site")
+    user = tables.Column(verbose_name="User")
+    created = columns.DateTimeColumn(verbose_name="Toggled")
+    desc_units = columns.BooleanColumn(verbose_name="Descending units")
+    duration = tables.Column(verbose_name="Duration")
+    device_count = tables.Column(accessor="device_positions", orderable=False, verbose_name="Devices")
+    reservation_count = tables.Column(accessor="reservation_units", orderable=False, verbose_name="Reservations")
+    undone = columns.BooleanColumn(verbose_name="Undone")
+    # History entries are created by toggles only and have no edit or delete views.
+    actions = columns.ActionsColumn(actions=())
+
+    class Meta(NetBoxTable.Meta):
+        model = RackToggle
+        fields = (
+            "pk",
+            "id",
+            "rack",
+            "site",
+            "user",
+            "created",
+            "desc_units",
+            "duration",
+            "device_count",
+            "reservation_count",
+            "undone",
+            "idempotency_key",
+        )
+        default_columns = (
+            "id",
+            "rack",
+            "user",
+            "created",
+            "desc_units",
+            "duration",
+            "device_count",
+            "reservation_count",
+            "undone",
+        )
+
+    def render_duration(self, value):
+        return f"{value * 1000:.0f} ms"
+
+    def render_device_count(self, value):
+        return len(value)
+
+    def render_reservation_count(self, value):
+        return len(value)
@@ -1,7 +1,12 @@
 from dcim.models import Device, Rack, RackReservation
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
 from django.urls import reverse
 from netbox.plugins import PluginTemplateExtension
 
+from . import caching, metrics
+from .undo import get_undoable_toggle
+
 
 class RackConvertToDescendingUnitsButton(PluginTemplateExtension):
     # Keep compatibility with NetBox versions that inspect either attribute.
@@ -15,33 +20,49 @@ class RackConvertToDescendingUnitsButton(PluginTemplateExtension):
         if not user.has_perm("dcim.change_rack", rack):
             missing_permissions.append("dcim.change_rack on this rack")
 
+        # The diagnosis is cached as part of the button state, so it is read
+        # from the primary like the toggle: a replica's lag would otherwise
+        # be cached along with it.
         if not user.has_perm("dcim.change_device"):
             missing_permissions.append("dcim.change_device")
         else:
-            blocked_devices = sum(
-                1
-                for device in Device.objects.filter(rack=rack, position__isnull=False).only("id")
-                if not user.has_perm("dcim.change_device", device)
-            )
+            devices = Device.objects.filter(rack=rack, position__isnull=False)
+            blocked_devices = devices.count() - devices.restrict(user, "change").count()
             if blocked_devices:
                 missing_permissions.append(f"dcim.change_device on {blocked_devices} mounted device(s)")
 
         if not user.has_perm("dcim.change_rackreservation"):
             missing_permissions.append("dcim.change_rackreservation")
         else:
-            blocked_reservations = sum(
-                1
-                for reservation in RackReservation.objects.filter(rack=rack).only("id")
-                if not user.has_perm("dcim.change_rackreservation", reservation)
-            )
+            reservations = RackReservation.objects.filter(rack=rack)
+            blocked_reservations = reservations.count() - reservations.restrict(user, "change").count()
             if blocked_reservations:
-                missing_permissions.append(
-                    f"dcim.change_rackreservation on {blocked_reservations} reservation(s)"
-                )
+                missing_permissions.append(f"dcim.change_rackreservation on {blocked_reservations} reservation(s)")
 
         return missing_permissions
 
+    @classmethod
+    def _get_button_state(cls, user, rack):
+        if not user.has_perm("dcim.view_rack", rack):
+            return {"visible": False}
+
+        missing_permissions = cls._get_missing_permissions(user, rack)
+        undo_toggle = None if missing_permissions else get_undoable_toggle(rack)
+        return {
+            "visible": True,
+            "missing_permissions": missing_permissions,
+            "undo_toggle_id": getattr(undo_toggle, "pk", None),
+        }
+
     def buttons(self):
+        rack = self.context.get("object")
+        with metrics.track("button_render", rack=getattr(rack, "pk", None)):
+            return self._render_placeholder()
+
+    def _render_placeholder(self):
+        # Only a constant-cost view check happens here; the permission
+        # diagnosis is loaded separately by the fragment view so the rack
+        # page does not wait for it.
         rack = self.context.get("object")
         request = self.context.get("request")
         user = getattr(request, "user", None)
@@ -49,30 +70,70 @@ class RackConvertToDescendingUnitsButton(PluginTemplateExtension):
         if not isinstance(rack, Rack) or rack.pk is None or user is None:
             return ""
 
-        if not user.has_perm("dcim.view_rack", rack):
+        with metrics.phase("permissions"):
+            if not user.has_perm("dcim.view_rack", rack):
+                return ""
+
+        with metrics.phase("render"):
+            return self.render(
+                "netbox_rack_inverter/inc/rack_toggle_button_placeholder.html",
+                extra_context={
+                    "fragment_url": reverse(
+                        "plugins:netbox_rack_inverter:rack_toggle_button",
+                        kwargs={"pk": rack.pk},
+                    ),
+                    "rack": rack,
+                },
+            )
+
+    @classmethod
+    def render_fragment(cls, request, rack):
+        """
+        Render the toggle button with its enabled state, permission
+        diagnosis and undo action. Returns an empty string if the user may
+        not view the rack.
+        """
+        user = request.user
+        with metrics.phase("permissions"):
+            state = caching.get_button_state(user, rack, lambda: cls._get_button_state(user, rack))
+        if not state["visible"]:
             return ""
 
-        missing_permissions = self._get_missing_permissions(user, rack)
+        missing_permissions = state["missing_permissions"]
         disabled = bool(missing_permissions)
         permission_issue = ""
         if disabled:
-            permission_issue = (
-                "Permission issues prevent you from performing this action. Missing: "
-                + "; ".join(missing_permissions)
+            permission_issue = "Permission issues prevent you from performing this action. Missing: " + "; ".join(
+                missing_permissions
             )
 
-        return self.render(
-            "netbox_rack_inverter/inc/rack_convert_to_descending_units_button.html",
-            extra_context={
-                "action_url": reverse(
-                    "plugins:netbox_rack_inverter:rack_toggle_units_order",
-                    kwargs={"pk": rack.pk},
-                ),
-                "rack": rack,
-                "disabled": disabled,
-                "permission_issue": permission_issue,
-            },
-        )
+        undo_url = None
+        if state["undo_toggle_id"] is not None:
+            undo_url = reverse(
+                "plugins:netbox_rack_inverter:racktoggle_undo",
+                kwargs={"pk": state["undo_toggle_id"]},
+            )
+
+        template_name = "netbox_rack_inverter/inc/rack_convert_to_descending_units_button.html"
+        context = {
+            "action_url": reverse(
+                "plugins:netbox_rack_inverter:rack_toggle_units_order",
+                kwargs={"pk": rack.pk},
+            ),
+            "desc_units": rack.desc_units,
+            "disabled": disabled,
+            "permission_issue": permission_issue,
+            "undo_url": undo_url,
+        }
+        with metrics.phase("render"):
+            # Render without the request so the output is user-independent;
+            # the CSRF token is filled in per request.
+            html = caching.get_rendered_fragment(
+                template_name,
+                context,
+                lambda: render_to_string(template_name, {**context, "csrf_token": caching.CSRF_TOKEN_PLACEHOLDER}),
+            )
+            return html.replace(caching.CSRF_TOKEN_PLACEHOLDER, get_token(request))
 
 
 template_extensions = [RackConvertToDescendingUnitsButton]
@@ -17,9 +17,36 @@ from users.constants import TOKEN_PREFIX
 from users.models import ObjectPermission, Token
 from utilities.permissions import resolve_permission_type
 
+from .factories import (
+    RackFixture,
+    create_device_role,
+    create_device_type,
+    create_rack,
+    create_racks,
+    create_site,
+)
+
 User = get_user_model()
 
 
+def _create_user(username: str, is_superuser: bool = False) -> User:
+    return User.objects.create_user(
+        username=username,
+        email=f"{username}@example.com",
+        is_superuser=is_superuser,
+        password="testpass123"
+    )
+
+
+def _grant_permissions(user, *permissions: str):
+    for name in permissions:
+        object_type, action = resolve_permission_type(name)
+        obj_perm = ObjectPermission(name=name, actions=[action])
+        obj_perm.save()
+        obj_perm.users.add(user)
+        obj_perm.object_types.add(object_type)
+
+
 class PluginTestCase(DjangoTestCase):
     """
     Base test case for plugin tests with common setup and utilities.
@@ -35,10 +62,14 @@ class PluginTestCase(DjangoTestCase):
 
     def setUp(self):
         """Create a test user with optional permissions."""
-        self.user = self.create_test_user()
+        self.set_up_user()
         self.client = Client()
         self.client.force_login(self.user)
 
+    def set_up_user(self):
+        """Create the test user and grant it `user_permissions`."""
+        self.user = self.create_test_user()
+
         # Add permissions if specified
         if self.user_permissions:
             self.add_permissions(*self.user_permissions)
@@ -55,12 +86,7 @@ class PluginTestCase(DjangoTestCase):
         Returns:
             User instance
         """
-        return User.objects.create_user(
-            username=username,
-            email=f"{username}@example.com",
-            is_superuser=is_superuser,
-            password="testpass123"
-        )
+        return _create_user(username, is_superuser)
 
     def add_permissions(self, *permissions: str):
         """
@@ -76,12 +102,7 @@ class PluginTestCase(DjangoTestCase):
                 "dcim.change_rack",
             )
         """
-        for name in permissions:
-            object_type, action = resolve_permission_type(name)
-            obj_perm = ObjectPermission(name=name, actions=[action])
-            obj_perm.save()
-            obj_perm.users.add(self.user)
-            obj_perm.object_types.add(object_type)
+        _grant_permissions(self.user, *permissions)
 
     def remove_permissions(self, *permissions: str):
         """
@@ -436,10 +457,112 @@ class PluginGraphQLTestCase(PluginTestCase):
                            f"Expected {expected_count} results, got {actual_count}")
 
 
+class SharedTestDataMixin:
+    """
+    Create the test user and its `user_permissions` once per test class in
+    setUpTestData() instead of once per test.
+
+    Subclasses add their own class-level fixtures by extending
+    setUpTestData(), typically with the bulk factories:
+
+        class LargeRackTestCase(PluginSharedTestCase):
+            user_permissions = ["dcim.view_rack"]
+
+            @classmethod
+            def setUpTestData(cls):
+                super().setUpTestData()
+                cls.fixture = create_rack("Rack-Large", devices=40)
+
+    Django restores a fresh copy of class-level objects for every test, so
+    tests may modify them. Permissions added with add_permissions() inside
+    a test are rolled back after it.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = _create_user("testuser")
+        _grant_permissions(cls.user, *cls.user_permissions)
+
+    def set_up_user(self):
+        """The user already exists; see setUpTestData()."""
+
+
+class PluginSharedTestCase(SharedTestDataMixin, PluginTestCase):
+    """PluginTestCase with the user created in setUpTestData()."""
+
+
+class PluginSharedAPITestCase(SharedTestDataMixin, PluginAPITestCase):
+    """PluginAPITestCase with the user created in setUpTestData()."""
+
+
+class PluginSharedViewTestCase(SharedTestDataMixin, PluginViewTestCase):
+    """PluginViewTestCase with the user created in setUpTestData()."""
+
+
+class PluginSharedGraphQLTestCase(SharedTestDataMixin, PluginGraphQLTestCase):
+    """PluginGraphQLTestCase with the user created in setUpTestData()."""
+
+
+# Permissions needed to toggle a rack and to undo a toggle.
+TOGGLE_PERMISSIONS = [
+    "dcim.view_rack",
+    "dcim.change_rack",
+    "dcim.change_device",
+    "dcim.change_rackreservation",
+]
+
+
+class RackFixtureMixin:
+    """
+    Create one rack per test class with `create_rack()`, named `rack_name`
+    and built from the `create_racks()` options in `rack_options`. The
+    RackFixture is available as `fixture`, its rack and site as `rack` and
+    `site`.
+
+    Combine it with one of the PluginShared*TestCase classes, usually
+    through a mixin shared by a module's UI and API test cases:
+
+        class RackLockTestMixin(RackFixtureMixin):
+            user_permissions = TOGGLE_PERMISSIONS
+            rack_name = "Rack-Lock"
+            rack_options = {"u_height": 10, "devices": 1}
+
+        class RackLockTestCase(RackLockTestMixin, PluginSharedTestCase):
+            ...
+
+        class RackLockAPITestCase(RackLockTestMixin, PluginSharedAPITestCase):
+            ...
+    """
+
+    rack_name: str = "Factory Rack"
+    rack_options: dict[str, Any] = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.fixture = create_rack(cls.rack_name, **cls.rack_options)
+        cls.rack = cls.fixture.rack
+        cls.site = cls.rack.site
+
+
 __all__ = [
     'PluginTestCase',
     'PluginModelTestCase',
     'PluginAPITestCase',
     'PluginViewTestCase',
     'PluginGraphQLTestCase',
+    "SharedTestDataMixin",
+    "PluginSharedTestCase",
+    "PluginSharedAPITestCase",
+    "PluginSharedViewTestCase",
+    "PluginSharedGraphQLTestCase",
+    "RackFixture",
+    "RackFixtureMixin",
+    "TOGGLE_PERMISSIONS",
+    "create_device_role",
+    "create_device_type",
+    "create_rack",
+    "create_racks",
+    "create_site",
 ]
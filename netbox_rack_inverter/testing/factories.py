@@ -0,0 +1,172 @@
+"""
+Bulk fixture factories for Netbox Rack Inverter tests.
+
+Racks, devices and reservations are written with `bulk_create()`, a few
+queries regardless of size, so tests and benchmarks can use racks with
+hundreds of objects. `save()` and signals are bypassed: devices get no
+components from their device type, and the RackEligibility rows of the new
+racks are refreshed explicitly.
+"""
+
+from dataclasses import dataclass, field
+
+from dcim.choices import DeviceFaceChoices
+from dcim.models import Device, DeviceRole, DeviceType, Manufacturer, Rack, RackReservation, Site
+from django.contrib.auth import get_user_model
+
+from .. import eligibility
+
+__all__ = (
+    "RackFixture",
+    "create_device_role",
+    "create_device_type",
+    "create_rack",
+    "create_racks",
+    "create_site",
+)
+
+
+@dataclass
+class RackFixture:
+    """
+    A rack created by `create_racks()` with its devices and reservations in
+    unit number order.
+    """
+
+    rack: Rack
+    devices: list[Device] = field(default_factory=list)
+    reservations: list[RackReservation] = field(default_factory=list)
+
+
+def create_site(name: str = "Factory Site") -> Site:
+    """
+    Return the site called `name`, creating it if needed.
+    """
+    site, _ = Site.objects.get_or_create(slug=name.lower().replace(" ", "-"), defaults={"name": name})
+    return site
+
+
+def create_device_role(name: str = "Factory Role") -> DeviceRole:
+    """
+    Return the device role called `name`, creating it if needed.
+    """
+    role, _ = DeviceRole.objects.get_or_create(
+        slug=name.lower().replace(" ", "-"),
+        defaults={"name": name, "color": "9e9e9e"},
+    )
+    return role
+
+
+def create_device_type(u_height: int = 1) -> DeviceType:
+    """
+    Return a device type of the given height, creating it if needed.
+    """
+    manufacturer, _ = Manufacturer.objects.get_or_create(slug="factory-mfg", defaults={"name": "Factory Mfg"})
+    device_type, _ = DeviceType.objects.get_or_create(
+        manufacturer=manufacturer,
+        slug=f"factory-{u_height}u",
+        defaults={"model": f"Factory {u_height}U", "u_height": u_height},
+    )
+    return device_type
+
+
+def create_racks(count: int, *, name_prefix: str = "Factory Rack", **kwargs) -> list[RackFixture]:
+    """
+    Create `count` racks, each holding `devices` front-mounted devices
+    stacked from the first unit and `reservations` single-unit reservations
+    from the last unit down, using three bulk inserts in total.
+
+    Args:
+        count: Number of racks
+        name_prefix: Racks are named "<name_prefix> <n>"; devices are named
+            after their rack and position
+        site: Site of the racks and devices (default: `create_site()`)
+        u_height: Height of each rack
+        starting_unit: First unit number of each rack
+        desc_units: Unit order of each rack
+        devices: Number of devices per rack
+        device_height: Height of each device in units
+        reservations: Number of reservations per rack
+        user: Owner of the reservations (default: a "factory" user)
+
+    Returns:
+        A RackFixture per rack, in creation order
+
+    Raises:
+        ValueError: If the devices and reservations do not fit in the rack
+    """
+    return _create_racks([f"{name_prefix} {index}" for index in range(1, count + 1)], **kwargs)
+
+
+def create_rack(name: str = "Factory Rack", **kwargs) -> RackFixture:
+    """
+    Create a single rack named `name`; see `create_racks()` for the options.
+    """
+    return _create_racks([name], **kwargs)[0]
+
+
+def _create_racks(
+    names,
+    *,
+    site: Site | None = None,
+    u_height: int = 42,
+    starting_unit: int = 1,
+    desc_units: bool = False,
+    devices: int = 0,
+    device_height: int = 1,
+    reservations: int = 0,
+    user=None,
+):
+    if devices * device_height + reservations > u_height:
+        raise ValueError(
+            f"{devices} {device_height}U device(s) and {reservations} reservation(s) do not fit in a {u_height}U rack."
+        )
+
+    site = site or create_site()
+    racks = Rack.objects.bulk_create(
+        [
+            Rack(name=name, site=site, u_height=u_height, starting_unit=starting_unit, desc_units=desc_units)
+            for name in names
+        ]
+    )
+    fixtures = [RackFixture(rack) for rack in racks]
+
+    if devices:
+        device_type = create_device_type(device_height)
+        role = create_device_role()
+        for fixture in fixtures:
+            fixture.devices = [
+                Device(
+                    name=f"{fixture.rack.name}-{position}",
+                    device_type=device_type,
+                    role=role,
+                    site=site,
+                    rack=fixture.rack,
+                    position=position,
+                    face=DeviceFaceChoices.FACE_FRONT,
+                )
+                for position in range(starting_unit, starting_unit + devices * device_height, device_height)
+            ]
+        Device.objects.bulk_create([device for fixture in fixtures for device in fixture.devices])
+
+    if reservations:
+        if user is None:
+            user, _ = get_user_model().objects.get_or_create(username="factory")
+        top_unit = starting_unit + u_height - 1
+        for fixture in fixtures:
+            fixture.reservations = [
+                RackReservation(
+                    rack=fixture.rack,
+                    units=[unit],
+                    user=user,
+                    description=f"{fixture.rack.name} U{unit}",
+                )
+                for unit in range(top_unit - reservations + 1, top_unit + 1)
+            ]
+        RackReservation.objects.bulk_create(
+            [reservation for fixture in fixtures for reservation in fixture.reservations]
+        )
+
+    # bulk_create() does not send the signals that maintain eligibility.
+    eligibility.refresh_rack_eligibility([rack.pk for rack in racks])
+    return fixtures
@@ -0,0 +1,352 @@
+"""
+Concurrency stress harness for rack toggles.
+
+`run_stress()` posts toggles to RackToggleUnitsOrderView and moves devices
+between racks from worker threads, each with its own database connection,
+and returns a StressReport with throughput, latency percentiles, rack and
+row lock waits, rejected toggles, deadlocks and lost updates.
+
+Workers only see committed data, so the harness must run from a
+`TransactionTestCase` against PostgreSQL; see `tests/test_stress.py`.
+"""
+
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from unittest import mock
+
+from dcim.models import Device, Rack
+from django.db import connections, transaction
+from django.test import Client
+from django.urls import reverse
+
+from .. import locking, metrics, utils
+from ..models import RackToggle
+from ..remap import remap_position_for_descending_units
+
+__all__ = (
+    "StressReport",
+    "run_stress",
+)
+
+DEADLOCK_SQLSTATE = "40P01"
+
+
+@dataclass
+class StressReport:
+    """
+    Outcome of one stress run.
+    """
+
+    scenario: str
+    duration: float = 0.0
+    latencies: dict = field(default_factory=dict)
+    rack_lock_waits: list = field(default_factory=list)
+    lock_waits: list = field(default_factory=list)
+    outcomes: Counter = field(default_factory=Counter)
+    rejected: Counter = field(default_factory=Counter)
+    deadlocks: int = 0
+    errors: list = field(default_factory=list)
+    lost_updates: list = field(default_factory=list)
+
+    @property
+    def operations(self):
+        # Completed operations only; rejected toggles are counted apart.
+        return sum(len(latencies) for latencies in self.latencies.values())
+
+    @property
+    def throughput(self):
+        return self.operations / self.duration if self.duration else 0.0
+
+    def percentile(self, kind, q):
+        """
+        Return the `q`th percentile (0-100) latency of `kind` operations in
+        seconds, or None if there were none.
+        """
+        return _percentile(self.latencies.get(kind, ()), q)
+
+    def summary(self):
+        lines = [
+            f"{self.scenario}: {self.operations} operations in {self.duration:.2f}s ({self.throughput:.1f}/s)",
+        ]
+        for kind, latencies in sorted(self.latencies.items()):
+            lines.append(
+                f"  {kind}: {len(latencies)} completed, {self.rejected[kind]} rejected, "
+                f"p50 {_ms(self.percentile(kind, 50))}, p99 {_ms(self.percentile(kind, 99))}"
+            )
+        for name, waits in (("rack lock wait", self.rack_lock_waits), ("row lock wait", self.lock_waits)):
+            lines.append(
+                f"  {name}: p50 {_ms(_percentile(waits, 50))}, p99 {_ms(_percentile(waits, 99))}, "
+                f"max {_ms(max(waits, default=None))}"
+            )
+        lines.append(f"  toggle outcomes: {dict(self.outcomes)}")
+        lines.append(
+            f"  deadlocks: {self.deadlocks}, errors: {len(self.errors)}, lost updates: {len(self.lost_updates)}"
+        )
+        lines.extend(f"  error: {error}" for error in self.errors)
+        lines.extend(f"  lost update: {lost}" for lost in self.lost_updates)
+        return "\n".join(lines)
+
+
+def _percentile(values, q):
+    # Nearest-rank percentile.
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))]
+
+
+def _ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.1f} ms"
+
+
+def _is_deadlock(exc):
+    while exc is not None:
+        # psycopg 3 exposes `sqlstate`, psycopg2 `pgcode`.
+        if DEADLOCK_SQLSTATE in (getattr(exc, "sqlstate", None), getattr(exc, "pgcode", None)):
+            return True
+        exc = exc.__cause__
+    return False
+
+
+class _Recorder(metrics.MetricsSink):
+    """
+    Collects worker results and the metrics of every tracked toggle.
+    """
+
+    # Outcomes of toggles that ran; any other outcome (RackBusy, ...) means
+    # the toggle was rejected.
+    COMPLETED_OUTCOMES = ("toggled", "noop")
+
+    def __init__(self, report):
+        self.report = report
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def emit(self, operation_metrics):
+        if operation_metrics.operation != "toggle":
+            return
+        # Sinks run in the thread of the operation, so each worker can look
+        # up the outcome of its own request.
+        self.local.outcome = operation_metrics.outcome
+        with self.lock:
+            self.report.outcomes[operation_metrics.outcome] += 1
+            if "rack_lock" in operation_metrics.phases:
+                self.report.rack_lock_waits.append(operation_metrics.phases["rack_lock"])
+            if "lock" in operation_metrics.phases:
+                self.report.lock_waits.append(operation_metrics.phases["lock"])
+
+    def pop_outcome(self):
+        outcome, self.local.outcome = getattr(self.local, "outcome", None), None
+        return outcome
+
+    def completed(self, kind, latency):
+        with self.lock:
+            self.report.latencies.setdefault(kind, []).append(latency)
+
+    def rejected(self, kind):
+        with self.lock:
+            self.report.rejected[kind] += 1
+
+    def failed(self, kind, exc):
+        with self.lock:
+            if _is_deadlock(exc):
+                self.report.deadlocks += 1
+            else:
+                self.report.errors.append(f"{kind}: {type(exc).__name__}: {exc}")
+
+
+def _toggle_worker(recorder, barrier, *, user, rack_pks, operations, seed):
+    rng = random.Random(seed)
+    client = Client()
+    client.force_login(user)
+    barrier.wait()
+    for _ in range(operations):
+        url = reverse("plugins:netbox_rack_inverter:rack_toggle_units_order", kwargs={"pk": rng.choice(rack_pks)})
+        started = time.perf_counter()
+        try:
+            client.post(url)
+        except Exception as e:
+            recorder.failed("toggle", e)
+        else:
+            # The view answers a rejected toggle with a redirect and a
+            # message, like a completed one.
+            if recorder.pop_outcome() in recorder.COMPLETED_OUTCOMES:
+                recorder.completed("toggle", time.perf_counter() - started)
+            else:
+                recorder.rejected("toggle")
+
+
+def _move_worker(recorder, barrier, *, device_pks, rack_pks, operations, seed, moved):
+    # Edit devices the way NetBox's edit views do: read without a lock, then
+    # save every field.
+    rng = random.Random(seed)
+    barrier.wait()
+    for _ in range(operations):
+        device_pk = rng.choice(device_pks)
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                device = Device.objects.get(pk=device_pk)
+                device.rack = Rack.objects.get(pk=rng.choice([pk for pk in rack_pks if pk != device.rack_id]))
+                device.save()
+        except Exception as e:
+            recorder.failed("move", e)
+        else:
+            moved[device_pk] = device.rack_id
+            recorder.completed("move", time.perf_counter() - started)
+
+
+def _run_worker(target, **kwargs):
+    try:
+        target(**kwargs)
+    finally:
+        connections.close_all()
+
+
+def _snapshot(rack_pks, device_pks):
+    racks = {
+        rack["pk"]: rack
+        for rack in Rack.objects.filter(pk__in=rack_pks).values("pk", "desc_units", "starting_unit", "u_height")
+    }
+    devices = {
+        device["pk"]: device
+        for device in Device.objects.filter(pk__in=device_pks).values(
+            "pk", "rack_id", "position", "device_type__u_height"
+        )
+    }
+    return racks, devices
+
+
+def _find_lost_updates(before, after, toggle_counts, pinned_pks, moved):
+    racks_before, devices_before = before
+    racks_after, devices_after = after
+    lost = []
+
+    for pk, rack in racks_before.items():
+        toggled = toggle_counts.get(pk, 0) % 2 == 1
+        if racks_after[pk]["desc_units"] != (rack["desc_units"] ^ toggled):
+            lost.append(
+                f"rack {pk}: {toggle_counts.get(pk, 0)} toggles recorded but desc_units is "
+                f"{racks_after[pk]['desc_units']}"
+            )
+
+    for pk, device in devices_before.items():
+        final = devices_after[pk]
+        if pk not in pinned_pks:
+            expected_rack = moved.get(pk, device["rack_id"])
+            if final["rack_id"] != expected_rack:
+                lost.append(f"device {pk}: in rack {final['rack_id']}, last moved to rack {expected_rack}")
+            continue
+
+        rack = racks_before[device["rack_id"]]
+        expected = device["position"]
+        if toggle_counts.get(device["rack_id"], 0) % 2 == 1:
+            expected = remap_position_for_descending_units(
+                position=device["position"],
+                device_height=max(int(device["device_type__u_height"] or 1), 1),
+                rack_starting_unit=rack["starting_unit"] or 1,
+                rack_u_height=rack["u_height"],
+            )
+        if (final["rack_id"], final["position"]) != (device["rack_id"], expected):
+            lost.append(
+                f"device {pk}: expected rack {device['rack_id']} position {expected}, "
+                f"found rack {final['rack_id']} position {final['position']}"
+            )
+    return lost
+
+
+def run_stress(
+    scenario,
+    *,
+    user,
+    racks,
+    pinned_devices,
+    floating_devices=(),
+    toggle_workers=4,
+    move_workers=0,
+    operations=25,
+    concurrency_mode="pessimistic",
+    rack_lock_timeout=None,
+    seed=0,
+):
+    """
+    Run `toggle_workers` threads that each toggle random `racks`
+    `operations` times through the view, and `move_workers` threads that
+    each move their share of `floating_devices` between `racks` as often.
+    Moved devices keep their position, so the racks should share one
+    geometry.
+
+    With the default `rack_lock_timeout` of None the `rack_lock_timeout`
+    setting applies, so by default toggles of a rack another worker is
+    changing fail fast and are reported as rejected. Pass a number of
+    seconds to have them wait for the rack instead.
+
+    Devices in `pinned_devices` must not be edited by anything else while
+    the harness runs: their final positions are checked against the number
+    of toggles recorded for their rack. Floating devices must end up in the
+    rack they were last moved to, and every rack's unit order must match the
+    number of toggles recorded for it.
+    """
+    report = StressReport(scenario)
+    recorder = _Recorder(report)
+    rack_pks = [rack.pk for rack in racks]
+    pinned_pks = {device.pk for device in pinned_devices}
+    floating_pks = [device.pk for device in floating_devices]
+    before = _snapshot(rack_pks, [*pinned_pks, *floating_pks])
+    last_toggle_pk = RackToggle.objects.order_by("-pk").values_list("pk", flat=True).first() or 0
+    moved = {}
+
+    workers = [
+        {
+            "target": _toggle_worker,
+            "user": user,
+            "rack_pks": rack_pks,
+            "operations": operations,
+            "seed": seed + index,
+        }
+        for index in range(toggle_workers)
+    ]
+    if floating_pks:
+        # Each mover owns its devices, so the last recorded move of a device
+        # is also the last one committed.
+        workers += [
+            {
+                "target": _move_worker,
+                "device_pks": floating_pks[index::move_workers],
+                "rack_pks": rack_pks,
+                "operations": operations,
+                "seed": seed + toggle_workers + index,
+                "moved": moved,
+            }
+            for index in range(move_workers)
+            if floating_pks[index::move_workers]
+        ]
+    barrier = threading.Barrier(len(workers) + 1)
+    threads = [
+        threading.Thread(target=_run_worker, kwargs={**worker, "recorder": recorder, "barrier": barrier})
+        for worker in workers
+    ]
+
+    rack_lock_timeout = locking._get_rack_lock_timeout() if rack_lock_timeout is None else rack_lock_timeout
+    with (
+        mock.patch.object(metrics, "get_sinks", return_value=(recorder,)),
+        mock.patch.object(utils, "_get_concurrency_mode", return_value=concurrency_mode),
+        mock.patch.object(locking, "_get_rack_lock_timeout", return_value=rack_lock_timeout),
+    ):
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        report.duration = time.perf_counter() - started
+
+    toggle_counts = Counter(
+        RackToggle.objects.filter(rack_id__in=rack_pks, pk__gt=last_toggle_pk).values_list("rack_id", flat=True)
+    )
+    after = _snapshot(rack_pks, [*pinned_pks, *floating_pks])
+    report.lost_updates = _find_lost_updates(before, after, toggle_counts, pinned_pks, moved)
+    return report
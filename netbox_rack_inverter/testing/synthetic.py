@@ -0,0 +1,208 @@
+"""
+Synthetic rack topologies for load and scale testing.
+
+`generate_topology()` writes sites, racks of varied heights, starting units
+and unit orders, front and rear mounted devices of mixed heights (including
+half-depth pairs sharing a unit) and reservations, in batches of
+`bulk_create()` calls. Layouts come from a seeded `random.Random`, so the
+same seed produces the same topology. Every object fits its rack, so each
+generated rack can be toggled.
+"""
+
+import random
+from dataclasses import dataclass
+
+from dcim.choices import DeviceFaceChoices
+from dcim.models import Device, DeviceType, Manufacturer, Rack, RackReservation, Site
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .. import eligibility
+from .factories import create_device_role
+
+__all__ = (
+    "SyntheticSummary",
+    "generate_topology",
+    "plan_rack_layout",
+)
+
+# Weighted towards the common 42U rack.
+RACK_HEIGHTS = (42, 42, 42, 42, 42, 45, 47, 48, 24, 12)
+DEVICE_HEIGHTS = (1, 1, 1, 1, 2, 2, 2, 3, 4)
+HALF_DEPTH = "half"
+
+DESC_UNITS_RATE = 0.25
+NONSTANDARD_START_RATE = 0.1
+HALF_DEPTH_RATE = 0.15
+MAX_RESERVATIONS = 3
+MAX_RESERVATION_UNITS = 4
+
+
+@dataclass
+class SyntheticSummary:
+    sites: int = 0
+    racks: int = 0
+    devices: int = 0
+    reservations: int = 0
+
+
+def plan_rack_layout(rng, *, u_height, starting_unit, fill, reservation_rate):
+    """
+    Lay out one rack. Walking up from the first unit, each free unit starts
+    a device with probability `fill`; a rack gets reservations on free
+    units with probability `reservation_rate`.
+
+    Returns (devices, reservations): devices as (device type key, position,
+    face) where the key is a height or HALF_DEPTH, and reservations as lists
+    of units.
+    """
+    devices = []
+    free = []
+    offset = 0
+    while offset < u_height:
+        height = rng.choice(DEVICE_HEIGHTS)
+        if rng.random() >= fill or offset + height > u_height:
+            free.append(offset)
+            offset += 1
+            continue
+        position = starting_unit + offset
+        if height == 1 and rng.random() < HALF_DEPTH_RATE:
+            devices.append((HALF_DEPTH, position, DeviceFaceChoices.FACE_FRONT))
+            if rng.random() < 0.5:
+                devices.append((HALF_DEPTH, position, DeviceFaceChoices.FACE_REAR))
+        else:
+            devices.append((height, position, rng.choice((DeviceFaceChoices.FACE_FRONT, DeviceFaceChoices.FACE_REAR))))
+        offset += height
+
+    reservations = []
+    if free and rng.random() < reservation_rate:
+        free_units = set(free)
+        for _ in range(rng.randint(1, MAX_RESERVATIONS)):
+            if not free_units:
+                break
+            offset = rng.choice(sorted(free_units))
+            units = []
+            while offset in free_units and len(units) < MAX_RESERVATION_UNITS:
+                free_units.discard(offset)
+                units.append(starting_unit + offset)
+                offset += 1
+            reservations.append(units)
+    return devices, reservations
+
+
+def _get_device_types():
+    manufacturer, _ = Manufacturer.objects.get_or_create(slug="synthetic", defaults={"name": "Synthetic"})
+    device_types = {}
+    for height in sorted(set(DEVICE_HEIGHTS)):
+        device_types[height], _ = DeviceType.objects.get_or_create(
+            manufacturer=manufacturer,
+            slug=f"synthetic-{height}u",
+            defaults={"model": f"Synthetic {height}U", "u_height": height},
+        )
+    device_types[HALF_DEPTH], _ = DeviceType.objects.get_or_create(
+        manufacturer=manufacturer,
+        slug="synthetic-1u-half-depth",
+        defaults={"model": "Synthetic 1U half-depth", "u_height": 1, "is_full_depth": False},
+    )
+    return device_types
+
+
+def generate_topology(
+    *,
+    sites=10,
+    racks=1000,
+    seed=0,
+    fill=0.6,
+    reservation_rate=0.2,
+    prefix="synthetic",
+    batch_size=500,
+    user=None,
+    progress=None,
+):
+    """
+    Create `sites` sites and `racks` racks spread evenly across them, with
+    devices and reservations laid out by plan_rack_layout(). Each batch of
+    `batch_size` racks is written in its own transaction and its
+    RackEligibility rows are refreshed.
+
+    Object names start with `prefix`, so a second topology needs a different
+    prefix. `user` owns the reservations (default: a "synthetic" user).
+    `progress`, if given, is called with the running SyntheticSummary after
+    every batch.
+
+    Returns the final SyntheticSummary.
+    """
+    if Site.objects.filter(slug__startswith=f"{prefix}-site-").exists():
+        raise ValueError(f'A synthetic topology with the prefix "{prefix}" already exists.')
+
+    rng = random.Random(seed)
+    if user is None:
+        user, _ = get_user_model().objects.get_or_create(username="synthetic")
+    device_types = _get_device_types()
+    role = create_device_role("Synthetic")
+    summary = SyntheticSummary()
+
+    site_objects = Site.objects.bulk_create(
+        [Site(name=f"{prefix} site {index}", slug=f"{prefix}-site-{index}") for index in range(1, sites + 1)]
+    )
+    summary.sites = len(site_objects)
+
+    for start in range(0, racks, batch_size):
+        with transaction.atomic():
+            rack_objects = []
+            layouts = []
+            for index in range(start, min(start + batch_size, racks)):
+                u_height = rng.choice(RACK_HEIGHTS)
+                starting_unit = rng.randint(2, 40) if rng.random() < NONSTANDARD_START_RATE else 1
+                rack_objects.append(
+                    Rack(
+                        name=f"{prefix}-rack-{index + 1:06d}",
+                        site=site_objects[index % len(site_objects)],
+                        u_height=u_height,
+                        starting_unit=starting_unit,
+                        desc_units=rng.random() < DESC_UNITS_RATE,
+                    )
+                )
+                layouts.append(
+                    plan_rack_layout(
+                        rng,
+                        u_height=u_height,
+                        starting_unit=starting_unit,
+                        fill=fill,
+                        reservation_rate=reservation_rate,
+                    )
+                )
+            Rack.objects.bulk_create(rack_objects)
+
+            device_objects = []
+            reservation_objects = []
+            for rack, (devices, reservations) in zip(rack_objects, layouts, strict=True):
+                for number, (key, position, face) in enumerate(devices, start=1):
+                    device_objects.append(
+                        Device(
+                            name=f"{rack.name}-{number}",
+                            device_type=device_types[key],
+                            role=role,
+                            site=rack.site,
+                            rack=rack,
+                            position=position,
+                            face=face,
+                        )
+                    )
+                reservation_objects.extend(
+                    RackReservation(rack=rack, units=units, user=user, description=f"{rack.name} reservation")
+                    for units in reservations
+                )
+            Device.objects.bulk_create(device_objects, batch_size=batch_size * 10)
+            RackReservation.objects.bulk_create(reservation_objects, batch_size=batch_size * 10)
+
+            # bulk_create() does not send the signals that maintain eligibility.
+            eligibility.refresh_rack_eligibility([rack.pk for rack in rack_objects])
+
+        summary.racks += len(rack_objects)
+        summary.devices += len(device_objects)
+        summary.reservations += len(reservation_objects)
+        if progress:
+            progress(summary)
+
+    return summary
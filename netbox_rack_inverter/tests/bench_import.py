@@ -0,0 +1,123 @@
+"""
+Import-time budget for the plugin.
+
+Not collected by test discovery (the file does not match test*.py); CI runs
+it by its label after the test suite:
+
+    manage.py test netbox_rack_inverter.tests.bench_import
+
+Each run starts a fresh interpreter with `python -X importtime`, calls
+`django.setup()` (which imports the plugin and runs its `ready()`) and then
+loads the URLconf, as a recycled gunicorn worker does on its first request.
+The cumulative import time attributed to the plugin's modules in each step
+is checked against a budget of DEFAULT_BUDGET_MS. The default is a ceiling
+with ample headroom for slow CI runners, meant to catch modules that start
+importing something heavy at boot rather than small drifts. To hold an
+install to a tighter budget, set RACK_INVERTER_IMPORT_BUDGET_MS and
+RACK_INVERTER_URLCONF_BUDGET_MS from the times printed by a run. The fastest of
+RACK_INVERTER_IMPORT_RUNS runs (default 3) is used; NetBox modules the
+plugin imports first are counted against it.
+"""
+
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+PLUGIN = "netbox_rack_inverter"
+DEFAULT_BUDGET_MS = 500
+IMPORT_BUDGET_MS = float(os.environ.get("RACK_INVERTER_IMPORT_BUDGET_MS", DEFAULT_BUDGET_MS))
+URLCONF_BUDGET_MS = float(os.environ.get("RACK_INVERTER_URLCONF_BUDGET_MS", DEFAULT_BUDGET_MS))
+RUNS = int(os.environ.get("RACK_INVERTER_IMPORT_RUNS", 3))
+MARKER = "rack-inverter-bench: urlconf"
+
+SCRIPT = f"""
+import sys
+
+import django
+
+django.setup()
+sys.stderr.write("{MARKER}\\n")
+sys.stderr.flush()
+
+from django.urls import get_resolver
+
+get_resolver().url_patterns
+"""
+
+
+def _is_plugin(name):
+    return name == PLUGIN or name.startswith(f"{PLUGIN}.")
+
+
+def plugin_import_times(lines):
+    """
+    Return {module: cumulative microseconds} for the plugin modules that
+    were imported by non-plugin code, from `-X importtime` output. Their
+    cumulative times include everything the plugin pulled in.
+    """
+    entries = []
+    for line in lines:
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        entries.append((len(name) - len(name.lstrip()), name.strip(), int(cumulative)))
+
+    times = {}
+    # A module is listed after the modules it imports, one level deeper.
+    for index, (indent, name, cumulative) in enumerate(entries):
+        if not _is_plugin(name):
+            continue
+        parent = next((other for depth, other, _ in entries[index + 1 :] if depth < indent), None)
+        if parent is None or not _is_plugin(parent):
+            times[name] = cumulative
+    return times
+
+
+def measure():
+    """
+    Return ({module: us} for django.setup(), {module: us} for the URLconf)
+    from a fresh interpreter.
+    """
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE,
+        "PYTHONPATH": os.pathsep.join(path for path in sys.path if path),
+    }
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    setup, _, urlconf = result.stderr.partition(f"{MARKER}\n")
+    return plugin_import_times(setup.splitlines()), plugin_import_times(urlconf.splitlines())
+
+
+def _report(name, times):
+    top = ", ".join(f"{module} {us / 1000:.1f}ms" for module, us in sorted(times.items(), key=lambda i: -i[1])[:5])
+    sys.stderr.write(f"\n{name}: {sum(times.values()) / 1000:.1f}ms ({top})")
+
+
+class ImportTimeBenchmark(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        runs = [measure() for _ in range(max(RUNS, 1))]
+        cls.setup_times = min((setup for setup, _ in runs), key=lambda times: sum(times.values()))
+        cls.urlconf_times = min((urlconf for _, urlconf in runs), key=lambda times: sum(times.values()))
+
+    def _assert_within_budget(self, name, times, budget_ms):
+        _report(name, times)
+        self.assertTrue(times, f"No plugin modules were imported during {name}.")
+        total_ms = sum(times.values()) / 1000
+        self.assertLessEqual(total_ms, budget_ms, f"{name} imports took {total_ms:.1f}ms: {times}")
+
+    def test_plugin_import(self):
+        self._assert_within_budget("plugin import", self.setup_times, IMPORT_BUDGET_MS)
+
+    def test_urlconf_loading(self):
+        self._assert_within_budget("URLconf loading", self.urlconf_times, URLCONF_BUDGET_MS)
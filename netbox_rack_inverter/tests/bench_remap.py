@@ -0,0 +1,89 @@
+"""
+Micro-benchmark of the rack unit remapping kernels.
+
+Not collected by test discovery (the file does not match test*.py); run it
+by its label:
+
+    manage.py test netbox_rack_inverter.tests.bench_remap
+
+RACK_INVERTER_BENCH_CALLS sets the number of calls per kernel (default
+200000). Calls per second are written to stderr.
+"""
+
+import os
+import random
+import sys
+import time
+
+from django.test import SimpleTestCase
+
+from ..remap import get_remap_table, is_valid_unit_span_for_rack, remap_position_for_descending_units
+from ..utils import plan_rack_toggle
+from .test_remap_properties import random_object, random_rack
+
+CALLS = int(os.environ.get("RACK_INVERTER_BENCH_CALLS", 200000))
+# Objects per rack for the batched kernel.
+BATCH = 40
+# (starting_unit, u_height) of typical racks.
+COMMON_GEOMETRIES = ((1, 42), (1, 45), (1, 48), (1, 24))
+
+
+def _report(name, calls, elapsed):
+    sys.stderr.write(f"\n{name}: {calls / elapsed:,.0f} calls/s ({calls} calls in {elapsed:.3f}s)")
+
+
+class RemapBenchmark(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = random.Random(0)
+        cls.cases = []
+        for _ in range(CALLS):
+            starting_unit, u_height = random_rack(rng)
+            cls.cases.append((*random_object(rng, starting_unit, u_height, valid=True), starting_unit, u_height))
+        cls.racks = []
+        for _ in range(max(CALLS // BATCH, 1)):
+            starting_unit, u_height = random_rack(rng)
+            devices = [(pk, *random_object(rng, starting_unit, u_height, valid=True)) for pk in range(BATCH)]
+            cls.racks.append((starting_unit, u_height, devices))
+
+    def test_remap_position_for_descending_units(self):
+        started = time.perf_counter()
+        for position, height, starting_unit, u_height in self.cases:
+            remap_position_for_descending_units(
+                position=position,
+                device_height=height,
+                rack_starting_unit=starting_unit,
+                rack_u_height=u_height,
+            )
+        _report("remap_position_for_descending_units", len(self.cases), time.perf_counter() - started)
+
+    def test_is_valid_unit_span_for_rack(self):
+        started = time.perf_counter()
+        for position, height, starting_unit, u_height in self.cases:
+            is_valid_unit_span_for_rack(
+                position=position,
+                object_height=height,
+                rack_starting_unit=starting_unit,
+                rack_u_height=u_height,
+            )
+        _report("is_valid_unit_span_for_rack", len(self.cases), time.perf_counter() - started)
+
+    def test_remap_table(self):
+        # A bulk run: many racks sharing a few geometries, so tables are warm.
+        rng = random.Random(0)
+        cases = []
+        for _ in range(CALLS):
+            starting_unit, u_height = rng.choice(COMMON_GEOMETRIES)
+            cases.append((*random_object(rng, starting_unit, u_height, valid=True), starting_unit, u_height))
+        started = time.perf_counter()
+        for position, height, starting_unit, u_height in cases:
+            get_remap_table(starting_unit, u_height, height).remap(position)
+        _report("get_remap_table().remap (common geometries)", len(cases), time.perf_counter() - started)
+
+    def test_plan_rack_toggle(self):
+        # Counted per device, so the figure compares with the scalar kernels.
+        started = time.perf_counter()
+        for starting_unit, u_height, devices in self.racks:
+            plan_rack_toggle(starting_unit=starting_unit, rack_u_height=u_height, devices=devices, reservations=())
+        _report("plan_rack_toggle (per device)", len(self.racks) * BATCH, time.perf_counter() - started)
@@ -0,0 +1,283 @@
+"""
+Tests for the cached rack button permission state and device type heights.
+"""
+
+from decimal import Decimal
+from unittest import mock
+
+from dcim.choices import DeviceFaceChoices
+from dcim.models import Device, DeviceType, Rack
+from django.core.cache import cache
+from django.db import connection
+from django.middleware.csrf import get_token
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from users.models import ObjectPermission
+from utilities.permissions import resolve_permission_type
+
+from .. import caching, signals, template_content
+from ..template_content import RackConvertToDescendingUnitsButton
+from ..testing import (
+    TOGGLE_PERMISSIONS,
+    PluginSharedTestCase,
+    RackFixtureMixin,
+    create_device_role,
+    create_device_type,
+    create_rack,
+)
+from ..utils import read_rack_layout, toggle_rack_units_order
+
+
+class ButtonStateCacheTestCase(RackFixtureMixin, PluginSharedTestCase):
+    rack_name = "Rack-Cache"
+    rack_options = {"u_height": 12}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_rack = create_rack("Rack-Cache-Other", site=cls.site, u_height=12).rack
+        cls.role = create_device_role()
+        cls.device_type = create_device_type(1)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def _render_fragment(self, rack=None, user=None):
+        request = RequestFactory().get("/")
+        request.user = user or self.user
+        return RackConvertToDescendingUnitsButton.render_fragment(request, rack or Rack.objects.get(pk=self.rack.pk))
+
+    def _reload_user(self):
+        # Object permissions are memoized on the user instance per request.
+        self.user = self.user.__class__.objects.get(pk=self.user.pk)
+
+    def _create_device(self, name, rack=None, position=1):
+        return Device.objects.create(
+            name=name,
+            device_type=self.device_type,
+            role=self.role,
+            site=self.site,
+            rack=rack or self.rack,
+            position=position,
+            face=DeviceFaceChoices.FACE_FRONT,
+        )
+
+    def _grant_constrained_permission(self, permission_name, *, constraints):
+        object_type, action = resolve_permission_type(permission_name)
+        permission = ObjectPermission.objects.create(
+            name=f"cache-scoped-{permission_name}",
+            constraints=constraints,
+            actions=[action],
+        )
+        permission.users.add(self.user)
+        permission.object_types.add(object_type)
+        return permission
+
+    def _restrict_devices_to(self, name):
+        self.add_permissions("dcim.view_rack", "dcim.change_rack", "dcim.change_rackreservation")
+        return self._grant_constrained_permission("dcim.change_device", constraints={"name": name})
+
+    def test_repeated_render_makes_no_queries(self):
+        self.add_permissions(*TOGGLE_PERMISSIONS)
+        self._create_device("cache-device")
+        rack = Rack.objects.get(pk=self.rack.pk)
+        html = self._render_fragment(rack)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self._render_fragment(rack), html)
+
+    def test_mounting_device_invalidates_rack(self):
+        self._restrict_devices_to("allowed")
+        self.assertNotIn("disabled", self._render_fragment())
+
+        self._create_device("blocked")
+        self.assertIn("dcim.change_device on 1 mounted device(s)", self._render_fragment())
+
+    def test_moving_device_invalidates_previous_rack(self):
+        self._restrict_devices_to("allowed")
+        device = self._create_device("blocked")
+        self.assertIn("disabled", self._render_fragment())
+
+        device.snapshot()
+        device.rack = self.other_rack
+        device.save()
+        self.assertNotIn("disabled", self._render_fragment())
+        self.assertIn("disabled", self._render_fragment(Rack.objects.get(pk=self.other_rack.pk)))
+
+    def test_moving_device_without_snapshot_invalidates_previous_rack(self):
+        self._restrict_devices_to("allowed")
+        device = self._create_device("blocked")
+        self.assertIn("disabled", self._render_fragment())
+
+        device.rack = self.other_rack
+        device.save(update_fields=["rack", "position"])
+        self.assertNotIn("disabled", self._render_fragment())
+
+    def test_saves_of_other_fields_do_not_read_previous_rack(self):
+        device = Device.objects.get(pk=self._create_device("cache-device").pk)
+        device.name = "renamed"
+
+        with self.assertNumQueries(0):
+            signals.remember_previous_rack(Device, device, update_fields=frozenset({"name"}))
+        self.assertEqual(device._rack_inverter_previous_rack_id, self.rack.pk)
+
+    def test_other_racks_stay_cached(self):
+        self.add_permissions(*TOGGLE_PERMISSIONS)
+        other_rack = Rack.objects.get(pk=self.other_rack.pk)
+        self._render_fragment(other_rack)
+
+        self._create_device("cache-device")
+        with self.assertNumQueries(0):
+            self._render_fragment(other_rack)
+
+    def test_object_permission_changes_bump_generation(self):
+        permission = self._restrict_devices_to("allowed")
+        generation = cache.get(caching.PERMISSION_GENERATION_KEY)
+
+        permission.constraints = {"name": "blocked"}
+        permission.save()
+        self.assertNotEqual(cache.get(caching.PERMISSION_GENERATION_KEY), generation)
+
+        generation = cache.get(caching.PERMISSION_GENERATION_KEY)
+        permission.users.remove(self.user)
+        self.assertNotEqual(cache.get(caching.PERMISSION_GENERATION_KEY), generation)
+
+    def test_permission_change_is_reflected(self):
+        self._restrict_devices_to("allowed")
+        self._create_device("blocked")
+        self.assertIn("disabled", self._render_fragment())
+
+        ObjectPermission.objects.filter(name="cache-scoped-dcim.change_device").update(constraints=None)
+        self._reload_user()
+        self.assertNotIn("disabled", self._render_fragment())
+
+    def test_users_with_equal_permissions_share_hash(self):
+        self.add_permissions(*TOGGLE_PERMISSIONS)
+        other_user = self.create_test_user("cache-other")
+        for permission in ObjectPermission.objects.filter(users=self.user):
+            permission.users.add(other_user)
+        self._reload_user()
+
+        self.assertEqual(caching.get_permission_set_hash(self.user), caching.get_permission_set_hash(other_user))
+
+    def test_user_token_constraints_are_not_shared(self):
+        self.add_permissions("dcim.view_rack")
+        self._grant_constrained_permission("dcim.change_device", constraints={"description": "$user"})
+        other_user = self.create_test_user("cache-token")
+        for permission in ObjectPermission.objects.filter(users=self.user):
+            permission.users.add(other_user)
+        self._reload_user()
+
+        self.assertNotEqual(caching.get_permission_set_hash(self.user), caching.get_permission_set_hash(other_user))
+
+    def test_zero_timeout_disables_cache(self):
+        self.add_permissions(*TOGGLE_PERMISSIONS)
+        rack = Rack.objects.get(pk=self.rack.pk)
+        with mock.patch.object(caching, "get_plugin_config", return_value=0):
+            self._render_fragment(rack)
+            with CaptureQueriesContext(connection) as queries:
+                self._render_fragment(rack)
+        self.assertTrue(queries.captured_queries)
+
+
+class RenderedFragmentCacheTestCase(RackFixtureMixin, PluginSharedTestCase):
+    user_permissions = TOGGLE_PERMISSIONS
+    rack_name = "Rack-Fragment"
+    rack_options = {"u_height": 12}
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def _render_fragment(self):
+        request = RequestFactory().get("/")
+        request.user = self.user
+        html = RackConvertToDescendingUnitsButton.render_fragment(request, Rack.objects.get(pk=self.rack.pk))
+        return request, html
+
+    def test_fragment_is_rendered_once(self):
+        with mock.patch.object(
+            template_content, "render_to_string", wraps=template_content.render_to_string
+        ) as render_to_string:
+            self._render_fragment()
+            self._render_fragment()
+        self.assertEqual(render_to_string.call_count, 1)
+
+    def test_csrf_token_is_per_request(self):
+        first_request, first_html = self._render_fragment()
+        second_request, second_html = self._render_fragment()
+
+        self.assertNotIn(caching.CSRF_TOKEN_PLACEHOLDER, first_html)
+        self.assertIn(f'value="{get_token(first_request)}"', first_html)
+        self.assertIn(f'value="{get_token(second_request)}"', second_html)
+        self.assertNotEqual(get_token(first_request), get_token(second_request))
+
+    def test_orientation_change_renders_new_fragment(self):
+        _, html = self._render_fragment()
+        self.assertIn("Switch to Descending Units", html)
+
+        self.rack.desc_units = True
+        self.rack.save()
+        _, html = self._render_fragment()
+        self.assertIn("Switch to Ascending Units", html)
+
+
+class DeviceTypeHeightCacheTestCase(RackFixtureMixin, PluginSharedTestCase):
+    user_permissions = TOGGLE_PERMISSIONS
+    rack_name = "Rack-Height"
+    rack_options = {"u_height": 10, "devices": 1}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.device = cls.fixture.devices[0]
+        cls.device_type = cls.device.device_type
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        caching.invalidate_device_types()
+
+    def test_heights_are_loaded_once(self):
+        with CaptureQueriesContext(connection) as first:
+            heights = caching.get_device_type_heights([self.device_type.pk])
+        with CaptureQueriesContext(connection) as second:
+            caching.get_device_type_heights([self.device_type.pk])
+        self.assertEqual(heights, {self.device_type.pk: 1})
+        self.assertEqual(len(first), 1)
+        self.assertEqual(len(second), 0)
+
+    def test_height_change_is_reflected(self):
+        caching.get_device_type_heights([self.device_type.pk])
+        self.device_type.u_height = 2
+        self.device_type.save()
+        self.assertEqual(caching.get_device_type_heights([self.device_type.pk]), {self.device_type.pk: 2})
+        self.assertEqual(read_rack_layout(self.rack.pk)[1][0][2], Decimal(2))
+
+    def test_other_fields_keep_the_cache(self):
+        caching.get_device_type_heights([self.device_type.pk])
+        self.device_type.model = "Height 1U renamed"
+        self.device_type.save()
+        with CaptureQueriesContext(connection) as queries:
+            caching.get_device_type_heights([self.device_type.pk])
+        self.assertEqual(len(queries), 0)
+
+    def test_generation_bump_from_another_process_clears_cache(self):
+        caching.get_device_type_heights([self.device_type.pk])
+        # Another process's signal handler only bumps the shared generation.
+        DeviceType.objects.filter(pk=self.device_type.pk).update(u_height=3)
+        cache.set(caching.DEVICE_TYPE_GENERATION_KEY, "another-process")
+        self.assertEqual(caching.get_device_type_heights([self.device_type.pk]), {self.device_type.pk: 3})
+
+    def test_toggle_does_not_read_device_types(self):
+        caching.get_device_type_heights([self.device_type.pk])
+        for optimistic in (False, True):
+            with self.cleanupSubTest(optimistic=optimistic):
+                with CaptureQueriesContext(connection) as queries:
+                    toggle_rack_units_order(Rack.objects.get(pk=self.rack.pk), user=self.user, optimistic=optimistic)
+                self.device.refresh_from_db()
+                self.assertEqual(self.device.position, 10)
+                self.assertFalse(
+                    [query["sql"] for query in queries if DeviceType._meta.db_table in query["sql"]],
+                )
@@ -0,0 +1,87 @@
+"""
+Tests for the `changelog_snapshots` setting of pessimistic toggles.
+"""
+
+from unittest import mock
+
+from core.models import ObjectChange
+from dcim.models import Device, Rack
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .. import utils
+from ..testing import PluginSharedTestCase, create_rack
+from ..undo import undo_rack_toggle
+from ..utils import toggle_rack_units_order
+
+
+class ChangelogSnapshotsTestCase(PluginSharedTestCase):
+    user_permissions = [
+        "dcim.view_rack",
+        "dcim.change_rack",
+        "dcim.change_device",
+        "dcim.change_rackreservation",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # A 2U device in U1-U2 and reservations of U11 and U12.
+        cls.fixture = create_rack("Rack-Snapshot", u_height=12, devices=1, device_height=2, reservations=2)
+        cls.rack = cls.fixture.rack
+        cls.device = cls.fixture.devices[0]
+        cls.reservation = cls.fixture.reservations[0]
+
+    def _toggle(self, mode):
+        with mock.patch.object(utils, "_get_changelog_snapshots", return_value=mode):
+            return toggle_rack_units_order(Rack.objects.get(pk=self.rack.pk), user=self.user, optimistic=False)
+
+    def _changes(self, obj):
+        return ObjectChange.objects.filter(
+            changed_object_type=ContentType.objects.get_for_model(obj),
+            changed_object_id=obj.pk,
+        ).order_by("pk")
+
+    def test_full_snapshots_by_default(self):
+        self._toggle("full")
+        device_change = self._changes(self.device).get()
+        self.assertEqual(device_change.prechange_data["name"], self.device.name)
+        self.assertEqual(float(device_change.postchange_data["position"]), 11.0)
+
+    def test_fields_mode_records_only_changed_fields(self):
+        toggle, created = self._toggle("fields")
+        self.assertTrue(created)
+
+        self.device.refresh_from_db()
+        self.reservation.refresh_from_db()
+        self.assertEqual(self.device.position, 11)
+        self.assertEqual(self.reservation.units, [2])
+
+        device_change = self._changes(self.device).get()
+        self.assertEqual(device_change.prechange_data, {"position": "1.0"})
+        self.assertEqual(device_change.postchange_data, {"position": "11.0"})
+        self.assertEqual(device_change.object_repr, self.device.name)
+        reservation_change = self._changes(self.reservation).get()
+        self.assertEqual(reservation_change.prechange_data, {"units": [11]})
+        self.assertEqual(reservation_change.postchange_data, {"units": [2]})
+        # The rack itself keeps its full snapshot.
+        self.assertIn("desc_units", self._changes(self.rack).get().prechange_data)
+
+        undo_rack_toggle(toggle, user=self.user)
+        self.device.refresh_from_db()
+        self.assertEqual(self.device.position, 1)
+        # The undo records positions in the same format as the toggle.
+        undo_change = self._changes(self.device).last()
+        self.assertEqual(undo_change.prechange_data, {"position": "11.0"})
+        self.assertEqual(undo_change.postchange_data, {"position": "1.0"})
+
+    def test_fields_mode_does_not_load_or_serialize_objects(self):
+        column = f'"{Device._meta.db_table}"."custom_field_data"'
+        with (
+            mock.patch.object(Device, "snapshot") as snapshot,
+            CaptureQueriesContext(connection) as queries,
+        ):
+            self._toggle("fields")
+        snapshot.assert_not_called()
+        self.assertFalse([query["sql"] for query in queries if column in query["sql"]])
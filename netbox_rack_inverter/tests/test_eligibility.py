@@ -0,0 +1,325 @@
+"""
+Tests for rack toggle eligibility annotations, the eligibility list view and
+the materialized RackEligibility table with its readers, REST API and
+GraphQL API.
+"""
+
+from decimal import Decimal
+from unittest import mock
+
+from dcim.choices import DeviceFaceChoices
+from dcim.models import Device, Rack, RackReservation
+from django.core.management import call_command
+from django.urls import reverse
+
+from .. import eligibility
+from ..annotations import annotate_toggle_eligibility
+from ..export import iter_plan_rows
+from ..filtersets import RackToggleEligibilityFilterSet
+from ..models import RackEligibility
+from ..plans import build_plan
+from ..testing import (
+    TOGGLE_PERMISSIONS,
+    PluginSharedAPITestCase,
+    PluginSharedGraphQLTestCase,
+    PluginSharedTestCase,
+    RackFixtureMixin,
+    create_device_role,
+    create_device_type,
+    create_rack,
+)
+from ..utils import (
+    RackUnitRangeError,
+    plan_rack_toggle,
+    read_rack_layout,
+    toggle_rack_units_order,
+)
+from ..views import RackToggleEligibilityListView
+
+
+class RackToggleEligibilityTestCase(RackFixtureMixin, PluginSharedTestCase):
+    rack_name = "Rack-Valid"
+    # A 1U device in U10; a 2U device in U18-U19, an unmounted device and a
+    # reservation of U12-U13 are added below.
+    rack_options = {"u_height": 10, "starting_unit": 10, "devices": 1}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.valid_rack = cls.rack
+        role = create_device_role()
+        type_2u = create_device_type(2)
+        Device.objects.create(
+            name="Rack-Valid-18",
+            device_type=type_2u,
+            role=role,
+            site=cls.site,
+            rack=cls.valid_rack,
+            position=18,
+            face=DeviceFaceChoices.FACE_FRONT,
+        )
+        Device.objects.create(
+            name="eligibility-unmounted",
+            device_type=type_2u,
+            role=role,
+            site=cls.site,
+            rack=cls.valid_rack,
+        )
+        RackReservation.objects.create(rack=cls.valid_rack, units=[12, 13], user=cls.user, description="Valid")
+
+        # Out-of-range data can only exist after rack geometry changes, so it
+        # is written with update() to bypass validation.
+        device_fixture = create_rack("Rack-Bad-Device", site=cls.site, u_height=10, devices=1, device_height=2)
+        cls.device_rack = device_fixture.rack
+        Device.objects.filter(pk=device_fixture.devices[0].pk).update(position=10)
+
+        reservation_fixture = create_rack("Rack-Bad-Reservation", site=cls.site, u_height=10, reservations=1)
+        cls.reservation_rack = reservation_fixture.rack
+        RackReservation.objects.filter(pk=reservation_fixture.reservations[0].pk).update(units=[3, 11])
+
+        cls.empty_rack = create_rack("Rack-Empty", site=cls.site, u_height=10).rack
+
+        # The writes above bypassed signals or ran before the first commit.
+        eligibility.refresh_rack_eligibility()
+
+    def _annotated(self):
+        return {rack.pk: rack for rack in annotate_toggle_eligibility(Rack.objects.all())}
+
+    def test_annotations(self):
+        racks = self._annotated()
+
+        valid = racks[self.valid_rack.pk]
+        self.assertEqual(valid.mounted_device_count, 2)
+        self.assertEqual(valid.reservation_count, 1)
+        self.assertFalse(valid.has_invalid_devices)
+        self.assertFalse(valid.has_invalid_reservations)
+        self.assertTrue(valid.toggle_eligible)
+
+        self.assertTrue(racks[self.device_rack.pk].has_invalid_devices)
+        self.assertFalse(racks[self.device_rack.pk].toggle_eligible)
+        self.assertTrue(racks[self.reservation_rack.pk].has_invalid_reservations)
+        self.assertFalse(racks[self.reservation_rack.pk].toggle_eligible)
+
+        empty = racks[self.empty_rack.pk]
+        self.assertEqual((empty.mounted_device_count, empty.reservation_count), (0, 0))
+        self.assertTrue(empty.toggle_eligible)
+
+    def test_annotations_match_planner(self):
+        for rack in annotate_toggle_eligibility(Rack.objects.all()):
+            with self.subTest(rack=rack.name):
+                rack_values, devices, reservations = read_rack_layout(rack.pk)
+                try:
+                    plan_rack_toggle(
+                        starting_unit=rack_values["starting_unit"] or 1,
+                        rack_u_height=rack_values["u_height"],
+                        devices=devices,
+                        reservations=reservations,
+                    )
+                    planned = True
+                except RackUnitRangeError:
+                    planned = False
+                self.assertEqual(rack.toggle_eligible, planned)
+
+    def test_annotation_is_a_single_query(self):
+        with self.assertNumQueries(1):
+            list(annotate_toggle_eligibility(Rack.objects.all()))
+
+    def test_filterset(self):
+        queryset = Rack.objects.all()
+        eligible = RackToggleEligibilityFilterSet({"toggle_eligible": True}, queryset).qs
+        self.assertEqual({rack.pk for rack in eligible}, {self.valid_rack.pk, self.empty_rack.pk})
+
+        invalid = RackToggleEligibilityFilterSet({"has_invalid_reservations": True}, queryset).qs
+        self.assertEqual([rack.pk for rack in invalid], [self.reservation_rack.pk])
+
+        by_name = RackToggleEligibilityFilterSet({"q": "Bad", "toggle_eligible": False}, queryset).qs
+        self.assertEqual({rack.pk for rack in by_name}, {self.device_rack.pk, self.reservation_rack.pk})
+
+    def test_list_view(self):
+        url = reverse("plugins:netbox_rack_inverter:rack_toggle_eligibility")
+        self.assertHttpStatus(self.client.get(url), 403)
+
+        self.add_permissions("dcim.view_rack")
+        response = self.client.get(url, {"toggle_eligible": "false"})
+        self.assertHttpStatus(response, 200)
+        self.assertContains(response, "Rack-Bad-Device")
+        self.assertContains(response, "Rack-Bad-Reservation")
+        self.assertNotContains(response, "Rack-Valid")
+
+    def test_readers_use_materialized_rows(self):
+        # A stale row wins over the rack's actual (eligible) layout, which
+        # shows that nothing recomputes eligibility from devices.
+        RackEligibility.objects.filter(rack=self.empty_rack).update(toggle_eligible=False, mounted_device_count=7)
+        racks = Rack.objects.all()
+
+        eligible = RackToggleEligibilityFilterSet({"toggle_eligible": True}, racks).qs
+        self.assertEqual({rack.pk for rack in eligible}, {self.valid_rack.pk})
+
+        self.add_permissions("dcim.view_rack")
+        response = self.client.get(
+            reverse("plugins:netbox_rack_inverter:rack_toggle_eligibility"), {"toggle_eligible": "false"}
+        )
+        self.assertContains(response, "Rack-Empty")
+        listed = RackToggleEligibilityListView.queryset.get(pk=self.empty_rack.pk)
+        self.assertEqual(listed.mounted_device_count, 7)
+
+        plan = build_plan(racks.filter(pk=self.empty_rack.pk))
+        self.assertEqual(plan["racks"], [])
+        self.assertEqual([skipped["rack_id"] for skipped in plan["skipped"]], [self.empty_rack.pk])
+
+        # The empty rack would otherwise export no rows at all.
+        (row,) = iter_plan_rows(racks.filter(pk=self.empty_rack.pk))
+        self.assertEqual(row["rack"], "Rack-Empty")
+        self.assertIn("outside the rack's unit range", row["error"])
+
+
+class RackEligibilityTableTestCase(RackFixtureMixin, PluginSharedTestCase):
+    rack_name = "Rack-Materialized"
+    rack_options = {"u_height": 10}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_rack = create_rack("Rack-Materialized-Other", site=cls.site, u_height=10).rack
+        cls.role = create_device_role()
+        cls.device_type = create_device_type(2)
+
+    def _create_device(self, position, rack=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Device.objects.create(
+                name=f"materialized-{position}",
+                device_type=self.device_type,
+                role=self.role,
+                site=self.site,
+                rack=rack or self.rack,
+                position=position,
+                face=DeviceFaceChoices.FACE_FRONT,
+            )
+
+    def _row(self, rack=None):
+        return RackEligibility.objects.get(rack=rack or self.rack)
+
+    def test_row_created_for_new_rack(self):
+        row = self._row()
+        self.assertTrue(row.toggle_eligible)
+        self.assertEqual((row.mounted_device_count, row.reservation_count), (0, 0))
+        self.assertIsNone(row.occupied_unit_min)
+
+    def test_device_and_reservation_changes_refresh_row(self):
+        self._create_device(3)
+        with self.captureOnCommitCallbacks(execute=True):
+            RackReservation.objects.create(rack=self.rack, units=[8, 9], user=self.user, description="Materialized")
+
+        row = self._row()
+        self.assertEqual((row.mounted_device_count, row.reservation_count), (1, 1))
+        self.assertEqual((row.occupied_unit_min, row.occupied_unit_max), (Decimal(3), Decimal(9)))
+
+    def test_moving_device_refreshes_both_racks(self):
+        device = self._create_device(3)
+        with self.captureOnCommitCallbacks(execute=True):
+            device.rack = self.other_rack
+            device.save()
+
+        self.assertEqual(self._row().mounted_device_count, 0)
+        self.assertEqual(self._row(self.other_rack).mounted_device_count, 1)
+
+    def test_device_type_height_change_refreshes_row(self):
+        self._create_device(8)
+        self.assertTrue(self._row().toggle_eligible)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.device_type.u_height = 4
+            self.device_type.save()
+
+        row = self._row()
+        self.assertTrue(row.has_invalid_devices)
+        self.assertFalse(row.toggle_eligible)
+        self.assertEqual(row.occupied_unit_max, Decimal(11))
+
+    def test_rack_geometry_change_refreshes_row(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            RackReservation.objects.create(rack=self.rack, units=[10], user=self.user, description="Top")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rack.starting_unit = 2
+            self.rack.save()
+        self.assertTrue(self._row().has_invalid_reservations)
+
+    def test_set_based_toggle_refreshes_row(self):
+        self.add_permissions(*TOGGLE_PERMISSIONS)
+        self._create_device(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            toggle_rack_units_order(Rack.objects.get(pk=self.rack.pk), user=self.user, optimistic=True)
+
+        row = self._row()
+        self.assertEqual((row.occupied_unit_min, row.occupied_unit_max), (Decimal(9), Decimal(10)))
+
+    def test_refresh_is_batched_per_transaction(self):
+        with mock.patch.object(
+            eligibility, "refresh_rack_eligibility", wraps=eligibility.refresh_rack_eligibility
+        ) as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                for position in (1, 3, 5):
+                    Device.objects.create(
+                        name=f"batched-{position}",
+                        device_type=self.device_type,
+                        role=self.role,
+                        site=self.site,
+                        rack=self.rack,
+                        position=position,
+                        face=DeviceFaceChoices.FACE_FRONT,
+                    )
+        refresh.assert_called_once_with({self.rack.pk})
+        self.assertEqual(self._row().mounted_device_count, 3)
+
+    def test_rebuild_command(self):
+        self._create_device(5)
+        RackEligibility.objects.all().delete()
+
+        call_command("rebuild_rack_eligibility", stdout=mock.MagicMock())
+
+        self.assertEqual(RackEligibility.objects.count(), Rack.objects.count())
+        self.assertEqual(self._row().mounted_device_count, 1)
+        self.assertEqual(self._row().occupied_unit_max, Decimal(6))
+
+
+class RackEligibilityAPITestMixin(RackFixtureMixin):
+    rack_name = "Rack-Eligibility-API"
+    # A 2U device in U1-U2 and a reservation of U10.
+    rack_options = {"u_height": 10, "devices": 1, "device_height": 2, "reservations": 1}
+
+
+class RackEligibilityAPITestCase(RackEligibilityAPITestMixin, PluginSharedAPITestCase):
+    def test_list(self):
+        url = reverse("plugins-api:netbox_rack_inverter-api:rackeligibility-list")
+        self.assertEqual(self.client.get(url).data["results"], [])
+
+        self.add_permissions("netbox_rack_inverter.view_rackeligibility")
+        response = self.client.get(url, {"rack_id": self.rack.pk, "toggle_eligible": True})
+        self.assertHttpStatus(response, 200)
+        (result,) = response.data["results"]
+        self.assertEqual(result["rack"]["id"], self.rack.pk)
+        self.assertEqual((result["mounted_device_count"], result["reservation_count"]), (1, 1))
+        self.assertEqual((Decimal(result["occupied_unit_min"]), Decimal(result["occupied_unit_max"])), (1, 10))
+
+
+class RackEligibilityGraphQLTestCase(RackEligibilityAPITestMixin, PluginSharedGraphQLTestCase):
+    QUERY = """
+    query Eligibility($rack: ID!) {
+      rack_eligibility_list(filters: {rack: {pk: $rack}}) {
+        toggle_eligible
+        mounted_device_count
+        rack { name }
+      }
+    }
+    """
+
+    def test_rack_eligibility_list(self):
+        self.add_permissions("netbox_rack_inverter.view_rackeligibility")
+        data = self.execute_query(self.QUERY, {"rack": str(self.rack.pk)})
+        self.assertNotIn("errors", data)
+        (row,) = data["data"]["rack_eligibility_list"]
+        self.assertEqual(row, {"toggle_eligible": True, "mounted_device_count": 1, "rack": {"name": self.rack.name}})
+
+    def test_rack_eligibility_list_is_restricted(self):
+        data = self.execute_query(self.QUERY, {"rack": str(self.rack.pk)})
+        self.assertEqual(data["data"]["rack_eligibility_list"], [])
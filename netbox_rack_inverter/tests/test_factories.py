@@ -0,0 +1,73 @@
+"""
+Tests for the bulk fixture factories and the setUpTestData base classes.
+"""
+
+from decimal import Decimal
+
+from dcim.models import Device, Rack
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ..models import RackEligibility
+from ..testing import PluginSharedTestCase, create_rack, create_racks
+from ..undo import undo_rack_toggle
+from ..utils import toggle_rack_units_order
+
+
+class RackFactoryTestCase(PluginSharedTestCase):
+    user_permissions = [
+        "dcim.view_rack",
+        "dcim.change_rack",
+        "dcim.change_device",
+        "dcim.change_rackreservation",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.large = create_rack("Rack-Large", u_height=100, devices=100)
+        cls.fixtures = create_racks(
+            3, name_prefix="Rack-Small", u_height=10, devices=3, device_height=2, reservations=2
+        )
+
+    def test_layout(self):
+        fixture = self.fixtures[0]
+        self.assertEqual(fixture.rack.name, "Rack-Small 1")
+        self.assertEqual([device.position for device in fixture.devices], [1, 3, 5])
+        self.assertEqual([reservation.units for reservation in fixture.reservations], [[9], [10]])
+        self.assertEqual(Device.objects.filter(rack=fixture.rack).count(), 3)
+        self.assertEqual(Device.objects.filter(rack=self.large.rack).count(), 100)
+
+    def test_eligibility_is_refreshed(self):
+        rows = RackEligibility.objects.filter(rack__in=[self.large.rack, *(f.rack for f in self.fixtures)])
+        self.assertEqual(rows.count(), 4)
+        self.assertTrue(all(row.toggle_eligible for row in rows))
+
+    def test_query_count_does_not_grow_with_size(self):
+        create_racks(1, name_prefix="Rack-Warmup", devices=1, reservations=1)
+        with CaptureQueriesContext(connection) as small:
+            create_racks(1, name_prefix="Rack-One", devices=1, reservations=1)
+        with CaptureQueriesContext(connection) as large:
+            create_racks(5, name_prefix="Rack-Five", devices=40, reservations=2)
+        self.assertEqual(len(large), len(small))
+
+    def test_overfull_rack_is_rejected(self):
+        with self.assertRaises(ValueError):
+            create_rack("Rack-Overfull", u_height=10, devices=5, device_height=2, reservations=1)
+
+    def test_shared_user_permissions(self):
+        self.assertTrue(self.user.has_perm("dcim.change_rack"))
+
+    def test_large_rack_round_trip(self):
+        rack = self.large.rack
+        for optimistic in (False, True):
+            with self.cleanupSubTest(optimistic=optimistic):
+                toggle, created = toggle_rack_units_order(
+                    Rack.objects.get(pk=rack.pk), user=self.user, optimistic=optimistic
+                )
+                self.assertTrue(created)
+                self.assertEqual(len(toggle.device_positions), 100)
+                self.assertEqual(Device.objects.get(name="Rack-Large-1").position, Decimal(100))
+
+                undo_rack_toggle(toggle, user=self.user)
+                self.assertEqual(Device.objects.get(name="Rack-Large-1").position, Decimal(1))
@@ -0,0 +1,100 @@
+"""
+Tests for the batched GraphQL toggle preview query.
+"""
+
+from dcim.models import Rack, RackReservation
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ..testing import PluginSharedGraphQLTestCase, RackFixtureMixin, create_racks
+from ..utils import read_rack_layout, read_rack_layouts
+
+PREVIEW_QUERY = """
+query Preview($racks: [ID!]!) {
+  rack_toggle_preview(rack_ids: $racks) {
+    rack_id
+    rack_name
+    desc_units
+    target_desc_units
+    eligible
+    error
+    device_count
+    reservation_count
+    device_positions { device_id before after }
+    reservation_units { reservation_id before after }
+  }
+}
+"""
+
+
+class RackTogglePreviewTestCase(RackFixtureMixin, PluginSharedGraphQLTestCase):
+    rack_name = "Rack-Preview"
+    # A 2U device in U1-U2 and a reservation of U10 in each rack.
+    rack_options = {"u_height": 10, "devices": 1, "device_height": 2, "reservations": 1}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        others = create_racks(9, name_prefix="Rack-Preview", site=cls.site, **cls.rack_options)
+        cls.racks = [cls.rack, *(fixture.rack for fixture in others)]
+        cls.device = cls.fixture.devices[0]
+
+    def _preview(self, racks):
+        data = self.execute_query(PREVIEW_QUERY, {"racks": [str(rack.pk) for rack in racks]})
+        self.assertNotIn("errors", data)
+        return {int(preview["rack_id"]): preview for preview in data["data"]["rack_toggle_preview"]}
+
+    def test_read_rack_layouts_matches_read_rack_layout(self):
+        layouts = read_rack_layouts(Rack.objects.filter(pk__in=[rack.pk for rack in self.racks[:3]]))
+        for rack in self.racks[:3]:
+            rack_values, devices, reservations = read_rack_layout(rack.pk)
+            self.assertEqual(layouts[rack.pk][1:], (devices, reservations))
+            self.assertEqual(layouts[rack.pk][0]["u_height"], rack_values["u_height"])
+
+    def test_preview(self):
+        self.add_permissions("dcim.view_rack", "dcim.view_device", "dcim.view_rackreservation")
+        preview = self._preview([self.rack])[self.rack.pk]
+
+        self.assertEqual(preview["rack_name"], "Rack-Preview")
+        self.assertFalse(preview["desc_units"])
+        self.assertTrue(preview["target_desc_units"])
+        self.assertTrue(preview["eligible"])
+        self.assertEqual(
+            preview["device_positions"],
+            [{"device_id": str(self.device.pk), "before": 1.0, "after": 9.0}],
+        )
+        self.assertEqual(preview["reservation_units"][0]["after"], [1])
+
+        # Previewing changes nothing.
+        self.rack.refresh_from_db()
+        self.assertFalse(self.rack.desc_units)
+
+    def test_preview_reports_ineligible_rack(self):
+        self.add_permissions("dcim.view_rack", "dcim.view_device", "dcim.view_rackreservation")
+        RackReservation.objects.filter(rack=self.rack).update(units=[5, 11])
+
+        preview = self._preview([self.rack])[self.rack.pk]
+        self.assertFalse(preview["eligible"])
+        self.assertIn("outside the rack's unit range", preview["error"])
+        self.assertEqual(preview["device_positions"], [])
+
+    def test_query_count_does_not_grow_with_racks(self):
+        self.add_permissions("dcim.view_rack", "dcim.view_device", "dcim.view_rackreservation")
+        self._preview(self.racks[:1])
+
+        with CaptureQueriesContext(connection) as one_rack:
+            self._preview(self.racks[:1])
+        with CaptureQueriesContext(connection) as ten_racks:
+            previews = self._preview(self.racks)
+        self.assertEqual(len(previews), 10)
+        self.assertEqual(len(ten_racks), len(one_rack))
+
+    def test_preview_is_restricted(self):
+        self.assertEqual(self._preview([self.rack]), {})
+
+        # Objects the user cannot view are counted but not listed.
+        self.add_permissions("dcim.view_rack")
+        preview = self._preview([self.rack])[self.rack.pk]
+        self.assertEqual((preview["device_count"], preview["reservation_count"]), (1, 1))
+        self.assertEqual(preview["device_positions"], [])
+        self.assertEqual(preview["reservation_units"], [])
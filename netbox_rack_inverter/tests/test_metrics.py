@@ -0,0 +1,128 @@
+"""
+Tests for per-phase timing instrumentation.
+"""
+
+from unittest import mock
+
+from django.test import RequestFactory
+from django.urls import reverse
+
+from .. import metrics
+from ..template_content import RackConvertToDescendingUnitsButton
+from ..testing import TOGGLE_PERMISSIONS, PluginSharedTestCase, RackFixtureMixin, create_rack
+from ..utils import toggle_rack_units_order
+
+
+class RecordingSink(metrics.MetricsSink):
+    def __init__(self):
+        self.records = []
+
+    def emit(self, metrics):
+        self.records.append(metrics)
+
+
+class FailingSink(metrics.MetricsSink):
+    def emit(self, metrics):
+        raise RuntimeError("sink unavailable")
+
+
+class MetricsTestCase(RackFixtureMixin, PluginSharedTestCase):
+    user_permissions = TOGGLE_PERMISSIONS
+    rack_name = "Rack-Metrics"
+    # A 1U device in U1 and a reservation of U10, both moved by a toggle.
+    rack_options = {"u_height": 10, "devices": 1, "reservations": 1}
+
+    def setUp(self):
+        super().setUp()
+        self.sink = RecordingSink()
+        patcher = mock.patch.object(metrics, "get_sinks", return_value=(self.sink,))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _toggle(self, data=None):
+        url = reverse("plugins:netbox_rack_inverter:rack_toggle_units_order", kwargs={"pk": self.rack.pk})
+        return self.client.post(url, data=data or {})
+
+    def test_toggle_records_phases_and_rows(self):
+        self.assertHttpStatus(self._toggle(), 302)
+
+        (record,) = self.sink.records
+        self.assertEqual(record.operation, "toggle")
+        self.assertEqual(record.outcome, "toggled")
+        self.assertEqual(record.labels, {"source": "ui", "rack": self.rack.pk})
+        self.assertTrue({"permissions", "lock", "plan", "record", "changelog", "write"} <= set(record.phases))
+        self.assertEqual(record.rows, {"device": 1, "reservation": 1})
+        self.assertGreaterEqual(record.duration, sum(record.phases.values()))
+
+    def test_rows_count_moved_objects_in_both_modes(self):
+        for optimistic in (False, True):
+            with self.cleanupSubTest(optimistic=optimistic):
+                # The middle 2U device keeps U3-U4 in a 6U rack.
+                fixture = create_rack(f"Rack-Metrics-Rows-{optimistic}", u_height=6, devices=3, device_height=2)
+                with metrics.track("toggle") as operation:
+                    toggle, _ = toggle_rack_units_order(fixture.rack, user=self.user, optimistic=optimistic)
+                self.assertEqual(len(toggle.device_positions), 3)
+                self.assertEqual(operation.rows, {"device": 2, "reservation": 0})
+
+    def test_prometheus_lock_wait_includes_rack_lock(self):
+        with mock.patch.object(metrics, "_get_prometheus_metrics", return_value=[mock.Mock() for _ in range(5)]):
+            sink = metrics.PrometheusSink()
+        sink.emit(metrics.OperationMetrics("toggle", phases={"rack_lock": 0.25, "lock": 0.5, "plan": 1.0}))
+        sink.lock_wait.labels.assert_called_once_with(operation="toggle")
+        sink.lock_wait.labels.return_value.observe.assert_called_once_with(0.75)
+
+    def test_optimistic_toggle_records_verify_phase(self):
+        with metrics.track("toggle") as operation:
+            toggle_rack_units_order(self.rack, user=self.user, optimistic=True)
+
+        self.assertIs(self.sink.records[0], operation)
+        self.assertIn("verify", operation.phases)
+        self.assertNotIn("lock", operation.phases)
+
+    def test_noop_outcome(self):
+        self.assertHttpStatus(self._toggle({"desc_units": "false"}), 302)
+        self.assertEqual(self.sink.records[0].outcome, "noop")
+        self.assertEqual(self.sink.records[0].rows, {})
+
+    def test_failure_outcome_is_exception_name(self):
+        self.remove_permissions("dcim.change_device")
+        self.assertHttpStatus(self._toggle(), 403)
+        self.assertEqual(self.sink.records[0].outcome, "PermissionDenied")
+
+    def test_button_render_phases(self):
+        request = RequestFactory().get("/")
+        request.user = self.user
+        RackConvertToDescendingUnitsButton(context={"request": request, "object": self.rack}).buttons()
+
+        (record,) = self.sink.records
+        self.assertEqual(record.operation, "button_render")
+        self.assertEqual(set(record.phases), {"permissions", "render"})
+
+    def test_failing_sink_does_not_break_toggle(self):
+        with mock.patch.object(metrics, "get_sinks", return_value=(FailingSink(), self.sink)):
+            with self.assertLogs("netbox_rack_inverter.metrics", "ERROR"):
+                self.assertHttpStatus(self._toggle(), 302)
+        self.rack.refresh_from_db()
+        self.assertTrue(self.rack.desc_units)
+        self.assertEqual(len(self.sink.records), 1)
+
+    def test_logging_sink(self):
+        with self.assertLogs("netbox_rack_inverter.metrics", "INFO") as logs:
+            metrics.LoggingSink().emit(
+                metrics.OperationMetrics("toggle", {"source": "ui"}, duration=0.5, phases={"plan": 0.25})
+            )
+        self.assertIn("toggle outcome=success duration=500.0ms source=ui plan=250.0ms", logs.output[0])
+
+    def test_phase_outside_operation_is_noop(self):
+        with metrics.phase("plan"):
+            metrics.record_rows("device", 3)
+        self.assertEqual(self.sink.records, [])
+
+    def test_metrics_view_requires_superuser(self):
+        response = self.client.get(reverse("plugins:netbox_rack_inverter:metrics"))
+        self.assertHttpStatus(response, 403)
+
+    def test_metrics_view_requires_prometheus_sink(self):
+        self.client.force_login(self.create_test_user("metrics-admin", is_superuser=True))
+        response = self.client.get(reverse("plugins:netbox_rack_inverter:metrics"))
+        self.assertHttpStatus(response, 404)
@@ -0,0 +1,168 @@
+"""
+Tests for the optimistic (lock-free planning) toggle mode.
+"""
+
+from unittest import mock
+
+from core.models import ObjectChange
+from dcim.choices import DeviceFaceChoices
+from dcim.models import Device, Rack
+from django.urls import reverse
+
+from .. import utils
+from ..models import RackToggle
+from ..testing import (
+    TOGGLE_PERMISSIONS,
+    PluginSharedAPITestCase,
+    PluginSharedTestCase,
+    RackFixtureMixin,
+    create_device_role,
+    create_device_type,
+)
+from ..utils import RackLayoutConflict, get_rack_layout_fingerprint, read_rack_layout, toggle_rack_units_order
+
+
+class OptimisticToggleTestMixin(RackFixtureMixin):
+    user_permissions = TOGGLE_PERMISSIONS
+    rack_name = "Rack-Optimistic"
+    # A 2U device in U1-U2 and reservations of U11 and U12; a 1U device is
+    # added in U5.
+    rack_options = {"u_height": 12, "devices": 1, "device_height": 2, "reservations": 2}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.device_2u = cls.fixture.devices[0]
+        cls.reservation = cls.fixture.reservations[0]
+        cls.type_1u = create_device_type(1)
+        cls.device_1u = Device.objects.create(
+            name="optimistic-1u",
+            device_type=cls.type_1u,
+            role=create_device_role(),
+            site=cls.site,
+            rack=cls.rack,
+            position=5,
+            face=DeviceFaceChoices.FACE_FRONT,
+        )
+
+
+class OptimisticToggleTestCase(OptimisticToggleTestMixin, PluginSharedTestCase):
+    def _toggle(self, **kwargs):
+        return toggle_rack_units_order(
+            Rack.objects.get(pk=self.rack.pk),
+            user=self.user,
+            optimistic=True,
+            **kwargs,
+        )
+
+    def _refresh(self):
+        for obj in (self.rack, self.device_1u, self.device_2u, self.reservation):
+            obj.refresh_from_db()
+
+    def test_round_trip(self):
+        toggle, created = self._toggle()
+        self.assertTrue(created)
+        self.assertTrue(toggle.desc_units)
+        self._refresh()
+        self.assertTrue(self.rack.desc_units)
+        self.assertEqual(self.device_1u.position, 8)
+        self.assertEqual(self.device_2u.position, 11)
+        self.assertEqual(self.reservation.units, [2])
+
+        self._toggle()
+        self._refresh()
+        self.assertFalse(self.rack.desc_units)
+        self.assertEqual(self.device_1u.position, 5)
+        self.assertEqual(self.device_2u.position, 1)
+        self.assertEqual(self.reservation.units, [11])
+
+    def test_records_changelog_and_snapshot(self):
+        ObjectChange.objects.all().delete()
+        toggle, _ = self._toggle()
+
+        self.assertEqual(RackToggle.objects.get(rack=self.rack).pk, toggle.pk)
+        device_change = ObjectChange.objects.get(
+            changed_object_id=self.device_2u.pk, prechange_data__has_key="position"
+        )
+        self.assertEqual(float(device_change.prechange_data["position"]), 1.0)
+        self.assertEqual(float(device_change.postchange_data["position"]), 11.0)
+        self.assertTrue(
+            ObjectChange.objects.filter(changed_object_id=self.rack.pk, prechange_data__has_key="desc_units")
+        )
+
+    def test_target_orientation_noop(self):
+        toggle, created = self._toggle(desc_units=False)
+        self.assertIsNone(toggle)
+        self.assertFalse(created)
+        self.assertFalse(RackToggle.objects.exists())
+
+    def test_conflict_is_retried_with_fresh_layout(self):
+        real_read = read_rack_layout
+        calls = []
+
+        def read_then_move_device(rack_pk):
+            layout = real_read(rack_pk)
+            if not calls:
+                # Simulate a concurrent edit landing between planning and apply.
+                Device.objects.filter(pk=self.device_2u.pk).update(position=7)
+            calls.append(rack_pk)
+            return layout
+
+        with mock.patch.object(utils, "read_rack_layout", side_effect=read_then_move_device):
+            toggle, created = self._toggle()
+
+        self.assertTrue(created)
+        self._refresh()
+        self.assertTrue(self.rack.desc_units)
+        self.assertEqual(self.device_2u.position, 5)
+        self.assertEqual(RackToggle.objects.count(), 1)
+
+    def test_persistent_conflict_aborts_cleanly(self):
+        real_read = read_rack_layout
+        positions = iter(range(4, 12))
+
+        def read_then_move_device(rack_pk):
+            layout = real_read(rack_pk)
+            Device.objects.filter(pk=self.device_1u.pk).update(position=next(positions))
+            return layout
+
+        with mock.patch.object(utils, "read_rack_layout", side_effect=read_then_move_device):
+            with self.assertRaises(RackLayoutConflict):
+                self._toggle()
+
+        self._refresh()
+        self.assertFalse(self.rack.desc_units)
+        self.assertEqual(self.device_2u.position, 1)
+        self.assertEqual(self.reservation.units, [11])
+        self.assertFalse(RackToggle.objects.exists())
+
+    def _fingerprint(self):
+        rack_values, devices, reservations = read_rack_layout(self.rack.pk)
+        return get_rack_layout_fingerprint(
+            desc_units=rack_values["desc_units"],
+            starting_unit=rack_values["starting_unit"],
+            u_height=rack_values["u_height"],
+            devices=devices,
+            reservations=reservations,
+        )
+
+    def test_fingerprint_tracks_device_heights(self):
+        fingerprint = self._fingerprint()
+        self.assertEqual(fingerprint, self._fingerprint())
+
+        self.type_1u.u_height = 2
+        self.type_1u.save()
+        self.assertNotEqual(fingerprint, self._fingerprint())
+
+
+class OptimisticToggleAPITestCase(OptimisticToggleTestMixin, PluginSharedAPITestCase):
+    def test_optimistic_flag(self):
+        url = reverse(
+            "plugins-api:netbox_rack_inverter-api:rack_toggle_units_order",
+            kwargs={"pk": self.rack.pk},
+        )
+        response = self.client.post(url, {"optimistic": True}, format="json")
+        self.assertHttpStatus(response, 201)
+        self.assertEqual(response.data["toggle"]["reservation_units"][0][2], [2])
+        self.rack.refresh_from_db()
+        self.assertTrue(self.rack.desc_units)
@@ -0,0 +1,95 @@
+"""
+Tests for the streaming toggle plan export.
+"""
+
+import csv
+import io
+import json
+
+from dcim.models import Rack, RackReservation
+from django.core.management import call_command
+from django.urls import reverse
+
+from ..export import PLAN_COLUMNS, iter_plan_rows
+from ..testing import PluginSharedTestCase, RackFixtureMixin, create_rack, create_racks
+
+
+class RackTogglePlanExportTestCase(RackFixtureMixin, PluginSharedTestCase):
+    rack_name = "Rack-Export"
+    # A 1U device in U1 and a reservation of U10 in each rack.
+    rack_options = {"u_height": 10, "devices": 1, "reservations": 1}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        others = create_racks(4, name_prefix="Rack-Export", site=cls.site, **cls.rack_options)
+        cls.racks = [cls.rack, *(fixture.rack for fixture in others)]
+
+        bad = create_rack("Rack-Export-Bad", site=cls.site, u_height=10, reservations=1)
+        cls.bad_rack = bad.rack
+        RackReservation.objects.filter(pk=bad.reservations[0].pk).update(units=[11])
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("plugins:netbox_rack_inverter:rack_toggle_plan_export")
+
+    def test_iter_plan_rows(self):
+        rows = list(iter_plan_rows(Rack.objects.filter(pk__in=[self.racks[0].pk, self.bad_rack.pk])))
+
+        device_row, reservation_row, error_row = rows
+        self.assertEqual(
+            {key: device_row[key] for key in ("rack", "object_type", "object_name", "before", "after")},
+            {"rack": "Rack-Export", "object_type": "device", "object_name": "Rack-Export-1", "before": 1, "after": 10},
+        )
+        self.assertEqual((reservation_row["before"], reservation_row["after"]), ([10], [1]))
+        self.assertEqual(error_row["rack"], "Rack-Export-Bad")
+        self.assertIn("outside the rack's unit range", error_row["error"])
+        self.assertIsNone(error_row["object_type"])
+
+    def test_batches_cover_every_rack(self):
+        rows = list(iter_plan_rows(Rack.objects.all(), batch_size=2))
+        self.assertEqual({row["rack_id"] for row in rows}, {rack.pk for rack in Rack.objects.all()})
+        self.assertEqual(len(rows), 2 * len(self.racks) + 1)
+
+    def test_view_requires_permission(self):
+        self.assertHttpStatus(self.client.get(self.url), 403)
+
+    def test_csv_export(self):
+        self.add_permissions("dcim.view_rack", "dcim.view_device", "dcim.view_rackreservation")
+        response = self.client.get(self.url, {"id": [self.racks[0].pk, self.racks[1].pk]})
+        self.assertHttpStatus(response, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(tuple(rows[0]), PLAN_COLUMNS)
+        self.assertEqual(len(rows), 4)
+        self.assertEqual({row["rack"] for row in rows}, {"Rack-Export", "Rack-Export 1"})
+
+    def test_jsonl_export(self):
+        self.add_permissions("dcim.view_rack", "dcim.view_device", "dcim.view_rackreservation")
+        response = self.client.get(self.url, {"format": "jsonl", "id": self.racks[0].pk})
+        self.assertHttpStatus(response, 200)
+
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row["object_type"] for row in rows], ["device", "reservation"])
+        self.assertEqual((rows[0]["before"], rows[0]["after"]), (1.0, 10.0))
+
+    def test_invalid_format(self):
+        self.add_permissions("dcim.view_rack")
+        self.assertHttpStatus(self.client.get(self.url, {"format": "xml"}), 400)
+
+    def test_objects_user_cannot_view_are_omitted(self):
+        self.add_permissions("dcim.view_rack", "dcim.view_rackreservation")
+        response = self.client.get(self.url, {"format": "jsonl", "id": self.racks[0].pk})
+
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row["object_type"] for row in rows], ["reservation"])
+
+    def test_command(self):
+        stdout = io.StringIO()
+        call_command("export_rack_toggle_plan", "--format", "jsonl", "--rack", str(self.racks[2].pk), stdout=stdout)
+
+        rows = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual({row["rack"] for row in rows}, {"Rack-Export 2"})
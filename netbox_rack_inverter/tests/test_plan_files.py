@@ -0,0 +1,194 @@
+"""
+Tests for offline toggle plan files.
+"""
+
+import io
+import json
+import os
+import tempfile
+from decimal import Decimal
+
+from dcim.models import Device, Rack, RackReservation
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+
+from ..models import RackEligibility, RackToggle
+from ..plans import PLAN_VERSION, PlanFileError, apply_plan, build_plan, dump_plan, load_plan
+from ..testing import (
+    TOGGLE_PERMISSIONS,
+    PluginSharedAPITestCase,
+    PluginSharedTestCase,
+    RackFixtureMixin,
+    create_rack,
+)
+
+
+class PlanFileTestMixin(RackFixtureMixin):
+    rack_name = "Rack-Plan"
+    # A 2U device in U1-U2 and a reservation of U10.
+    rack_options = {"u_height": 10, "devices": 1, "device_height": 2, "reservations": 1}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.device = cls.fixture.devices[0]
+        cls.reservation = cls.fixture.reservations[0]
+
+        # A rack whose reservation lies outside its units.
+        bad = create_rack("Rack-Plan-Bad", u_height=10, reservations=1)
+        cls.bad_rack = bad.rack
+        RackReservation.objects.filter(pk=bad.reservations[0].pk).update(units=[11])
+
+    def _round_trip(self, plan):
+        fp = io.StringIO()
+        dump_plan(plan, fp)
+        return load_plan(fp.getvalue())
+
+
+class PlanFileTestCase(PlanFileTestMixin, PluginSharedTestCase):
+    def test_build_plan(self):
+        plan = build_plan(Rack.objects.all())
+
+        self.assertEqual(plan["version"], PLAN_VERSION)
+        (entry,) = plan["racks"]
+        self.assertEqual(entry["rack_id"], self.rack.pk)
+        self.assertTrue(entry["desc_units"])
+        self.assertEqual(entry["device_positions"], [[self.device.pk, Decimal(1), Decimal(9)]])
+        self.assertEqual(entry["reservation_units"], [[self.reservation.pk, [10], [1]]])
+        self.assertEqual([skipped["rack_id"] for skipped in plan["skipped"]], [self.bad_rack.pk])
+
+    def test_apply_plan(self):
+        self.add_permissions(*TOGGLE_PERMISSIONS)
+        plan = self._round_trip(build_plan(Rack.objects.filter(pk=self.rack.pk)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            (result,) = apply_plan(plan, user=self.user)
+
+        self.assertEqual(result.status, "applied")
+        self.assertEqual(result.toggle.idempotency_key, f"plan:{plan['id']}")
+        self.assertIsNotNone(result.toggle.duration)
+        self.rack.refresh_from_db()
+        self.device.refresh_from_db()
+        self.reservation.refresh_from_db()
+        self.assertTrue(self.rack.desc_units)
+        self.assertEqual(self.device.position, 9)
+        self.assertEqual(self.reservation.units, [1])
+        self.assertEqual(RackEligibility.objects.get(rack=self.rack).occupied_unit_max, Decimal(10))
+
+        # Applying the same plan again changes nothing.
+        (result,) = apply_plan(plan, user=self.user)
+        self.assertEqual(result.status, "already applied")
+        self.assertEqual(RackToggle.objects.filter(rack=self.rack).count(), 1)
+
+    def test_changed_layout_is_a_conflict(self):
+        self.add_permissions(*TOGGLE_PERMISSIONS)
+        plan = self._round_trip(build_plan(Rack.objects.filter(pk=self.rack.pk)))
+        Device.objects.filter(pk=self.device.pk).update(position=3)
+
+        (result,) = apply_plan(plan, user=self.user)
+        self.assertEqual(result.status, "conflict")
+        self.rack.refresh_from_db()
+        self.assertFalse(self.rack.desc_units)
+        self.assertFalse(RackToggle.objects.exists())
+
+    def test_edited_plan_is_a_conflict(self):
+        self.add_permissions(*TOGGLE_PERMISSIONS)
+        plan = self._round_trip(build_plan(Rack.objects.filter(pk=self.rack.pk)))
+        plan["racks"][0]["device_positions"][0][2] = "5.0"
+
+        (result,) = apply_plan(plan, user=self.user)
+        self.assertEqual(result.status, "conflict")
+        self.device.refresh_from_db()
+        self.assertEqual(self.device.position, 1)
+
+    def test_permissions_are_enforced(self):
+        self.add_permissions("dcim.view_rack")
+        plan = build_plan(Rack.objects.filter(pk=self.rack.pk))
+
+        (result,) = apply_plan(plan, user=self.user)
+        self.assertEqual(result.status, "denied")
+        self.assertFalse(RackToggle.objects.exists())
+
+    def test_load_plan_validation(self):
+        plan = self._round_trip(build_plan(Rack.objects.none()))
+        for data in (
+            "not json",
+            json.dumps({"format": "something-else"}),
+            json.dumps({**plan, "version": PLAN_VERSION + 1}),
+            json.dumps({**plan, "racks": [{"rack_id": 1}]}),
+        ):
+            with self.subTest(data=data), self.assertRaises(PlanFileError):
+                load_plan(data)
+
+    def test_load_plan_rejects_malformed_rows(self):
+        plan = self._round_trip(build_plan(Rack.objects.filter(pk=self.rack.pk)))
+        entry = plan["racks"][0]
+        for rows in (
+            {"device_positions": [[12, "x", "y"]]},
+            {"device_positions": [["12", 1, 11]]},
+            {"device_positions": [[12, True, 11]]},
+            {"device_positions": [[12, 1]]},
+            {"device_positions": [12]},
+            {"reservation_units": [[12, 1, 12]]},
+            {"reservation_units": [[12, [1], ["12"]]]},
+            {"reservation_units": [[None, [1], [12]]]},
+        ):
+            data = json.dumps({**plan, "racks": [{**entry, **rows}]})
+            with self.subTest(data=data), self.assertRaises(PlanFileError):
+                load_plan(data)
+
+    def test_commands(self):
+        self.add_permissions(*TOGGLE_PERMISSIONS)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "plan.json")
+            call_command(
+                "generate_rack_toggle_plan",
+                "--site",
+                str(self.site.pk),
+                "--output",
+                path,
+                stdout=io.StringIO(),
+                stderr=io.StringIO(),
+            )
+            stdout = io.StringIO()
+            call_command("apply_rack_toggle_plan", path, "--user", self.user.username, stdout=stdout)
+
+            self.assertIn(f"Rack {self.rack.pk}: applied", stdout.getvalue())
+            self.rack.refresh_from_db()
+            self.assertTrue(self.rack.desc_units)
+
+            Device.objects.filter(pk=self.device.pk).update(position=5)
+            call_command(
+                "generate_rack_toggle_plan", "--rack", str(self.rack.pk), "--output", path, stderr=io.StringIO()
+            )
+            Device.objects.filter(pk=self.device.pk).update(position=3)
+            with self.assertRaises(CommandError):
+                call_command(
+                    "apply_rack_toggle_plan",
+                    path,
+                    "--user",
+                    self.user.username,
+                    stdout=io.StringIO(),
+                    stderr=io.StringIO(),
+                )
+
+
+class PlanFileAPITestCase(PlanFileTestMixin, PluginSharedAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("plugins-api:netbox_rack_inverter-api:toggle_plan_apply")
+
+    def test_apply(self):
+        self.add_permissions(*TOGGLE_PERMISSIONS)
+        plan = self._round_trip(build_plan(Rack.objects.filter(pk=self.rack.pk)))
+
+        response = self.client.post(self.url, plan, format="json")
+        self.assertHttpStatus(response, 200)
+        self.assertEqual(response.data["id"], plan["id"])
+        (result,) = response.data["results"]
+        self.assertEqual((result["rack_id"], result["status"]), (self.rack.pk, "applied"))
+        self.assertEqual(result["toggle"]["id"], RackToggle.objects.get(rack=self.rack).pk)
+
+    def test_invalid_plan(self):
+        response = self.client.post(self.url, {"format": "something-else"}, format="json")
+        self.assertHttpStatus(response, 400)
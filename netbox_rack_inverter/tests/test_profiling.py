@@ -0,0 +1,95 @@
+"""
+Tests for sampled cProfile capture.
+"""
+
+import os
+import pstats
+import tempfile
+from unittest import mock
+
+from django.urls import reverse
+
+from .. import metrics, profiling
+from ..testing import TOGGLE_PERMISSIONS, PluginSharedTestCase, RackFixtureMixin
+
+
+class ProfilingTestCase(RackFixtureMixin, PluginSharedTestCase):
+    user_permissions = TOGGLE_PERMISSIONS
+    rack_name = "Rack-Profiling"
+    rack_options = {"u_height": 10}
+
+    def setUp(self):
+        super().setUp()
+        self.profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.profile_dir.cleanup)
+        self.settings = {
+            "profile_sample_rate": 1.0,
+            "profile_min_duration": 0.0,
+            "profile_dir": self.profile_dir.name,
+            "profile_max_files": 3,
+        }
+        patcher = mock.patch.object(profiling, "_setting", side_effect=lambda name: self.settings[name])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _toggle(self):
+        url = reverse("plugins:netbox_rack_inverter:rack_toggle_units_order", kwargs={"pk": self.rack.pk})
+        return self.client.post(url)
+
+    def test_sampled_toggle_writes_pstats(self):
+        self.assertHttpStatus(self._toggle(), 302)
+
+        (stored,) = profiling.list_profiles()
+        self.assertEqual(stored.operation, "toggle")
+        self.assertEqual(stored.rack_id, self.rack.pk)
+        stats = pstats.Stats(os.path.join(self.profile_dir.name, stored.name))
+        self.assertTrue(any("toggle_rack_units_order" in func[2] for func in stats.stats))
+
+    def test_zero_sample_rate_disables_profiling(self):
+        self.settings["profile_sample_rate"] = 0.0
+        self.assertHttpStatus(self._toggle(), 302)
+        self.assertEqual(profiling.list_profiles(), [])
+
+    def test_min_duration_filters_fast_operations(self):
+        self.settings["profile_min_duration"] = 3600
+        self.assertHttpStatus(self._toggle(), 302)
+        self.assertEqual(profiling.list_profiles(), [])
+
+    def test_nested_operations_share_one_profile(self):
+        with metrics.track("bulk_undo"), metrics.track("undo", rack=self.rack.pk):
+            pass
+        self.assertEqual([p.operation for p in profiling.list_profiles()], ["bulk_undo"])
+
+    def test_old_profiles_are_pruned(self):
+        for _ in range(5):
+            with metrics.track("button_render", rack=self.rack.pk):
+                pass
+        self.assertEqual(len(profiling.list_profiles()), 3)
+
+    def test_profile_views_require_superuser(self):
+        self.assertHttpStatus(self._toggle(), 302)
+        (stored,) = profiling.list_profiles()
+
+        self.assertHttpStatus(self.client.get(reverse("plugins:netbox_rack_inverter:profile_list")), 403)
+        download_url = reverse("plugins:netbox_rack_inverter:profile_download", kwargs={"name": stored.name})
+        self.assertHttpStatus(self.client.get(download_url), 403)
+
+    def test_superuser_can_browse_and_download(self):
+        self.assertHttpStatus(self._toggle(), 302)
+        (stored,) = profiling.list_profiles()
+        self.client.force_login(self.create_test_user("profiler", is_superuser=True))
+
+        response = self.client.get(reverse("plugins:netbox_rack_inverter:profile_list"))
+        self.assertHttpStatus(response, 200)
+        self.assertContains(response, stored.name)
+
+        response = self.client.get(
+            reverse("plugins:netbox_rack_inverter:profile_download", kwargs={"name": stored.name})
+        )
+        self.assertHttpStatus(response, 200)
+        self.assertIn(f'filename="{stored.name}"', response["Content-Disposition"])
+
+        response = self.client.get(
+            reverse("plugins:netbox_rack_inverter:profile_download", kwargs={"name": "..%2Fsettings.py"})
+        )
+        self.assertHttpStatus(response, 404)
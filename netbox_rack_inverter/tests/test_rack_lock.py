@@ -0,0 +1,129 @@
+"""
+Tests for the per-rack advisory lock taken by every write path.
+"""
+
+import threading
+from contextlib import contextmanager
+from unittest import mock
+
+from dcim.models import Rack
+from django.contrib.messages import get_messages
+from django.db import connections, transaction
+from django.urls import reverse
+
+from .. import locking
+from ..locking import lock_rack
+from ..models import RackToggle
+from ..plans import apply_plan, build_plan
+from ..testing import (
+    TOGGLE_PERMISSIONS,
+    PluginSharedAPITestCase,
+    PluginSharedTestCase,
+    RackFixtureMixin,
+    create_rack,
+)
+from ..undo import undo_rack_toggle
+from ..utils import RackBusy, toggle_rack_units_order
+
+
+@contextmanager
+def rack_lock_held(rack_pk, *, release_after=10):
+    """
+    Hold the advisory lock of a rack from another database session until the
+    block exits or `release_after` seconds have passed.
+    """
+    acquired = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        try:
+            with transaction.atomic():
+                lock_rack(rack_pk)
+                acquired.set()
+                release.wait(release_after)
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    try:
+        acquired.wait(5)
+        yield
+    finally:
+        release.set()
+        thread.join()
+
+
+class RackLockTestMixin(RackFixtureMixin):
+    user_permissions = TOGGLE_PERMISSIONS
+    rack_name = "Rack-Lock"
+    # A 2U device in U1-U2 and a reservation of U10.
+    rack_options = {"u_height": 10, "devices": 1, "device_height": 2, "reservations": 1}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.device = cls.fixture.devices[0]
+
+    def assertUnchanged(self):
+        self.rack.refresh_from_db()
+        self.device.refresh_from_db()
+        self.assertFalse(self.rack.desc_units)
+        self.assertEqual(self.device.position, 1)
+
+
+class RackLockTestCase(RackLockTestMixin, PluginSharedTestCase):
+    def test_toggle_fails_fast_while_rack_is_locked(self):
+        for optimistic in (False, True):
+            with self.subTest(optimistic=optimistic), rack_lock_held(self.rack.pk):
+                with self.assertRaises(RackBusy):
+                    toggle_rack_units_order(self.rack, user=self.user, optimistic=optimistic)
+        self.assertUnchanged()
+        self.assertFalse(RackToggle.objects.exists())
+
+    def test_other_racks_are_not_blocked(self):
+        other = create_rack("Rack-Lock-Other", u_height=10).rack
+        with rack_lock_held(self.rack.pk):
+            _, created = toggle_rack_units_order(other, user=self.user)
+        self.assertTrue(created)
+
+    def test_undo_fails_fast_while_rack_is_locked(self):
+        toggle, _ = toggle_rack_units_order(self.rack, user=self.user)
+        with rack_lock_held(self.rack.pk), self.assertRaises(RackBusy):
+            undo_rack_toggle(toggle, user=self.user)
+        toggle.refresh_from_db()
+        self.assertFalse(toggle.undone)
+
+    def test_plan_apply_reports_busy_rack(self):
+        plan = build_plan(Rack.objects.filter(pk=self.rack.pk))
+        with rack_lock_held(self.rack.pk):
+            results = apply_plan(plan, user=self.user)
+        self.assertEqual([result.status for result in results], ["busy"])
+        self.assertUnchanged()
+
+        # The plan still applies once the rack is free.
+        self.assertEqual([result.status for result in apply_plan(plan, user=self.user)], ["applied"])
+
+    def test_lock_timeout_waits_for_other_operation(self):
+        with mock.patch.object(locking, "_get_rack_lock_timeout", return_value=5):
+            with rack_lock_held(self.rack.pk, release_after=0.2):
+                _, created = toggle_rack_units_order(self.rack, user=self.user)
+        self.assertTrue(created)
+
+    def test_view_reports_busy_rack(self):
+        url = reverse("plugins:netbox_rack_inverter:rack_toggle_units_order", kwargs={"pk": self.rack.pk})
+        with rack_lock_held(self.rack.pk):
+            response = self.client.post(url)
+        self.assertRedirects(response, self.rack.get_absolute_url(), fetch_redirect_response=False)
+        messages = [str(message) for message in get_messages(response.wsgi_request)]
+        self.assertTrue(any("Another operation is changing this rack" in message for message in messages))
+        self.assertUnchanged()
+
+
+class RackLockAPITestCase(RackLockTestMixin, PluginSharedAPITestCase):
+    def test_toggle_returns_conflict_while_rack_is_locked(self):
+        url = reverse("plugins-api:netbox_rack_inverter-api:rack_toggle_units_order", kwargs={"pk": self.rack.pk})
+        with rack_lock_held(self.rack.pk):
+            response = self.client.post(url, format="json")
+        self.assertHttpStatus(response, 409)
+        self.assertUnchanged()
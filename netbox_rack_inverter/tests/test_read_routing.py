@@ -0,0 +1,68 @@
+"""
+Tests for routing read-only queries to the `read_database`.
+"""
+
+from unittest import mock
+
+from dcim.models import Rack
+from django.urls import reverse
+from django.utils.connection import ConnectionDoesNotExist
+
+from .. import routing
+from ..export import iter_plan_rows
+from ..models import RackToggle
+from ..plans import build_plan
+from ..template_content import RackConvertToDescendingUnitsButton
+from ..testing import TOGGLE_PERMISSIONS, PluginSharedTestCase, RackFixtureMixin
+from ..undo import undo_rack_toggle
+from ..utils import read_rack_layouts, toggle_rack_units_order
+
+# An alias that is not configured, so any query routed to it fails.
+MISSING_ALIAS = "rack-inverter-missing-replica"
+
+
+class ReadRoutingTestCase(RackFixtureMixin, PluginSharedTestCase):
+    user_permissions = [*TOGGLE_PERMISSIONS, "netbox_rack_inverter.view_racktoggle"]
+    rack_name = "Rack-Routing"
+    rack_options = {"u_height": 10, "devices": 1}
+
+    def _use_read_database(self, alias=MISSING_ALIAS):
+        patcher = mock.patch.object(routing, "get_plugin_config", return_value=alias)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_default_routing_is_unchanged(self):
+        queryset = Rack.objects.all()
+        self.assertIs(routing.for_read(queryset), queryset)
+
+    def test_for_read_uses_alias(self):
+        self._use_read_database("replica")
+        self.assertEqual(routing.for_read(Rack.objects.all()).db, "replica")
+
+    def test_read_paths_use_read_database(self):
+        self._use_read_database()
+        read_paths = {
+            "layouts": lambda: read_rack_layouts(routing.for_read(Rack.objects.all())),
+            "export": lambda: list(iter_plan_rows(routing.for_read(Rack.objects.all()))),
+            "plan": lambda: build_plan(routing.for_read(Rack.objects.all())),
+            "history": lambda: self.client.get(reverse("plugins:netbox_rack_inverter:racktoggle_list")),
+            "eligibility": lambda: self.client.get(reverse("plugins:netbox_rack_inverter:rack_toggle_eligibility")),
+        }
+        for name, read in read_paths.items():
+            with self.subTest(path=name), self.assertRaises(ConnectionDoesNotExist):
+                read()
+
+    def test_cached_button_state_uses_default_database(self):
+        self._use_read_database()
+        self.assertEqual(RackConvertToDescendingUnitsButton._get_missing_permissions(self.user, self.rack), [])
+
+    def test_writes_use_default_database(self):
+        self._use_read_database()
+        for optimistic in (False, True):
+            with self.subTest(optimistic=optimistic):
+                toggle, created = toggle_rack_units_order(
+                    Rack.objects.get(pk=self.rack.pk), user=self.user, optimistic=optimistic
+                )
+                self.assertTrue(created)
+                undo_rack_toggle(toggle, user=self.user)
+        self.assertEqual(RackToggle.objects.filter(undone=True).count(), 2)
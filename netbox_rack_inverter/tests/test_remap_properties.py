@@ -0,0 +1,268 @@
+"""
+Randomized property tests for the rack unit remapping kernels and the
+cached remap tables.
+
+Cases are drawn from a seeded `random.Random`. RACK_INVERTER_PROPERTY_CASES
+sets the number of cases per property (default 20000; use millions before
+trusting a new kernel) and RACK_INVERTER_PROPERTY_SEED the seed (default 0).
+A failure message includes the failing case.
+"""
+
+import os
+import random
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from ..remap import get_remap_table, is_valid_unit_span_for_rack, remap_position_for_descending_units
+from ..utils import RackUnitRangeError, plan_rack_toggle
+
+CASES = int(os.environ.get("RACK_INVERTER_PROPERTY_CASES", 20000))
+SEED = int(os.environ.get("RACK_INVERTER_PROPERTY_SEED", 0))
+
+# NetBox limits racks to 100U.
+MAX_U_HEIGHT = 100
+MAX_STARTING_UNIT = 200
+
+
+def random_rack(rng):
+    """
+    Return (starting_unit, u_height) for a random rack.
+    """
+    return rng.randint(1, MAX_STARTING_UNIT), rng.randint(1, MAX_U_HEIGHT)
+
+
+def random_object(rng, starting_unit, u_height, *, valid=None):
+    """
+    Return (position, height) for a random object in or around the rack.
+    With `valid` set, only objects that do (True) or do not (False) fit.
+    """
+    while True:
+        height = rng.randint(1, min(u_height + 2, 10))
+        position = rng.randint(starting_unit - 3, starting_unit + u_height + 2)
+        if valid is None:
+            return position, height
+        fits = starting_unit <= position and position + height - 1 <= starting_unit + u_height - 1
+        if fits == valid:
+            return position, height
+
+
+def random_case(rng, *, valid=None):
+    starting_unit, u_height = random_rack(rng)
+    position, height = random_object(rng, starting_unit, u_height, valid=valid)
+    return {
+        "position": position,
+        "height": height,
+        "starting_unit": starting_unit,
+        "u_height": u_height,
+    }
+
+
+class RemapKernelPropertiesMixin:
+    """
+    Properties every remap/validation kernel must satisfy. A faster variant
+    is proven equivalent by subclassing this with its own `remap` and
+    `is_valid` and running it with a large RACK_INVERTER_PROPERTY_CASES.
+    """
+
+    @staticmethod
+    def remap(*, position, device_height, rack_starting_unit, rack_u_height):
+        return remap_position_for_descending_units(
+            position=position,
+            device_height=device_height,
+            rack_starting_unit=rack_starting_unit,
+            rack_u_height=rack_u_height,
+        )
+
+    @staticmethod
+    def is_valid(*, position, object_height, rack_starting_unit, rack_u_height):
+        return is_valid_unit_span_for_rack(
+            position=position,
+            object_height=object_height,
+            rack_starting_unit=rack_starting_unit,
+            rack_u_height=rack_u_height,
+        )
+
+    def _remap(self, case, position=None):
+        return self.remap(
+            position=case["position"] if position is None else position,
+            device_height=case["height"],
+            rack_starting_unit=case["starting_unit"],
+            rack_u_height=case["u_height"],
+        )
+
+    def _is_valid(self, case, position=None):
+        return self.is_valid(
+            position=case["position"] if position is None else position,
+            object_height=case["height"],
+            rack_starting_unit=case["starting_unit"],
+            rack_u_height=case["u_height"],
+        )
+
+    def _cases(self, **kwargs):
+        rng = random.Random(SEED)
+        for _ in range(CASES):
+            yield random_case(rng, **kwargs)
+
+    def test_involution(self):
+        for case in self._cases():
+            if self._remap(case, self._remap(case)) != case["position"]:
+                self.fail(f"Remapping twice does not restore the position: {case}")
+
+    def test_involution_for_half_unit_positions(self):
+        rng = random.Random(SEED)
+        for _ in range(CASES):
+            case = random_case(rng)
+            case["position"] += Decimal("0.5") * rng.randint(0, 1)
+            if self._remap(case, self._remap(case)) != case["position"]:
+                self.fail(f"Remapping twice does not restore the position: {case}")
+
+    def test_span_is_mirrored(self):
+        # The units occupied after the remap are exactly the mirror images
+        # of the units occupied before it, so height and placement survive.
+        for case in self._cases(valid=True):
+            mirror_sum = 2 * case["starting_unit"] + case["u_height"] - 1
+            before = range(case["position"], case["position"] + case["height"])
+            after = self._remap(case)
+            if set(range(after, after + case["height"])) != {mirror_sum - unit for unit in before}:
+                self.fail(f"The remapped span is not the mirror of the original span: {case}")
+
+    def test_bounds_are_preserved(self):
+        for case in self._cases():
+            if self._is_valid(case) != self._is_valid(case, self._remap(case)):
+                self.fail(f"The remap changes whether the object fits in the rack: {case}")
+
+    def test_validation_matches_unit_enumeration(self):
+        for case in self._cases():
+            rack_units = range(case["starting_unit"], case["starting_unit"] + case["u_height"])
+            expected = all(unit in rack_units for unit in range(case["position"], case["position"] + case["height"]))
+            if self._is_valid(case) != expected:
+                self.fail(f"Validation disagrees with enumerating the occupied units: {case}")
+
+    def test_front_and_rear_objects_stay_aligned(self):
+        # The remap does not depend on the face, so a front and a rear
+        # object sharing units keep sharing exactly the same units, and
+        # objects that do not overlap still do not overlap.
+        rng = random.Random(SEED)
+        for _ in range(CASES):
+            case = random_case(rng, valid=True)
+            position, height = random_object(rng, case["starting_unit"], case["u_height"], valid=True)
+            other = {**case, "position": position, "height": height}
+            overlap_before = _overlaps(case["position"], case["height"], other["position"], other["height"])
+            overlap_after = _overlaps(self._remap(case), case["height"], self._remap(other), other["height"])
+            if overlap_before != overlap_after:
+                self.fail(f"The remap changes whether objects overlap: {case} and {other}")
+
+
+def _overlaps(position_a, height_a, position_b, height_b):
+    return position_a < position_b + height_b and position_b < position_a + height_a
+
+
+class RemapPropertiesTestCase(RemapKernelPropertiesMixin, SimpleTestCase):
+    pass
+
+
+class RemapTablePropertiesTestCase(RemapKernelPropertiesMixin, SimpleTestCase):
+    """
+    The remap tables only map objects that fit, so objects outside the rack
+    fall back to the scalar remap.
+    """
+
+    @staticmethod
+    def remap(*, position, device_height, rack_starting_unit, rack_u_height):
+        after = get_remap_table(rack_starting_unit, rack_u_height, device_height).remap(position)
+        if after is None:
+            return remap_position_for_descending_units(
+                position=position,
+                device_height=device_height,
+                rack_starting_unit=rack_starting_unit,
+                rack_u_height=rack_u_height,
+            )
+        return after
+
+    @staticmethod
+    def is_valid(*, position, object_height, rack_starting_unit, rack_u_height):
+        return get_remap_table(rack_starting_unit, rack_u_height, object_height).remap(position) is not None
+
+    def test_tables_match_scalar_kernels_exactly(self):
+        # Positions and heights as NetBox reads them (one decimal place) must
+        # give the same value, type and representation as the scalar kernels.
+        rng = random.Random(SEED)
+        for _ in range(CASES):
+            case = random_case(rng)
+            position, height = case["position"], case["height"]
+            if rng.random() < 0.5:
+                position = Decimal(position).quantize(Decimal("0.1")) + Decimal("0.5") * rng.randint(0, 1)
+                height = Decimal(height).quantize(Decimal("0.1"))
+            geometry = {"rack_starting_unit": case["starting_unit"], "rack_u_height": case["u_height"]}
+            expected = None
+            if is_valid_unit_span_for_rack(position=position, object_height=height, **geometry):
+                expected = remap_position_for_descending_units(position=position, device_height=height, **geometry)
+            after = get_remap_table(case["starting_unit"], case["u_height"], height).remap(position)
+            if (type(after), str(after)) != (type(expected), str(expected)):
+                self.fail(f"The remap table returns {after!r} instead of {expected!r}: {case}")
+
+
+class PlanRackTogglePropertiesTestCase(SimpleTestCase):
+    """
+    plan_rack_toggle() must agree with the scalar kernels object by object.
+    """
+
+    def test_plan_matches_scalar_kernels(self):
+        rng = random.Random(SEED)
+        for _ in range(max(CASES // 10, 1)):
+            starting_unit, u_height = random_rack(rng)
+            devices = [
+                (pk, *random_object(rng, starting_unit, u_height, valid=rng.random() < 0.98))
+                for pk in range(rng.randint(0, 20))
+            ]
+            reservations = [
+                (pk, sorted({random_object(rng, starting_unit, u_height, valid=True)[0] for _ in range(3)}))
+                for pk in range(rng.randint(0, 3))
+            ]
+            case = {"starting_unit": starting_unit, "u_height": u_height, "devices": devices}
+            fits = all(
+                is_valid_unit_span_for_rack(
+                    position=position,
+                    object_height=height,
+                    rack_starting_unit=starting_unit,
+                    rack_u_height=u_height,
+                )
+                for _, position, height in devices
+            )
+            try:
+                device_positions, reservation_units = plan_rack_toggle(
+                    starting_unit=starting_unit,
+                    rack_u_height=u_height,
+                    devices=devices,
+                    reservations=reservations,
+                )
+            except RackUnitRangeError:
+                if fits:
+                    self.fail(f"The plan rejected a rack whose objects all fit: {case}")
+                continue
+            if not fits:
+                self.fail(f"The plan accepted a rack with an object outside it: {case}")
+
+            expected = [
+                [
+                    pk,
+                    position,
+                    remap_position_for_descending_units(
+                        position=position,
+                        device_height=height,
+                        rack_starting_unit=starting_unit,
+                        rack_u_height=u_height,
+                    ),
+                ]
+                for pk, position, height in devices
+            ]
+            self.assertEqual(device_positions, expected, case)
+            self.assertEqual(
+                reservation_units,
+                [
+                    [pk, units, sorted(2 * starting_unit + u_height - 1 - unit for unit in units)]
+                    for pk, units in reservations
+                ],
+                case,
+            )
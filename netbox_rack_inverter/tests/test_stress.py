@@ -0,0 +1,131 @@
+"""
+Concurrency stress tests for rack toggles.
+
+These run real concurrent transactions and are skipped unless
+RACK_INVERTER_STRESS is set and the database is PostgreSQL (see TESTING.md).
+RACK_INVERTER_STRESS_WORKERS and RACK_INVERTER_STRESS_OPERATIONS scale the
+load. Each test prints its report to stderr.
+"""
+
+import os
+import sys
+from unittest import skipUnless
+
+from dcim.choices import DeviceFaceChoices
+from dcim.models import Device, DeviceRole, DeviceType, Manufacturer, Rack, RackReservation, Site
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TransactionTestCase
+
+from ..testing.stress import run_stress
+
+STRESS_ENABLED = bool(os.environ.get("RACK_INVERTER_STRESS"))
+WORKERS = int(os.environ.get("RACK_INVERTER_STRESS_WORKERS", 8))
+OPERATIONS = int(os.environ.get("RACK_INVERTER_STRESS_OPERATIONS", 25))
+# Long enough for every queued toggle of a rack to get its turn.
+RACK_LOCK_TIMEOUT = 60
+
+
+@skipUnless(STRESS_ENABLED, "Set RACK_INVERTER_STRESS=1 to run the concurrency stress tests.")
+class RackToggleStressTestCase(TransactionTestCase):
+    def setUp(self):
+        if connection.vendor != "postgresql":
+            self.skipTest("The stress tests need PostgreSQL row locks.")
+        self.user = get_user_model().objects.create_user(username="stress", is_superuser=True)
+        self.site = Site.objects.create(name="Stress Site", slug="stress-site")
+        manufacturer = Manufacturer.objects.create(name="Stress Mfg", slug="stress-mfg")
+        self.role = DeviceRole.objects.create(name="Stress Role", slug="stress-role", color="aa5500")
+        self.type_1u = DeviceType.objects.create(
+            manufacturer=manufacturer, model="Stress 1U", slug="stress-1u", u_height=1
+        )
+        self.type_2u = DeviceType.objects.create(
+            manufacturer=manufacturer, model="Stress 2U", slug="stress-2u", u_height=2
+        )
+        self.racks = [
+            Rack.objects.create(name=f"Rack-Stress-{index}", site=self.site, u_height=42) for index in range(4)
+        ]
+        # Pinned devices fill the lower half of each rack; floating devices
+        # are moved between racks and sit in the upper half.
+        self.pinned = []
+        for rack in self.racks:
+            for position in range(1, 20, 2):
+                self.pinned.append(self._create_device(rack, self.type_2u, position))
+            RackReservation.objects.create(rack=rack, units=[40, 41], user=self.user, description="Stress")
+        self.floating = [
+            self._create_device(rack, self.type_1u, position) for rack in self.racks for position in range(25, 35)
+        ]
+
+    def _create_device(self, rack, device_type, position):
+        return Device.objects.create(
+            name=f"{rack.name}-{device_type.u_height}u-{position}",
+            device_type=device_type,
+            role=self.role,
+            site=self.site,
+            rack=rack,
+            position=position,
+            face=DeviceFaceChoices.FACE_FRONT,
+        )
+
+    def _run(self, scenario, *, racks, **kwargs):
+        kwargs.setdefault("rack_lock_timeout", 0)
+        report = run_stress(
+            scenario,
+            user=self.user,
+            racks=racks,
+            pinned_devices=[device for device in self.pinned if device.rack in racks],
+            operations=OPERATIONS,
+            **kwargs,
+        )
+        sys.stderr.write(f"\n{report.summary()}\n")
+        self.assertEqual(report.errors, [])
+        self.assertEqual(report.deadlocks, 0)
+        self.assertEqual(report.lost_updates, [])
+        return report
+
+    def test_overlapping_toggles(self):
+        # More workers than racks, so most toggles wait for another to
+        # release the rack.
+        report = self._run(
+            "overlapping toggles",
+            racks=self.racks[:2],
+            toggle_workers=WORKERS,
+            rack_lock_timeout=RACK_LOCK_TIMEOUT,
+        )
+        self.assertEqual(report.outcomes["toggled"], WORKERS * OPERATIONS)
+        self.assertEqual(report.rejected["toggle"], 0)
+        self.assertTrue(report.rack_lock_waits)
+
+    def test_overlapping_toggles_fail_fast(self):
+        # Without a rack lock timeout, toggles of a busy rack are rejected.
+        report = self._run("overlapping toggles (fail fast)", racks=self.racks[:2], toggle_workers=WORKERS)
+        self.assertEqual(report.outcomes["toggled"] + report.outcomes["RackBusy"], WORKERS * OPERATIONS)
+        self.assertEqual(report.rejected["toggle"], report.outcomes["RackBusy"])
+        self.assertEqual(len(report.latencies["toggle"]), report.outcomes["toggled"])
+
+    def test_overlapping_toggles_optimistic(self):
+        report = self._run(
+            "overlapping toggles (optimistic)",
+            racks=self.racks[:2],
+            toggle_workers=WORKERS,
+            concurrency_mode="optimistic",
+        )
+        self.assertEqual(sum(report.outcomes.values()), WORKERS * OPERATIONS)
+
+    def test_toggles_with_device_moves(self):
+        self._run(
+            "toggles with device moves",
+            racks=self.racks,
+            floating_devices=self.floating,
+            toggle_workers=max(WORKERS - 2, 1),
+            move_workers=2,
+        )
+
+    def test_toggles_with_device_moves_optimistic(self):
+        self._run(
+            "toggles with device moves (optimistic)",
+            racks=self.racks,
+            floating_devices=self.floating,
+            toggle_workers=max(WORKERS - 2, 1),
+            move_workers=2,
+            concurrency_mode="optimistic",
+        )
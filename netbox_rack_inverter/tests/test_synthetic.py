@@ -0,0 +1,90 @@
+"""
+Tests for the synthetic topology generator.
+"""
+
+import random
+from io import StringIO
+
+from dcim.models import Device, Rack, RackReservation
+from django.core.management import CommandError, call_command
+
+from ..models import RackEligibility
+from ..remap import is_valid_unit_span_for_rack
+from ..testing import PluginTestCase
+from ..testing.synthetic import generate_topology, plan_rack_layout
+
+
+def _layouts(prefix):
+    # Everything but names and primary keys, rack by rack.
+    racks = Rack.objects.filter(name__startswith=prefix).order_by("name")
+    return [
+        (
+            rack.u_height,
+            rack.starting_unit,
+            rack.desc_units,
+            sorted(
+                (float(position), face, slug)
+                for position, face, slug in Device.objects.filter(rack=rack).values_list(
+                    "position", "face", "device_type__slug"
+                )
+            ),
+            sorted(RackReservation.objects.filter(rack=rack).values_list("units", flat=True)),
+        )
+        for rack in racks
+    ]
+
+
+class SyntheticTopologyTestCase(PluginTestCase):
+    def test_layouts_fit_their_racks(self):
+        rng = random.Random(1)
+        for _ in range(200):
+            u_height, starting_unit = rng.choice((12, 42, 48)), rng.choice((1, 1, 10))
+            devices, reservations = plan_rack_layout(
+                rng, u_height=u_height, starting_unit=starting_unit, fill=0.8, reservation_rate=0.5
+            )
+            occupied = [unit for units in reservations for unit in units]
+            for key, position, _ in devices:
+                height = 1 if key == "half" else key
+                self.assertTrue(
+                    is_valid_unit_span_for_rack(
+                        position=position,
+                        object_height=height,
+                        rack_starting_unit=starting_unit,
+                        rack_u_height=u_height,
+                    )
+                )
+                occupied += [] if key == "half" else list(range(position, position + height))
+            self.assertEqual(len(occupied), len(set(occupied)))
+
+    def test_generation_is_reproducible(self):
+        generate_topology(sites=2, racks=30, seed=7, prefix="alpha", batch_size=8)
+        generate_topology(sites=2, racks=30, seed=7, prefix="beta", batch_size=8)
+        generate_topology(sites=2, racks=30, seed=8, prefix="gamma", batch_size=8)
+
+        self.assertEqual(_layouts("alpha"), _layouts("beta"))
+        self.assertNotEqual(_layouts("alpha"), _layouts("gamma"))
+
+    def test_generated_topology(self):
+        summary = generate_topology(sites=3, racks=40, seed=3, prefix="topo", reservation_rate=1.0)
+        racks = Rack.objects.filter(name__startswith="topo")
+
+        self.assertEqual(summary.racks, 40)
+        self.assertEqual(summary.devices, Device.objects.filter(rack__in=racks).count())
+        self.assertEqual(summary.reservations, RackReservation.objects.filter(rack__in=racks).count())
+        self.assertEqual(set(racks.values_list("site__slug", flat=True)), {"topo-site-1", "topo-site-2", "topo-site-3"})
+        self.assertEqual(set(racks.values_list("desc_units", flat=True)), {False, True})
+        self.assertEqual(set(Device.objects.filter(rack__in=racks).values_list("face", flat=True)), {"front", "rear"})
+        self.assertGreater(len(set(racks.values_list("u_height", flat=True))), 1)
+
+        eligibility = RackEligibility.objects.filter(rack__in=racks)
+        self.assertEqual(eligibility.count(), 40)
+        self.assertTrue(all(row.toggle_eligible for row in eligibility))
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command("generate_synthetic_racks", sites=1, racks=5, prefix="cmd", stdout=stdout)
+        self.assertIn("5 rack(s)", stdout.getvalue())
+        self.assertEqual(Rack.objects.filter(name__startswith="cmd").count(), 5)
+
+        with self.assertRaisesMessage(CommandError, "already exists"):
+            call_command("generate_synthetic_racks", sites=1, racks=5, prefix="cmd", stdout=stdout)
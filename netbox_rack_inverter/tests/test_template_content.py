@@ -47,6 +47,14 @@ class RackTemplateContentTestCase(PluginTestCase):
         )
         return extension.buttons()
 
+    def _render_fragment(self, rack, user=None):
+        request = self.request_factory.get("/")
+        request.user = self.user if user is None else user
+        return RackConvertToDescendingUnitsButton.render_fragment(request, rack)
+
+    def _fragment_url(self, rack):
+        return reverse("plugins:netbox_rack_inverter:rack_toggle_button", kwargs={"pk": rack.pk})
+
     def _grant_constrained_permission(self, permission_name, *, constraints):
         object_type, action = resolve_permission_type(permission_name)
         permission = ObjectPermission.objects.create(
@@ -84,7 +92,7 @@ class RackTemplateContentTestCase(PluginTestCase):
                 self.add_permissions(*self.required_permissions)
                 self.remove_permissions(permission)
                 self.user = self.user.__class__.objects.get(pk=self.user.pk)
-                html = self._render_buttons(self.rack)
+                html = self._render_fragment(self.rack)
                 if permission == "dcim.view_rack":
                     self.assertEqual(html, "")
                 else:
@@ -93,7 +101,7 @@ class RackTemplateContentTestCase(PluginTestCase):
 
     def test_button_disabled_with_details_when_change_permissions_are_missing(self):
         self.add_permissions("dcim.view_rack")
-        html = self._render_buttons(self.rack)
+        html = self._render_fragment(self.rack)
         self.assertIn("Switch to Descending Units", html)
         self.assertIn("disabled", html)
         self.assertIn("Permission issues prevent you from performing this action", html)
@@ -128,7 +136,7 @@ class RackTemplateContentTestCase(PluginTestCase):
             constraints={"name": "allowed-template-device"},
         )
 
-        html = self._render_buttons(self.rack)
+        html = self._render_fragment(self.rack)
         self.assertIn("disabled", html)
         self.assertIn("dcim.change_device on 1 mounted device(s)", html)
 
@@ -153,14 +161,14 @@ class RackTemplateContentTestCase(PluginTestCase):
             constraints={"description": "allowed-template-reservation"},
         )
 
-        html = self._render_buttons(self.rack)
+        html = self._render_fragment(self.rack)
         self.assertIn("disabled", html)
         self.assertIn("dcim.change_rackreservation on 1 reservation(s)", html)
 
     def test_button_rendered_with_required_permissions(self):
         self.add_permissions(*self.required_permissions)
 
-        html = self._render_buttons(self.rack)
+        html = self._render_fragment(self.rack)
 
         self.assertIn("Switch to Descending Units", html)
         self.assertNotIn("disabled", html)
@@ -177,7 +185,7 @@ class RackTemplateContentTestCase(PluginTestCase):
         self.rack.desc_units = True
         self.rack.save()
 
-        html = self._render_buttons(self.rack)
+        html = self._render_fragment(self.rack)
 
         self.assertIn("Switch to Ascending Units", html)
         self.assertNotIn("Switch to Descending Units", html)
@@ -193,12 +201,16 @@ class RackTemplateContentTestCase(PluginTestCase):
         html = response.content.decode("utf-8")
 
         self.assertIn("Switch to Descending Units", html)
+        self.assertIn(self._fragment_url(self.rack), html)
+
+        response = self.client.get(self._fragment_url(self.rack))
+        self.assertHttpStatus(response, 200)
         self.assertIn(
             reverse(
                 "plugins:netbox_rack_inverter:rack_toggle_units_order",
                 kwargs={"pk": self.rack.pk},
             ),
-            html,
+            response.content.decode("utf-8"),
         )
 
     def test_button_does_not_appear_on_non_rack_detail_page(self):
@@ -213,3 +225,35 @@ class RackTemplateContentTestCase(PluginTestCase):
 
         self.assertNotIn("Switch to Descending Units", html)
         self.assertNotIn("Switch to Ascending Units", html)
+
+    def test_placeholder_defers_permission_diagnosis(self):
+        self.add_permissions("dcim.view_rack")
+        for position in range(1, 11):
+            Device.objects.create(
+                name=f"placeholder-device-{position}",
+                device_type=self.device_type,
+                role=self.role,
+                site=self.site,
+                rack=self.rack,
+                position=position,
+                face=DeviceFaceChoices.FACE_FRONT,
+            )
+
+        # Only the view permission check runs, however many devices are mounted.
+        self.user.has_perm("dcim.view_rack")
+        with self.assertNumQueries(1):
+            html = self._render_buttons(self.rack)
+
+        self.assertIn(f'hx-get="{self._fragment_url(self.rack)}"', html)
+        self.assertIn('hx-trigger="load"', html)
+        self.assertIn("Switch to Descending Units", html)
+        self.assertNotIn("Permission issues", html)
+
+    def test_fragment_requires_view_permission(self):
+        response = self.client.get(self._fragment_url(self.rack))
+        self.assertHttpStatus(response, 404)
+
+        self.add_permissions("dcim.view_rack")
+        response = self.client.get(self._fragment_url(self.rack))
+        self.assertHttpStatus(response, 200)
+        self.assertContains(response, "Permission issues prevent you from performing this action")
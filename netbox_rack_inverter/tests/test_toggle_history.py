@@ -0,0 +1,136 @@
+"""
+Tests for the rack toggle history views, filters, REST API and GraphQL API.
+"""
+
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+
+from ..filtersets import RackToggleFilterSet
+from ..models import RackToggle
+from ..testing import (
+    TOGGLE_PERMISSIONS,
+    PluginSharedAPITestCase,
+    PluginSharedGraphQLTestCase,
+    PluginSharedTestCase,
+    RackFixtureMixin,
+    create_rack,
+)
+from ..utils import toggle_rack_units_order
+
+
+class RackToggleHistoryTestMixin(RackFixtureMixin):
+    user_permissions = TOGGLE_PERMISSIONS
+    rack_name = "Rack-History"
+    rack_options = {"u_height": 10, "devices": 1}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_rack = create_rack("Rack-History-Other", u_height=10).rack
+        cls.other_user = get_user_model().objects.create_user(username="history-other")
+
+        cls.toggle, _ = toggle_rack_units_order(cls.rack, user=cls.user, idempotency_key="history-key")
+        cls.other_toggle = RackToggle.objects.create(
+            rack=cls.other_rack,
+            user=cls.other_user,
+            desc_units=True,
+            duration=0.25,
+        )
+        RackToggle.objects.filter(pk=cls.other_toggle.pk).update(created=timezone.now() - timedelta(days=7))
+
+
+class RackToggleHistoryTestCase(RackToggleHistoryTestMixin, PluginSharedTestCase):
+    def test_toggle_records_duration(self):
+        self.assertIsNotNone(self.toggle.duration)
+        self.assertGreater(self.toggle.duration, 0)
+
+    def test_optimistic_toggle_records_duration(self):
+        toggle, _ = toggle_rack_units_order(self.other_rack, user=self.user, optimistic=True)
+        self.assertGreater(toggle.duration, 0)
+
+    def test_filterset(self):
+        queryset = RackToggle.objects.all()
+        cases = (
+            ({"rack_id": [self.rack.pk]}, {self.toggle.pk}),
+            ({"site_id": [self.site.pk]}, {self.toggle.pk, self.other_toggle.pk}),
+            ({"user": [self.other_user.username]}, {self.other_toggle.pk}),
+            ({"q": "history-key"}, {self.toggle.pk}),
+            ({"q": "Other"}, {self.other_toggle.pk}),
+            ({"created__gte": (timezone.now() - timedelta(days=1)).isoformat()}, {self.toggle.pk}),
+        )
+        for params, expected in cases:
+            with self.subTest(params=params):
+                self.assertEqual({toggle.pk for toggle in RackToggleFilterSet(params, queryset).qs}, expected)
+
+    def test_list_view(self):
+        url = reverse("plugins:netbox_rack_inverter:racktoggle_list")
+        self.assertHttpStatus(self.client.get(url), 403)
+
+        self.add_permissions("netbox_rack_inverter.view_racktoggle")
+        response = self.client.get(url, {"user_id": self.user.pk})
+        self.assertHttpStatus(response, 200)
+        self.assertContains(response, self.toggle.get_absolute_url())
+        self.assertNotContains(response, self.other_toggle.get_absolute_url())
+
+    def test_detail_view(self):
+        self.add_permissions("netbox_rack_inverter.view_racktoggle")
+        response = self.client.get(self.toggle.get_absolute_url())
+        self.assertHttpStatus(response, 200)
+        self.assertContains(response, "Rack-History")
+        self.assertContains(
+            response, reverse("plugins:netbox_rack_inverter:racktoggle_undo", kwargs={"pk": self.toggle.pk})
+        )
+
+    def test_search(self):
+        self.add_permissions("netbox_rack_inverter.view_racktoggle")
+        response = self.client.get(reverse("search"), {"q": "history-key"})
+        self.assertHttpStatus(response, 200)
+        self.assertContains(response, self.toggle.get_absolute_url())
+
+    def test_search_by_rack_name(self):
+        self.add_permissions("netbox_rack_inverter.view_racktoggle")
+        response = self.client.get(reverse("search"), {"q": "Rack-History-Other"})
+        self.assertHttpStatus(response, 200)
+        self.assertContains(response, self.other_toggle.get_absolute_url())
+
+
+class RackToggleHistoryAPITestCase(RackToggleHistoryTestMixin, PluginSharedAPITestCase):
+    def test_list_filters_and_fields(self):
+        self.add_permissions("netbox_rack_inverter.view_racktoggle")
+        url = reverse("plugins-api:netbox_rack_inverter-api:racktoggle-list")
+        response = self.client.get(url, {"rack_id": self.rack.pk})
+        self.assertHttpStatus(response, 200)
+
+        (result,) = response.data["results"]
+        self.assertEqual(result["id"], self.toggle.pk)
+        self.assertTrue(result["display_url"].endswith(self.toggle.get_absolute_url()))
+        self.assertAlmostEqual(result["duration"], self.toggle.duration)
+
+
+class RackToggleHistoryGraphQLTestCase(RackToggleHistoryTestMixin, PluginSharedGraphQLTestCase):
+    def test_rack_toggle_list(self):
+        self.add_permissions("netbox_rack_inverter.view_racktoggle")
+        data = self.execute_query(
+            """
+            query History($rack: ID!) {
+              rack_toggle_list(filters: {rack: {pk: $rack}}) {
+                id
+                desc_units
+                duration
+                rack { name }
+              }
+            }
+            """,
+            {"rack": str(self.rack.pk)},
+        )
+        self.assertNotIn("errors", data)
+        (toggle,) = data["data"]["rack_toggle_list"]
+        self.assertEqual(toggle["id"], str(self.toggle.pk))
+        self.assertEqual(toggle["rack"]["name"], "Rack-History")
+
+    def test_rack_toggle_list_is_restricted(self):
+        data = self.execute_query("{ rack_toggle_list { id } }")
+        self.assertEqual(data["data"]["rack_toggle_list"], [])
@@ -2,14 +2,19 @@
 Integration tests for rack units order toggling.
 """
 
+from core.models import ObjectChange
 from dcim.choices import DeviceFaceChoices
 from dcim.models import Device, DeviceRole, DeviceType, Manufacturer, Rack, RackReservation, Site
 from django.contrib.messages import get_messages
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from users.models import ObjectPermission
 from utilities.permissions import resolve_permission_type
 
-from ..testing import PluginTestCase
+from ..models import RackToggle
+from ..testing import PluginAPITestCase, PluginSharedTestCase, PluginTestCase, create_rack
+from ..utils import RackUnitRangeError, toggle_rack_units_order
 from ..views import remap_position_for_descending_units
 
 
@@ -49,12 +54,18 @@ class RackToggleUnitsOrderViewTestCase(PluginTestCase):
             u_height=4,
         )
 
-    def _toggle(self, rack, follow=False, route_name="plugins:netbox_rack_inverter:rack_toggle_units_order"):
+    def _toggle(
+        self,
+        rack,
+        follow=False,
+        route_name="plugins:netbox_rack_inverter:rack_toggle_units_order",
+        data=None,
+    ):
         url = reverse(
             route_name,
             kwargs={"pk": rack.pk},
         )
-        return self.client.post(url, follow=follow)
+        return self.client.post(url, data=data or {}, follow=follow)
 
     def _create_device(self, *, rack, name, device_type, position):
         return Device.objects.create(
@@ -393,7 +404,9 @@ class RackToggleUnitsOrderViewTestCase(PluginTestCase):
         target_rack = Rack.objects.create(name="Rack-Target", site=self.site, u_height=42, starting_unit=1)
         other_rack = Rack.objects.create(name="Rack-Other", site=self.site, u_height=42, starting_unit=1)
 
-        target_device = self._create_device(rack=target_rack, name="target-device", device_type=self.type_2u, position=40)
+        target_device = self._create_device(
+            rack=target_rack, name="target-device", device_type=self.type_2u, position=40
+        )
         other_device = self._create_device(rack=other_rack, name="other-device", device_type=self.type_2u, position=40)
 
         target_reservation = RackReservation.objects.create(
@@ -592,8 +605,16 @@ class RackToggleUnitsOrderViewTestCase(PluginTestCase):
 
     def test_toggle_is_reversible_for_multiple_racks_and_starts(self):
         scenarios = [
-            {"u_height": 24, "starting_unit": 1, "positions": [(self.type_1u, 24), (self.type_2u, 10), (self.type_4u, 2)]},
-            {"u_height": 16, "starting_unit": 10, "positions": [(self.type_1u, 25), (self.type_2u, 18), (self.type_4u, 10)]},
+            {
+                "u_height": 24,
+                "starting_unit": 1,
+                "positions": [(self.type_1u, 24), (self.type_2u, 10), (self.type_4u, 2)],
+            },
+            {
+                "u_height": 16,
+                "starting_unit": 10,
+                "positions": [(self.type_1u, 25), (self.type_2u, 18), (self.type_4u, 10)],
+            },
         ]
 
         for index, scenario in enumerate(scenarios, start=1):
@@ -627,3 +648,196 @@ class RackToggleUnitsOrderViewTestCase(PluginTestCase):
                 for device in devices:
                     device.refresh_from_db()
                     self.assertEqual(device.position, original_positions[device.pk])
+
+    def test_toggle_to_current_orientation_is_noop(self):
+        rack = Rack.objects.create(name="Rack-Noop", site=self.site, u_height=42, starting_unit=1)
+        device = self._create_device(rack=rack, name="noop-device", device_type=self.type_1u, position=42)
+
+        response = self._toggle(rack, data={"desc_units": "false"}, follow=True)
+        self.assertHttpStatus(response, 200)
+        messages = self._get_message_texts(response)
+        self.assertTrue(any("no changes were made" in m for m in messages))
+
+        rack.refresh_from_db()
+        device.refresh_from_db()
+        self.assertFalse(rack.desc_units)
+        self.assertEqual(device.position, 42)
+        self.assertFalse(RackToggle.objects.filter(rack=rack).exists())
+
+    def test_double_submitted_target_only_toggles_once(self):
+        rack = Rack.objects.create(name="Rack-DoubleSubmit", site=self.site, u_height=42, starting_unit=1)
+        device = self._create_device(rack=rack, name="double-device", device_type=self.type_2u, position=40)
+
+        for _ in range(2):
+            response = self._toggle(rack, data={"desc_units": "true"})
+            self.assertHttpStatus(response, 302)
+
+        rack.refresh_from_db()
+        device.refresh_from_db()
+        self.assertTrue(rack.desc_units)
+        self.assertEqual(device.position, 2)
+        self.assertEqual(RackToggle.objects.filter(rack=rack).count(), 1)
+
+    def test_invalid_target_is_rejected(self):
+        rack = Rack.objects.create(name="Rack-BadTarget", site=self.site, u_height=42, starting_unit=1)
+        response = self._toggle(rack, data={"desc_units": "sideways"})
+        self.assertHttpStatus(response, 400)
+        rack.refresh_from_db()
+        self.assertFalse(rack.desc_units)
+
+    def test_repeated_idempotency_key_only_toggles_once(self):
+        rack = Rack.objects.create(name="Rack-Idempotent", site=self.site, u_height=42, starting_unit=1)
+        device = self._create_device(rack=rack, name="idempotent-device", device_type=self.type_1u, position=42)
+
+        for _ in range(2):
+            response = self._toggle(rack, data={"idempotency_key": "change-42"})
+            self.assertHttpStatus(response, 302)
+
+        rack.refresh_from_db()
+        device.refresh_from_db()
+        self.assertTrue(rack.desc_units)
+        self.assertEqual(device.position, 1)
+        self.assertEqual(RackToggle.objects.get(rack=rack).idempotency_key, "change-42")
+
+    def test_noop_costs_one_query(self):
+        rack = Rack.objects.create(name="Rack-NoopQueries", site=self.site, u_height=42, starting_unit=1)
+        self._create_device(rack=rack, name="noop-query-device", device_type=self.type_1u, position=42)
+        # Load the user's object permissions, cached for the request.
+        self.user.has_perm("dcim.view_rack")
+
+        # Only the object permission check on the rack; no locks or writes.
+        with self.assertNumQueries(1):
+            toggle, created = toggle_rack_units_order(rack, user=self.user, desc_units=False)
+        self.assertIsNone(toggle)
+        self.assertFalse(created)
+
+    def test_invalid_idempotency_keys_are_rejected(self):
+        rack = Rack.objects.create(name="Rack-BadKey", site=self.site, u_height=42, starting_unit=1)
+        device = self._create_device(rack=rack, name="bad-key-device", device_type=self.type_1u, position=42)
+        url = reverse("plugins:netbox_rack_inverter:rack_toggle_units_order", kwargs={"pk": rack.pk})
+
+        for scenario, data, headers in (
+            ("oversized header", {}, {"HTTP_IDEMPOTENCY_KEY": "k" * 101}),
+            ("oversized field", {"idempotency_key": "k" * 101}, {}),
+            ("whitespace", {"idempotency_key": "two words"}, {}),
+        ):
+            with self.subTest(scenario=scenario):
+                response = self.client.post(url, data=data, **headers)
+                self.assertHttpStatus(response, 400)
+
+        rack.refresh_from_db()
+        device.refresh_from_db()
+        self.assertFalse(rack.desc_units)
+        self.assertEqual(device.position, 42)
+        self.assertFalse(RackToggle.objects.filter(rack=rack).exists())
+
+
+class PessimisticToggleRowsTestCase(PluginSharedTestCase):
+    user_permissions = list(RackToggleUnitsOrderViewTestCase.action_permissions)
+
+    def test_device_that_does_not_move_is_not_rewritten(self):
+        # In an 11U rack, the device in U6 keeps its position.
+        fixture = create_rack("Rack-Centered", u_height=11, devices=6)
+        moved, centered = fixture.devices[0], fixture.devices[5]
+
+        toggle, _ = toggle_rack_units_order(fixture.rack, user=self.user, optimistic=False)
+
+        self.assertEqual([pk for pk, _, _ in toggle.device_positions], [device.pk for device in fixture.devices])
+        self.assertFalse(ObjectChange.objects.filter(changed_object_id=centered.pk))
+        self.assertTrue(ObjectChange.objects.filter(changed_object_id=moved.pk))
+        centered.refresh_from_db()
+        self.assertEqual(centered.position, 6)
+
+    def test_invalid_rack_does_not_load_full_device_rows(self):
+        fixture = create_rack("Rack-NarrowRead", u_height=10, devices=2)
+        Device.objects.filter(pk=fixture.devices[1].pk).update(position=11)
+
+        with CaptureQueriesContext(connection) as queries:
+            with self.assertRaises(RackUnitRangeError):
+                toggle_rack_units_order(fixture.rack, user=self.user, optimistic=False)
+        column = f'"{Device._meta.db_table}"."custom_field_data"'
+        self.assertFalse([query["sql"] for query in queries if column in query["sql"]])
+
+
+class RackToggleUnitsOrderAPITestCase(PluginAPITestCase):
+    required_permissions = RackToggleUnitsOrderViewTestCase.action_permissions
+
+    def setUp(self):
+        super().setUp()
+        self.add_permissions(*self.required_permissions)
+        self.site = Site.objects.create(name="API Toggle Site", slug="api-toggle-site")
+        manufacturer = Manufacturer.objects.create(name="API Toggle Mfg", slug="api-toggle-mfg")
+        role = DeviceRole.objects.create(name="API Toggle Role", slug="api-toggle-role", color="00ffff")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer,
+            model="API Toggle 1U",
+            slug="api-toggle-1u",
+            u_height=1,
+        )
+        self.rack = Rack.objects.create(name="Rack-API", site=self.site, u_height=10, starting_unit=1)
+        self.device = Device.objects.create(
+            name="api-device",
+            device_type=device_type,
+            role=role,
+            site=self.site,
+            rack=self.rack,
+            position=10,
+            face=DeviceFaceChoices.FACE_FRONT,
+        )
+        self.url = reverse(
+            "plugins-api:netbox_rack_inverter-api:rack_toggle_units_order",
+            kwargs={"pk": self.rack.pk},
+        )
+
+    def test_toggle_to_target(self):
+        response = self.client.post(self.url, {"desc_units": True}, format="json")
+        self.assertHttpStatus(response, 201)
+        self.assertTrue(response.data["changed"])
+        self.assertTrue(response.data["desc_units"])
+        self.device.refresh_from_db()
+        self.assertEqual(self.device.position, 1)
+
+        response = self.client.post(self.url, {"desc_units": True}, format="json")
+        self.assertHttpStatus(response, 200)
+        self.assertFalse(response.data["changed"])
+        self.assertIsNone(response.data["toggle"])
+        self.device.refresh_from_db()
+        self.assertEqual(self.device.position, 1)
+
+    def test_retry_with_idempotency_header_returns_original_toggle(self):
+        response = self.client.post(self.url, {}, format="json", HTTP_IDEMPOTENCY_KEY="retry-1")
+        self.assertHttpStatus(response, 201)
+        toggle_id = response.data["toggle"]["id"]
+
+        response = self.client.post(self.url, {}, format="json", HTTP_IDEMPOTENCY_KEY="retry-1")
+        self.assertHttpStatus(response, 200)
+        self.assertFalse(response.data["changed"])
+        self.assertEqual(response.data["toggle"]["id"], toggle_id)
+
+        self.rack.refresh_from_db()
+        self.assertTrue(self.rack.desc_units)
+        self.assertEqual(RackToggle.objects.filter(rack=self.rack).count(), 1)
+
+    def test_invalid_idempotency_keys_are_rejected(self):
+        for scenario, data, headers in (
+            ("oversized header", {}, {"HTTP_IDEMPOTENCY_KEY": "k" * 101}),
+            ("oversized field", {"idempotency_key": "k" * 101}, {}),
+            ("whitespace header", {}, {"HTTP_IDEMPOTENCY_KEY": "two words"}),
+        ):
+            with self.subTest(scenario=scenario):
+                response = self.client.post(self.url, data, format="json", **headers)
+                self.assertHttpStatus(response, 400)
+                self.assertIn("idempotency_key", response.data)
+
+        self.rack.refresh_from_db()
+        self.device.refresh_from_db()
+        self.assertFalse(self.rack.desc_units)
+        self.assertEqual(self.device.position, 10)
+        self.assertFalse(RackToggle.objects.filter(rack=self.rack).exists())
+
+    def test_toggle_requires_change_permission(self):
+        self.remove_permissions("dcim.change_device")
+        response = self.client.post(self.url, {"desc_units": True}, format="json")
+        self.assertHttpStatus(response, 403)
+        self.rack.refresh_from_db()
+        self.assertFalse(self.rack.desc_units)
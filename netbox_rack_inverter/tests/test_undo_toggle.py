@@ -0,0 +1,250 @@
+"""
+Tests for undoing rack toggles from stored snapshots.
+"""
+
+from core.models import ObjectChange
+from dcim.choices import DeviceFaceChoices
+from dcim.models import Device
+from django.contrib.messages import get_messages
+from django.test import Client
+from django.urls import reverse
+
+from ..models import RackToggle
+from ..testing import (
+    TOGGLE_PERMISSIONS,
+    PluginSharedAPITestCase,
+    PluginSharedTestCase,
+    RackFixtureMixin,
+    create_rack,
+)
+
+
+class RackToggleUndoTestMixin(RackFixtureMixin):
+    rack_name = "Rack-Undo"
+    # 2U devices in U1-U2 and U3-U4, and reservations of U11 and U12.
+    rack_options = {"u_height": 12, "devices": 2, "device_height": 2, "reservations": 2}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.device_low, cls.device_high = cls.fixture.devices
+        cls.reservation = cls.fixture.reservations[0]
+
+    def setUp(self):
+        super().setUp()
+        # The toggle view is session based, so drive it through a logged-in
+        # client even when the test case itself uses token authentication.
+        self.ui_client = Client()
+        self.ui_client.force_login(self.user)
+
+    def _toggle(self):
+        return self.ui_client.post(
+            reverse("plugins:netbox_rack_inverter:rack_toggle_units_order", kwargs={"pk": self.rack.pk})
+        )
+
+    def _assert_original_layout(self):
+        self.rack.refresh_from_db()
+        self.device_low.refresh_from_db()
+        self.device_high.refresh_from_db()
+        self.reservation.refresh_from_db()
+        self.assertFalse(self.rack.desc_units)
+        self.assertEqual(self.device_low.position, 1)
+        self.assertEqual(self.device_high.position, 3)
+        self.assertEqual(self.reservation.units, [11])
+
+
+class RackToggleUndoViewTestCase(RackToggleUndoTestMixin, PluginSharedTestCase):
+    user_permissions = TOGGLE_PERMISSIONS
+
+    def _undo(self, toggle, follow=False):
+        url = reverse("plugins:netbox_rack_inverter:racktoggle_undo", kwargs={"pk": toggle.pk})
+        return self.client.post(url, follow=follow)
+
+    def test_toggle_records_snapshot(self):
+        self.assertHttpStatus(self._toggle(), 302)
+
+        toggle = RackToggle.objects.get(rack=self.rack)
+        self.assertTrue(toggle.desc_units)
+        self.assertFalse(toggle.undone)
+        self.assertEqual(toggle.user, self.user)
+        self.assertEqual(
+            sorted((pk, float(before), float(after)) for pk, before, after in toggle.device_positions),
+            sorted([(self.device_low.pk, 1.0, 11.0), (self.device_high.pk, 3.0, 9.0)]),
+        )
+        self.assertEqual(
+            toggle.reservation_units,
+            [[self.reservation.pk, [11], [2]], [self.fixture.reservations[1].pk, [12], [1]]],
+        )
+
+    def test_undo_restores_snapshot(self):
+        self.assertHttpStatus(self._toggle(), 302)
+        toggle = RackToggle.objects.get(rack=self.rack)
+
+        response = self._undo(toggle)
+        self.assertHttpStatus(response, 302)
+
+        self._assert_original_layout()
+        toggle.refresh_from_db()
+        self.assertTrue(toggle.undone)
+
+    def test_undo_records_changelog_entries(self):
+        self.assertHttpStatus(self._toggle(), 302)
+        toggle = RackToggle.objects.get(rack=self.rack)
+        ObjectChange.objects.all().delete()
+
+        self.assertHttpStatus(self._undo(toggle), 302)
+
+        device_change = ObjectChange.objects.get(
+            changed_object_id=self.device_low.pk, prechange_data__has_key="position"
+        )
+        self.assertEqual(float(device_change.prechange_data["position"]), 11.0)
+        self.assertEqual(float(device_change.postchange_data["position"]), 1.0)
+        reservation_change = ObjectChange.objects.get(
+            changed_object_id=self.reservation.pk, prechange_data__has_key="units"
+        )
+        self.assertEqual(reservation_change.postchange_data["units"], [11])
+
+    def test_undo_twice_is_rejected(self):
+        self.assertHttpStatus(self._toggle(), 302)
+        toggle = RackToggle.objects.get(rack=self.rack)
+        self.assertHttpStatus(self._undo(toggle), 302)
+
+        response = self._undo(toggle, follow=True)
+        self.assertHttpStatus(response, 200)
+        messages = [m.message for m in get_messages(response.wsgi_request)]
+        self.assertTrue(any("already been undone" in m for m in messages))
+        self._assert_original_layout()
+
+    def test_undo_rejected_when_device_moved_after_toggle(self):
+        self.assertHttpStatus(self._toggle(), 302)
+        toggle = RackToggle.objects.get(rack=self.rack)
+        Device.objects.filter(pk=self.device_high.pk).update(position=5)
+
+        response = self._undo(toggle, follow=True)
+        self.assertHttpStatus(response, 200)
+        messages = [m.message for m in get_messages(response.wsgi_request)]
+        self.assertTrue(any("Cannot undo" in m for m in messages))
+
+        self.rack.refresh_from_db()
+        self.device_low.refresh_from_db()
+        self.device_high.refresh_from_db()
+        self.assertTrue(self.rack.desc_units)
+        self.assertEqual(self.device_low.position, 11)
+        self.assertEqual(self.device_high.position, 5)
+
+    def test_undo_rejected_when_device_moved_to_another_rack(self):
+        self.assertHttpStatus(self._toggle(), 302)
+        toggle = RackToggle.objects.get(rack=self.rack)
+        other_rack = create_rack("Rack-Undo-Moved", site=self.site, u_height=12).rack
+        # Same position as recorded by the toggle, but in another rack.
+        Device.objects.filter(pk=self.device_high.pk).update(rack=other_rack)
+
+        response = self._undo(toggle, follow=True)
+        self.assertHttpStatus(response, 200)
+        messages = [m.message for m in get_messages(response.wsgi_request)]
+        self.assertTrue(any("Cannot undo" in m for m in messages))
+
+        self.rack.refresh_from_db()
+        self.device_low.refresh_from_db()
+        self.device_high.refresh_from_db()
+        self.assertTrue(self.rack.desc_units)
+        self.assertEqual(self.device_low.position, 11)
+        self.assertEqual(self.device_high.rack, other_rack)
+        self.assertEqual(self.device_high.position, 9)
+
+    def test_undo_rejected_when_device_mounted_after_toggle(self):
+        self.assertHttpStatus(self._toggle(), 302)
+        toggle = RackToggle.objects.get(rack=self.rack)
+        Device.objects.create(
+            name="late-device",
+            device_type=self.device_low.device_type,
+            role=self.device_low.role,
+            site=self.site,
+            rack=self.rack,
+            position=6,
+            face=DeviceFaceChoices.FACE_FRONT,
+        )
+
+        response = self._undo(toggle, follow=True)
+        self.assertHttpStatus(response, 200)
+        self.rack.refresh_from_db()
+        self.assertTrue(self.rack.desc_units)
+
+    def test_undo_requires_device_permission(self):
+        self.assertHttpStatus(self._toggle(), 302)
+        toggle = RackToggle.objects.get(rack=self.rack)
+        self.remove_permissions("dcim.change_device")
+
+        self.assertHttpStatus(self._undo(toggle), 403)
+        self.rack.refresh_from_db()
+        self.assertTrue(self.rack.desc_units)
+
+    def test_stacked_toggles_undo_in_order(self):
+        self.assertHttpStatus(self._toggle(), 302)
+        self.assertHttpStatus(self._toggle(), 302)
+        first, second = RackToggle.objects.filter(rack=self.rack).order_by("pk")
+
+        response = self._undo(first, follow=True)
+        messages = [m.message for m in get_messages(response.wsgi_request)]
+        self.assertTrue(any("undo the later toggle first" in m for m in messages))
+
+        self.assertHttpStatus(self._undo(second), 302)
+        self.assertHttpStatus(self._undo(first), 302)
+        self._assert_original_layout()
+
+
+class RackToggleUndoAPITestCase(RackToggleUndoTestMixin, PluginSharedAPITestCase):
+    user_permissions = [*TOGGLE_PERMISSIONS, "netbox_rack_inverter.view_racktoggle"]
+
+    def test_list_toggles(self):
+        self.assertHttpStatus(self._toggle(), 302)
+
+        response = self.client.get(reverse("plugins-api:netbox_rack_inverter-api:racktoggle-list"))
+        self.assertHttpStatus(response, 200)
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(response.data["results"][0]["rack"]["id"], self.rack.pk)
+
+    def test_undo_single_toggle(self):
+        self.assertHttpStatus(self._toggle(), 302)
+        toggle = RackToggle.objects.get(rack=self.rack)
+
+        url = reverse("plugins-api:netbox_rack_inverter-api:racktoggle_undo", kwargs={"pk": toggle.pk})
+        response = self.client.post(url, format="json")
+        self.assertHttpStatus(response, 200)
+        self.assertTrue(response.data["undone"])
+        self._assert_original_layout()
+
+    def test_undo_conflict_returns_409(self):
+        self.assertHttpStatus(self._toggle(), 302)
+        toggle = RackToggle.objects.get(rack=self.rack)
+        Device.objects.filter(pk=self.device_low.pk).update(position=5)
+
+        url = reverse("plugins-api:netbox_rack_inverter-api:racktoggle_undo", kwargs={"pk": toggle.pk})
+        response = self.client.post(url, format="json")
+        self.assertHttpStatus(response, 409)
+
+    def test_bulk_undo_is_atomic(self):
+        other = create_rack("Rack-Undo-Other", u_height=12, devices=1)
+        other_rack, other_device = other.rack, other.devices[0]
+
+        self.assertHttpStatus(self._toggle(), 302)
+        rack, self.rack = self.rack, other_rack
+        self.assertHttpStatus(self._toggle(), 302)
+        self.rack = rack
+        toggles = list(RackToggle.objects.order_by("pk"))
+
+        # Drift on the second rack must roll back the undo of the first.
+        Device.objects.filter(pk=other_device.pk).update(position=7)
+        url = reverse("plugins-api:netbox_rack_inverter-api:racktoggle_bulk_undo")
+        response = self.client.post(url, [{"id": toggle.pk} for toggle in toggles], format="json")
+        self.assertHttpStatus(response, 409)
+        self.rack.refresh_from_db()
+        self.assertTrue(self.rack.desc_units)
+
+        Device.objects.filter(pk=other_device.pk).update(position=12)
+        response = self.client.post(url, [{"id": toggle.pk} for toggle in toggles], format="json")
+        self.assertHttpStatus(response, 200)
+        self.assertEqual(len(response.data), 2)
+        self._assert_original_layout()
+        other_device.refresh_from_db()
+        self.assertEqual(other_device.position, 1)
@@ -0,0 +1,134 @@
+"""
+Undo of recorded rack toggles.
+"""
+
+import uuid
+from decimal import Decimal
+
+from dcim.models import Device, Rack, RackReservation
+from django.contrib.postgres.fields import ArrayField
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.db.models import DecimalField, PositiveSmallIntegerField
+
+from . import eligibility, metrics
+from .changelog import conditional_update, record_field_changes
+from .exceptions import RackLayoutConflict
+from .locking import lock_rack
+from .models import RackToggle
+from .remap import format_unit
+
+__all__ = (
+    "get_undoable_toggle",
+    "undo_rack_toggle",
+)
+
+
+def get_undoable_toggle(rack):
+    """
+    Return the most recent toggle of `rack` that can still be undone, if any.
+    """
+    toggle = RackToggle.objects.filter(rack=rack, undone=False).order_by("-pk").first()
+    if toggle is None or toggle.desc_units != rack.desc_units:
+        return None
+    return toggle
+
+
+def undo_rack_toggle(toggle, *, user, request_id=None):
+    """
+    Restore the positions and reservation units recorded by `toggle`.
+
+    Values are written back with set-based updates rather than by remapping
+    each object again. The undo is refused if any recorded object has changed
+    since the toggle or if objects were added to the rack afterwards.
+    """
+    request_id = request_id or uuid.uuid4()
+
+    with transaction.atomic():
+        lock_rack(toggle.rack_id)
+        with metrics.phase("lock"):
+            rack = Rack.objects.select_for_update().get(pk=toggle.rack_id)
+            toggle = RackToggle.objects.select_for_update().get(pk=toggle.pk)
+
+        if toggle.undone:
+            raise RackLayoutConflict("This toggle has already been undone.")
+        if RackToggle.objects.filter(rack=rack, undone=False, pk__gt=toggle.pk).exists():
+            raise RackLayoutConflict("The rack has been toggled again since; undo the later toggle first.")
+        if rack.desc_units != toggle.desc_units:
+            raise RackLayoutConflict("The rack unit order has changed since this toggle.")
+
+        device_rows = [(pk, Decimal(str(after)), Decimal(str(before))) for pk, before, after in toggle.device_positions]
+        reservation_rows = [(pk, after, before) for pk, before, after in toggle.reservation_units]
+        device_pks = [pk for pk, _, _ in device_rows]
+        reservation_pks = [pk for pk, _, _ in reservation_rows]
+
+        with metrics.phase("permissions"):
+            if not user.has_perm("dcim.change_rack", rack):
+                raise PermissionDenied("You do not have permission to modify this rack.")
+            if Device.objects.restrict(user, "change").filter(pk__in=device_pks).count() != len(device_pks):
+                raise PermissionDenied("You do not have permission to modify one or more mounted devices.")
+            if RackReservation.objects.restrict(user, "change").filter(pk__in=reservation_pks).count() != len(
+                reservation_pks
+            ):
+                raise PermissionDenied("You do not have permission to modify one or more rack reservations.")
+
+        if Device.objects.filter(rack=rack, position__isnull=False).exclude(pk__in=device_pks).exists():
+            raise RackLayoutConflict("Devices have been mounted in the rack since this toggle.")
+        if RackReservation.objects.filter(rack=rack).exclude(pk__in=reservation_pks).exists():
+            raise RackLayoutConflict("Reservations have been added to the rack since this toggle.")
+
+        with metrics.phase("write"):
+            if device_rows:
+                conditional_update(
+                    Device,
+                    "position",
+                    device_rows,
+                    output_field=DecimalField(max_digits=4, decimal_places=1),
+                    rack_id=rack.pk,
+                    clear_first=True,
+                )
+                record_field_changes(
+                    Device,
+                    [(pk, format_unit(current), format_unit(restored)) for pk, current, restored in device_rows],
+                    field="position",
+                    user=user,
+                    request_id=request_id,
+                    object_reprs={
+                        pk: name
+                        for pk, name in Device.objects.filter(pk__in=device_pks).values_list("pk", "name")
+                        if name
+                    },
+                )
+
+            if reservation_rows:
+                conditional_update(
+                    RackReservation,
+                    "units",
+                    reservation_rows,
+                    output_field=ArrayField(base_field=PositiveSmallIntegerField()),
+                    rack_id=rack.pk,
+                )
+                record_field_changes(
+                    RackReservation,
+                    reservation_rows,
+                    field="units",
+                    user=user,
+                    request_id=request_id,
+                    object_reprs=dict.fromkeys(reservation_pks, f"Reservation for rack {rack}"),
+                )
+
+            rack.snapshot()
+            rack.desc_units = not toggle.desc_units
+            rack.save(update_fields=["desc_units"])
+
+        toggle.undone = True
+        toggle.save(update_fields=["undone"])
+
+        # Moved objects, as counted by the toggles.
+        metrics.record_rows("device", sum(current != restored for _, current, restored in device_rows))
+        metrics.record_rows("reservation", sum(current != restored for _, current, restored in reservation_rows))
+
+        # Positions were restored with set-based writes, which bypass signals.
+        eligibility.schedule_refresh(rack.pk)
+
+    return toggle
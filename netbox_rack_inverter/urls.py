@@ -15,6 +15,16 @@ from . import views
 app_name = "netbox_rack_inverter"
 
 urlpatterns = (
+    path(
+        "racks/toggle-eligibility/",
+        views.RackToggleEligibilityListView.as_view(),
+        name="rack_toggle_eligibility",
+    ),
+    path(
+        "racks/toggle-plan/",
+        views.RackTogglePlanExportView.as_view(),
+        name="rack_toggle_plan_export",
+    ),
     path(
         "racks/<int:pk>/toggle-units-order/",
         views.RackToggleUnitsOrderView.as_view(),
@@ -25,4 +35,39 @@ urlpatterns = (
         views.RackToggleUnitsOrderView.as_view(),
         name="rack_convert_to_descending_units",
     ),
+    path(
+        "racks/<int:pk>/toggle-button/",
+        views.RackToggleButtonView.as_view(),
+        name="rack_toggle_button",
+    ),
+    path(
+        "rack-toggles/",
+        views.RackToggleListView.as_view(),
+        name="racktoggle_list",
+    ),
+    path(
+        "rack-toggles/<int:pk>/",
+        views.RackToggleView.as_view(),
+        name="racktoggle",
+    ),
+    path(
+        "rack-toggles/<int:pk>/undo/",
+        views.RackToggleUndoView.as_view(),
+        name="racktoggle_undo",
+    ),
+    path(
+        "metrics/",
+        views.MetricsView.as_view(),
+        name="metrics",
+    ),
+    path(
+        "profiles/",
+        views.ProfileListView.as_view(),
+        name="profile_list",
+    ),
+    path(
+        "profiles/<str:name>/",
+        views.ProfileDownloadView.as_view(),
+        name="profile_download",
+    ),
 )
@@ -0,0 +1,583 @@
+"""
+Rack unit order operations shared by the UI and REST API views.
+"""
+
+import hashlib
+import time
+import uuid
+
+from dcim.models import Device, Rack, RackReservation
+from django.contrib.postgres.fields import ArrayField
+from django.core.exceptions import PermissionDenied
+from django.db import IntegrityError, transaction
+from django.db.models import DecimalField, PositiveSmallIntegerField
+from django.utils import timezone
+from netbox.plugins import get_plugin_config
+
+from . import caching, eligibility, metrics
+from .changelog import conditional_update, record_field_changes, write_changed_fields, write_snapshotted_objects
+from .exceptions import RackBusy, RackLayoutConflict, RackUnitRangeError
+from .locking import lock_rack
+from .models import RackToggle
+from .remap import format_unit, get_remap_table
+
+__all__ = (
+    "RackBusy",
+    "RackLayoutConflict",
+    "RackUnitRangeError",
+    "apply_planned_toggle",
+    "get_rack_layout_fingerprint",
+    "plan_rack_toggle",
+    "read_rack_layout",
+    "read_rack_layouts",
+    "toggle_rack_units_order",
+    "toggle_rack_units_order_optimistic",
+)
+
+
+def plan_rack_toggle(*, starting_unit, rack_u_height, devices, reservations):
+    """
+    Compute the positions and reservation units for a rack toggle.
+
+    `devices` is an iterable of (pk, position, height) and `reservations` an
+    iterable of (pk, units). Returns (device_positions, reservation_units) as
+    lists of [pk, before, after], the format stored on RackToggle.
+
+    Raises RackUnitRangeError if any object lies outside the rack's units.
+    """
+    device_positions = []
+    reservation_units = []
+    invalid = False
+    # Racks in a bulk run share a few geometries, so the remap is a lookup
+    # in a cached per-geometry table; None marks an object outside the rack.
+    tables = {}
+
+    for pk, position, height in devices:
+        device_height = max(height or 1, 1)
+        table = tables.get(device_height)
+        if table is None:
+            table = tables[device_height] = get_remap_table(starting_unit, rack_u_height, device_height)
+        after = table.remap(position)
+        if after is None:
+            invalid = True
+            continue
+        device_positions.append([pk, position, after])
+
+    unit_table = get_remap_table(starting_unit, rack_u_height, 1)
+    for pk, units in reservations:
+        units = list(units or [])
+        after = [unit_table.remap(unit) for unit in units]
+        if None in after:
+            invalid = True
+            continue
+        reservation_units.append([pk, units, sorted(after)])
+
+    if invalid:
+        raise RackUnitRangeError()
+
+    return device_positions, reservation_units
+
+
+def _with_heights(devices):
+    # (pk, position, device type pk) -> (pk, position, height)
+    heights = caching.get_device_type_heights({device_type_pk for *_, device_type_pk in devices})
+    return [(*device, heights[device_type_pk]) for *device, device_type_pk in devices]
+
+
+def read_rack_layout(rack_pk):
+    """
+    Read the parts of a rack's layout that a toggle depends on, without
+    locking anything. Returns (rack values, devices, reservations) where
+    devices are (pk, position, height) and reservations are (pk, units).
+    Heights come from the device type height cache.
+    """
+    rack = Rack.objects.values("pk", "desc_units", "starting_unit", "u_height").get(pk=rack_pk)
+    devices = _with_heights(
+        Device.objects.filter(rack_id=rack_pk, position__isnull=False)
+        .order_by("pk")
+        .values_list("pk", "position", "device_type_id")
+    )
+    reservations = list(RackReservation.objects.filter(rack_id=rack_pk).order_by("pk").values_list("pk", "units"))
+    return rack, devices, reservations
+
+
+def read_rack_layouts(racks):
+    """
+    Batched read_rack_layout() for every rack in the `racks` queryset, in a
+    fixed number of queries. Returns {rack pk: (rack values, devices,
+    reservations)}; rack values also include the rack name.
+
+    Devices and reservations are read from the same database as `racks`;
+    heights come from the device type height cache.
+    """
+    layouts = {
+        rack["pk"]: (rack, [], [])
+        for rack in racks.order_by("pk").values("pk", "name", "desc_units", "starting_unit", "u_height")
+    }
+    if not layouts:
+        return layouts
+
+    devices = _with_heights(
+        Device.objects.using(racks.db)
+        .filter(rack_id__in=list(layouts), position__isnull=False)
+        .order_by("pk")
+        .values_list("rack_id", "pk", "position", "device_type_id")
+    )
+    for rack_pk, *device in devices:
+        layouts[rack_pk][1].append(tuple(device))
+
+    reservations = (
+        RackReservation.objects.using(racks.db)
+        .filter(rack_id__in=list(layouts))
+        .order_by("pk")
+        .values_list("rack_id", "pk", "units")
+    )
+    for rack_pk, *reservation in reservations:
+        layouts[rack_pk][2].append(tuple(reservation))
+
+    return layouts
+
+
+def get_rack_layout_fingerprint(*, desc_units, starting_unit, u_height, devices, reservations):
+    """
+    Return a digest identifying a rack layout as read by read_rack_layout().
+    Any change to the rack geometry, mounted positions, device heights or
+    reservation units yields a different fingerprint.
+    """
+    layout = (
+        bool(desc_units),
+        starting_unit or 1,
+        u_height,
+        sorted((pk, format_unit(position), format_unit(height)) for pk, position, height in devices),
+        sorted((pk, sorted(units or [])) for pk, units in reservations),
+    )
+    return hashlib.sha256(repr(layout).encode()).hexdigest()
+
+
+def _get_concurrency_mode():
+    return get_plugin_config("netbox_rack_inverter", "concurrency_mode")
+
+
+def _get_changelog_snapshots():
+    return get_plugin_config("netbox_rack_inverter", "changelog_snapshots")
+
+
+def toggle_rack_units_order(
+    rack,
+    *,
+    user,
+    desc_units=None,
+    idempotency_key="",
+    request_id=None,
+    optimistic=None,
+):
+    """
+    Switch `rack` to the opposite unit order while preserving the physical
+    placement of its mounted devices and reservations.
+
+    If `desc_units` is given and the rack already uses that unit order, nothing
+    is locked or written. If `idempotency_key` matches an earlier toggle of the
+    rack, that toggle is returned instead of flipping the rack again.
+
+    By default the rack and every affected row are locked for the duration of
+    the toggle. With `optimistic` (or the `concurrency_mode` setting set to
+    "optimistic") the layout is read without locks and applied with
+    conditional updates instead; see toggle_rack_units_order_optimistic().
+
+    Returns a (toggle, created) tuple; `toggle` is None for a no-op.
+    """
+    started = time.perf_counter()
+    with metrics.phase("permissions"):
+        if not user.has_perm("dcim.view_rack", rack):
+            raise PermissionDenied("You do not have permission to view this rack.")
+    if desc_units is not None and rack.desc_units == desc_units:
+        return None, False
+    if idempotency_key:
+        if toggle := RackToggle.objects.filter(rack=rack, idempotency_key=idempotency_key).first():
+            return toggle, False
+
+    with metrics.phase("permissions"):
+        if not user.has_perm("dcim.change_rack", rack):
+            raise PermissionDenied("You do not have permission to modify this rack.")
+        if not user.has_perm("dcim.change_device"):
+            raise PermissionDenied("You do not have permission to modify devices.")
+        if not user.has_perm("dcim.change_rackreservation"):
+            raise PermissionDenied("You do not have permission to modify rack reservations.")
+
+    if optimistic is None:
+        optimistic = _get_concurrency_mode() == "optimistic"
+    if optimistic:
+        return toggle_rack_units_order_optimistic(
+            rack,
+            user=user,
+            desc_units=desc_units,
+            idempotency_key=idempotency_key,
+            request_id=request_id,
+        )
+
+    with transaction.atomic():
+        # Lock the rack and all affected rows to prevent concurrent toggles
+        # from producing inconsistent position calculations.
+        lock_rack(rack.pk)
+        with metrics.phase("lock"):
+            rack = Rack.objects.select_for_update().get(pk=rack.pk)
+
+        # Re-check under the lock: a concurrent retry of the same request may
+        # have completed while this one was waiting.
+        if desc_units is not None and rack.desc_units == desc_units:
+            return None, False
+        if idempotency_key:
+            if toggle := RackToggle.objects.filter(rack=rack, idempotency_key=idempotency_key).first():
+                return toggle, False
+
+        target_desc_units = not rack.desc_units
+
+        # Validation and planning only need positions, heights and units, so
+        # rows are locked and read narrow; full instances (custom field data,
+        # comments, ...) are loaded below only for objects that move.
+        with metrics.phase("lock"):
+            device_rows = list(
+                Device.objects.filter(rack=rack, position__isnull=False)
+                .order_by("pk")
+                .select_for_update()
+                .values_list("pk", "position", "device_type_id")
+            )
+            reservation_rows = list(
+                RackReservation.objects.filter(rack=rack).order_by("pk").select_for_update().values_list("pk", "units")
+            )
+
+        with metrics.phase("permissions"):
+            device_pks = [pk for pk, _, _ in device_rows]
+            if Device.objects.restrict(user, "change").filter(pk__in=device_pks).count() != len(device_pks):
+                raise PermissionDenied("You do not have permission to modify one or more mounted devices.")
+            reservation_pks = [pk for pk, _ in reservation_rows]
+            if RackReservation.objects.restrict(user, "change").filter(pk__in=reservation_pks).count() != len(
+                reservation_pks
+            ):
+                raise PermissionDenied("You do not have permission to modify one or more rack reservations.")
+
+        with metrics.phase("plan"):
+            heights = caching.get_device_type_heights({device_type_pk for _, _, device_type_pk in device_rows})
+            device_positions, reservation_units = plan_rack_toggle(
+                starting_unit=rack.starting_unit or 1,
+                rack_u_height=rack.u_height,
+                devices=[(pk, position, heights[device_type_pk]) for pk, position, device_type_pk in device_rows],
+                reservations=reservation_rows,
+            )
+        # Objects that keep their position are neither loaded nor written.
+        device_changes = [(pk, before, after) for pk, before, after in device_positions if after != before]
+        reservation_changes = [(pk, before, after) for pk, before, after in reservation_units if after != before]
+        if _get_changelog_snapshots() == "fields":
+            write_changed_fields(
+                rack, device_changes, reservation_changes, user=user, request_id=request_id or uuid.uuid4()
+            )
+        else:
+            write_snapshotted_objects(device_changes, reservation_changes)
+
+        with metrics.phase("changelog"):
+            rack.snapshot()
+        with metrics.phase("write"):
+            rack.desc_units = target_desc_units
+            rack.save(update_fields=["desc_units"])
+
+        # Keep a compact record of the rewritten values so the toggle can be
+        # undone without remapping every object again.
+        with metrics.phase("record"):
+            toggle = RackToggle.objects.create(
+                rack=rack,
+                user=user,
+                desc_units=target_desc_units,
+                idempotency_key=idempotency_key or "",
+                device_positions=device_positions,
+                reservation_units=reservation_units,
+                duration=time.perf_counter() - started,
+            )
+
+        metrics.record_rows("device", len(device_changes))
+        metrics.record_rows("reservation", len(reservation_changes))
+
+    return toggle, True
+
+
+def toggle_rack_units_order_optimistic(rack, *, user, desc_units=None, idempotency_key="", request_id=None):
+    """
+    Toggle a rack without holding row locks while the plan is computed.
+
+    The layout is read and planned without locks, then applied in a short
+    transaction using conditional updates that only match rows still holding
+    the values that were read. The resulting layout is re-read and compared
+    against the expected fingerprint before committing. On conflict the whole
+    attempt is rolled back and retried, up to the `optimistic_retries`
+    setting, after which RackLayoutConflict is raised.
+
+    Rack-level permission checks are the caller's responsibility; see
+    toggle_rack_units_order().
+    """
+    started = time.perf_counter()
+    request_id = request_id or uuid.uuid4()
+    retries = get_plugin_config("netbox_rack_inverter", "optimistic_retries")
+
+    for attempt in range(retries + 1):
+        try:
+            return _apply_optimistic_toggle(
+                rack.pk,
+                user=user,
+                desc_units=desc_units,
+                idempotency_key=idempotency_key,
+                request_id=request_id,
+                started=started,
+            )
+        except RackBusy:
+            # lock_rack() already waited as long as configured.
+            raise
+        except RackLayoutConflict:
+            if attempt == retries:
+                raise
+        except IntegrityError:
+            # A concurrent request with the same idempotency key won the race.
+            if idempotency_key:
+                if toggle := RackToggle.objects.filter(rack=rack, idempotency_key=idempotency_key).first():
+                    return toggle, False
+            raise
+
+
+def _apply_optimistic_toggle(rack_pk, *, user, desc_units, idempotency_key, request_id, started):
+    with metrics.phase("read"):
+        rack_values, devices, reservations = read_rack_layout(rack_pk)
+    if desc_units is not None and rack_values["desc_units"] == desc_units:
+        return None, False
+
+    with metrics.phase("plan"):
+        device_positions, reservation_units = plan_rack_toggle(
+            starting_unit=rack_values["starting_unit"] or 1,
+            rack_u_height=rack_values["u_height"],
+            devices=devices,
+            reservations=reservations,
+        )
+    return _write_planned_toggle(
+        rack_pk,
+        rack_values,
+        device_positions=device_positions,
+        reservation_units=reservation_units,
+        heights={pk: height for pk, _, height in devices},
+        user=user,
+        idempotency_key=idempotency_key,
+        request_id=request_id,
+        started=started,
+    )
+
+
+def _normalize_plan(device_positions, reservation_units):
+    return (
+        sorted((pk, format_unit(before), format_unit(after)) for pk, before, after in device_positions),
+        sorted((pk, sorted(before), sorted(after)) for pk, before, after in reservation_units),
+    )
+
+
+def apply_planned_toggle(
+    rack_pk,
+    *,
+    fingerprint,
+    device_positions,
+    reservation_units,
+    user,
+    idempotency_key="",
+    request_id=None,
+):
+    """
+    Apply a toggle planned ahead of time, such as an entry of a plan file
+    written by `plans.build_plan()`.
+
+    The rack layout must still match `fingerprint`, the layout fingerprint
+    taken when the plan was made, and the planned positions must match the
+    remap of that layout. Otherwise RackLayoutConflict is raised and nothing
+    is written. The writes themselves are the same set-based conditional
+    updates as an optimistic toggle.
+
+    Returns a (toggle, created) tuple like toggle_rack_units_order().
+    """
+    started = time.perf_counter()
+    request_id = request_id or uuid.uuid4()
+    rack = Rack.objects.get(pk=rack_pk)
+
+    with metrics.phase("permissions"):
+        if not user.has_perm("dcim.view_rack", rack):
+            raise PermissionDenied("You do not have permission to view this rack.")
+        if not user.has_perm("dcim.change_rack", rack):
+            raise PermissionDenied("You do not have permission to modify this rack.")
+        if not user.has_perm("dcim.change_device"):
+            raise PermissionDenied("You do not have permission to modify devices.")
+        if not user.has_perm("dcim.change_rackreservation"):
+            raise PermissionDenied("You do not have permission to modify rack reservations.")
+    if idempotency_key:
+        if toggle := RackToggle.objects.filter(rack=rack, idempotency_key=idempotency_key).first():
+            return toggle, False
+
+    with metrics.phase("read"):
+        rack_values, devices, reservations = read_rack_layout(rack_pk)
+    if fingerprint != get_rack_layout_fingerprint(
+        desc_units=rack_values["desc_units"],
+        starting_unit=rack_values["starting_unit"],
+        u_height=rack_values["u_height"],
+        devices=devices,
+        reservations=reservations,
+    ):
+        raise RackLayoutConflict("The rack layout changed since the plan was made.")
+
+    # Re-planning costs no queries and guards against edited plan files.
+    with metrics.phase("plan"):
+        planned = plan_rack_toggle(
+            starting_unit=rack_values["starting_unit"] or 1,
+            rack_u_height=rack_values["u_height"],
+            devices=devices,
+            reservations=reservations,
+        )
+    if _normalize_plan(*planned) != _normalize_plan(device_positions, reservation_units):
+        raise RackLayoutConflict("The planned positions do not match the current rack layout.")
+
+    try:
+        return _write_planned_toggle(
+            rack_pk,
+            rack_values,
+            device_positions=planned[0],
+            reservation_units=planned[1],
+            heights={pk: height for pk, _, height in devices},
+            user=user,
+            idempotency_key=idempotency_key,
+            request_id=request_id,
+            started=started,
+        )
+    except IntegrityError:
+        # A concurrent apply of the same plan won the race.
+        if idempotency_key:
+            if toggle := RackToggle.objects.filter(rack=rack, idempotency_key=idempotency_key).first():
+                return toggle, False
+        raise
+
+
+def _write_planned_toggle(
+    rack_pk,
+    rack_values,
+    *,
+    device_positions,
+    reservation_units,
+    heights,
+    user,
+    idempotency_key,
+    request_id,
+    started,
+):
+    starting_unit = rack_values["starting_unit"] or 1
+    target_desc_units = not rack_values["desc_units"]
+    device_pks = [pk for pk, _, _ in device_positions]
+    reservation_pks = [pk for pk, _, _ in reservation_units]
+
+    with metrics.phase("permissions"):
+        if Device.objects.restrict(user, "change").filter(pk__in=device_pks).count() != len(device_pks):
+            raise PermissionDenied("You do not have permission to modify one or more mounted devices.")
+        if RackReservation.objects.restrict(user, "change").filter(pk__in=reservation_pks).count() != len(
+            reservation_pks
+        ):
+            raise PermissionDenied("You do not have permission to modify one or more rack reservations.")
+
+    expected_fingerprint = get_rack_layout_fingerprint(
+        desc_units=target_desc_units,
+        starting_unit=starting_unit,
+        u_height=rack_values["u_height"],
+        devices=[(pk, after, heights[pk]) for pk, _, after in device_positions],
+        reservations=[(pk, after) for pk, _, after in reservation_units],
+    )
+
+    with transaction.atomic():
+        lock_rack(rack_pk)
+        with metrics.phase("write"):
+            if not Rack.objects.filter(pk=rack_pk, desc_units=rack_values["desc_units"]).update(
+                desc_units=target_desc_units,
+                last_updated=timezone.now(),
+            ):
+                raise RackLayoutConflict("The rack unit order changed while the toggle was being planned.")
+
+            if device_positions:
+                conditional_update(
+                    Device,
+                    "position",
+                    [(pk, before, after) for pk, before, after in device_positions],
+                    output_field=DecimalField(max_digits=4, decimal_places=1),
+                    rack_id=rack_pk,
+                    clear_first=True,
+                )
+            if reservation_units:
+                conditional_update(
+                    RackReservation,
+                    "units",
+                    reservation_units,
+                    output_field=ArrayField(base_field=PositiveSmallIntegerField()),
+                    rack_id=rack_pk,
+                )
+
+        # Catch anything the conditional updates cannot see, such as devices
+        # mounted or device type heights changed since the layout was read.
+        with metrics.phase("verify"):
+            rack_after, devices_after, reservations_after = read_rack_layout(rack_pk)
+            if expected_fingerprint != get_rack_layout_fingerprint(
+                desc_units=rack_after["desc_units"],
+                starting_unit=rack_after["starting_unit"],
+                u_height=rack_after["u_height"],
+                devices=devices_after,
+                reservations=reservations_after,
+            ):
+                raise RackLayoutConflict("The rack layout changed while the toggle was being planned.")
+
+        with metrics.phase("record"):
+            toggle = RackToggle.objects.create(
+                rack_id=rack_pk,
+                user=user,
+                desc_units=target_desc_units,
+                idempotency_key=idempotency_key or "",
+                device_positions=device_positions,
+                reservation_units=reservation_units,
+                duration=time.perf_counter() - started,
+            )
+
+        # Count moved objects, as the pessimistic path does; rows that keep
+        # their value are rewritten here only as part of the conditional check.
+        metrics.record_rows("device", sum(after != before for _, before, after in device_positions))
+        metrics.record_rows("reservation", sum(after != before for _, before, after in reservation_units))
+
+        # The set-based writes above bypass signals.
+        eligibility.schedule_refresh(rack_pk)
+
+        with metrics.phase("changelog"):
+            rack = toggle.rack
+            record_field_changes(
+                Rack,
+                [(rack_pk, rack_values["desc_units"], target_desc_units)],
+                field="desc_units",
+                user=user,
+                request_id=request_id,
+                object_reprs={rack_pk: str(rack)},
+            )
+            if device_positions:
+                record_field_changes(
+                    Device,
+                    [(pk, format_unit(before), format_unit(after)) for pk, before, after in device_positions],
+                    field="position",
+                    user=user,
+                    request_id=request_id,
+                    object_reprs={
+                        pk: name
+                        for pk, name in Device.objects.filter(pk__in=device_pks).values_list("pk", "name")
+                        if name
+                    },
+                )
+            if reservation_units:
+                record_field_changes(
+                    RackReservation,
+                    reservation_units,
+                    field="units",
+                    user=user,
+                    request_id=request_id,
+                    object_reprs=dict.fromkeys(reservation_pks, f"Reservation for rack {rack}"),
+                )
+
+    return toggle, True
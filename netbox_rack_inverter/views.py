@@ -8,174 +8,290 @@ For generic view classes, see:
 https://docs.netbox.dev/en/stable/development/views/
 """
 
-from dcim.models import Device, Rack, RackReservation
+from dcim.models import Rack
 from django.contrib import messages
-from django.core.exceptions import PermissionDenied
-from django.db import transaction
-from django.shortcuts import get_object_or_404, redirect
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
 from django.views import View
+from netbox.object_actions import BulkExport
+from netbox.views import generic
 
+from . import filtersets, forms, metrics, routing, tables
+from .eligibility import annotate_materialized_eligibility
+from .exceptions import RackLayoutConflict, RackUnitRangeError
+from .models import RackToggle, validate_idempotency_key
+from .remap import is_valid_unit_span_for_rack, remap_position_for_descending_units
 
-def remap_position_for_descending_units(
-    *,
-    position: int,
-    device_height: int,
-    rack_starting_unit: int,
-    rack_u_height: int,
-) -> int:
-    """
-    Convert an ascending rack position to its descending equivalent while
-    preserving physical placement within the rack.
-    """
-    top_unit = rack_starting_unit + rack_u_height - 1
-    return top_unit - (position - rack_starting_unit) - device_height + 1
+__all__ = (
+    "MetricsView",
+    "ProfileDownloadView",
+    "ProfileListView",
+    "RackToggleButtonView",
+    "RackToggleEligibilityListView",
+    "RackToggleListView",
+    "RackTogglePlanExportView",
+    "RackToggleUndoView",
+    "RackToggleUnitsOrderView",
+    "RackToggleView",
+    "is_valid_unit_span_for_rack",
+    "remap_position_for_descending_units",
+)
 
 
-def is_valid_unit_span_for_rack(
-    *,
-    position: int,
-    object_height: int,
-    rack_starting_unit: int,
-    rack_u_height: int,
-) -> bool:
+def parse_desc_units(value):
     """
-    Return True if an object's occupied unit span is fully inside the rack.
+    Parse an optional target unit order submitted with a toggle request.
+    Returns None when no target was given.
     """
-    if rack_u_height < 1 or object_height < 1:
+    if value in (None, ""):
+        return None
+    if isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value in ("true", "1", "yes", "on"):
+        return True
+    if value in ("false", "0", "no", "off"):
         return False
-
-    lowest_unit = rack_starting_unit
-    highest_unit = rack_starting_unit + rack_u_height - 1
-    object_low = position
-    object_high = position + object_height - 1
-    return lowest_unit <= object_low <= highest_unit and lowest_unit <= object_high <= highest_unit
+    raise ValueError(f"Invalid unit order target: {value}")
 
 
 class RackToggleUnitsOrderView(View):
     http_method_names = ["post"]
 
     def post(self, request, pk):
+        # The toggle machinery is only needed when a toggle is submitted.
+        from .utils import toggle_rack_units_order
+
         rack = get_object_or_404(Rack, pk=pk)
 
-        if not request.user.has_perm("dcim.view_rack", rack):
-            raise PermissionDenied("You do not have permission to view this rack.")
-        if not request.user.has_perm("dcim.change_rack", rack):
-            raise PermissionDenied("You do not have permission to modify this rack.")
-        if not request.user.has_perm("dcim.change_device"):
-            raise PermissionDenied("You do not have permission to modify devices.")
-        if not request.user.has_perm("dcim.change_rackreservation"):
-            raise PermissionDenied("You do not have permission to modify rack reservations.")
-
-        with transaction.atomic():
-            # Lock the rack and all affected rows to prevent concurrent toggles
-            # from producing inconsistent position calculations.
-            rack = Rack.objects.select_for_update().get(pk=pk)
-            starting_unit = rack.starting_unit or 1
-            rack_u_height = rack.u_height
-            target_desc_units = not rack.desc_units
-
-            devices = list(
-                Device.objects.filter(rack=rack, position__isnull=False)
-                .order_by("pk")
-                .select_for_update()
-                .select_related("device_type")
-            )
-            reservations = list(
-                RackReservation.objects.filter(rack=rack)
-                .order_by("pk")
-                .select_for_update()
-            )
-
-            if any(not request.user.has_perm("dcim.change_device", device) for device in devices):
-                raise PermissionDenied("You do not have permission to modify one or more mounted devices.")
-            if any(
-                not request.user.has_perm("dcim.change_rackreservation", reservation)
-                for reservation in reservations
-            ):
-                raise PermissionDenied("You do not have permission to modify one or more rack reservations.")
-
-            invalid_devices = []
-            for device in devices:
-                device_height = max(getattr(device.device_type, "u_height", 1) or 1, 1)
-                if not is_valid_unit_span_for_rack(
-                    position=device.position,
-                    object_height=device_height,
-                    rack_starting_unit=starting_unit,
-                    rack_u_height=rack_u_height,
-                ):
-                    invalid_devices.append(device)
-
-            invalid_reservation_units = []
-            for reservation in reservations:
-                for unit in (reservation.units or []):
-                    if not is_valid_unit_span_for_rack(
-                        position=unit,
-                        object_height=1,
-                        rack_starting_unit=starting_unit,
-                        rack_u_height=rack_u_height,
-                    ):
-                        invalid_reservation_units.append((reservation.pk, unit))
-
-            if invalid_devices or invalid_reservation_units:
-                messages.error(
-                    request,
-                    (
-                        "Cannot switch rack unit order because one or more mounted objects have "
-                        "positions outside the rack's unit range."
-                    ),
-                )
-                return redirect(rack.get_absolute_url())
-
-            remapped_device_positions = {}
-            for device in devices:
-                device_height = max(getattr(device.device_type, "u_height", 1) or 1, 1)
-                remapped_device_positions[device.id] = remap_position_for_descending_units(
-                    position=device.position,
-                    device_height=device_height,
-                    rack_starting_unit=starting_unit,
-                    rack_u_height=rack_u_height,
-                )
+        try:
+            desc_units = parse_desc_units(request.POST.get("desc_units"))
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+        idempotency_key = request.POST.get("idempotency_key") or request.headers.get("Idempotency-Key", "")
+        if idempotency_key:
+            try:
+                validate_idempotency_key(idempotency_key)
+            except ValidationError as e:
+                return HttpResponseBadRequest(" ".join(e.messages))
 
-            remapped_reservation_units = {}
-            for reservation in reservations:
-                remapped_units = sorted(
-                    remap_position_for_descending_units(
-                        position=unit,
-                        device_height=1,
-                        rack_starting_unit=starting_unit,
-                        rack_u_height=rack_u_height,
-                    )
-                    for unit in (reservation.units or [])
+        try:
+            with metrics.track("toggle", source="ui", rack=rack.pk) as operation:
+                toggle, created = toggle_rack_units_order(
+                    rack,
+                    user=request.user,
+                    desc_units=desc_units,
+                    idempotency_key=idempotency_key,
+                    request_id=getattr(request, "id", None),
                 )
-                remapped_reservation_units[reservation.id] = remapped_units
+                operation.outcome = "toggled" if created else "noop"
+        except RackUnitRangeError as e:
+            messages.error(request, str(e))
+            return redirect(rack.get_absolute_url())
+        except RackLayoutConflict as e:
+            messages.error(request, f"Cannot switch the unit order of {rack}: {e} Please try again.")
+            return redirect(rack.get_absolute_url())
+
+        if not created:
+            current_mode_label = "descending" if (toggle.desc_units if toggle else rack.desc_units) else "ascending"
+            messages.info(request, f"{rack} already uses {current_mode_label} units; no changes were made.")
+            return redirect(rack.get_absolute_url())
+
+        target_mode_label = "descending" if toggle.desc_units else "ascending"
+        messages.success(
+            request,
+            (
+                f"Switched {rack} to {target_mode_label} units while preserving layout for "
+                f"{len(toggle.device_positions)} devices and {len(toggle.reservation_units)} reservations."
+            ),
+        )
+        return redirect(rack.get_absolute_url())
+
+
+class ReadDatabaseMixin:
+    """
+    Serve a read-only generic view from the `read_database`, if configured.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        self.queryset = routing.for_read(self.queryset)
+        return super().dispatch(request, *args, **kwargs)
+
+
+class RackToggleEligibilityListView(ReadDatabaseMixin, generic.ObjectListView):
+    """
+    List racks with whether each can be toggled, read from the RackEligibility
+    table.
+    """
+
+    queryset = annotate_materialized_eligibility(Rack.objects.select_related("site", "location"))
+    table = tables.RackToggleEligibilityTable
+    filterset = filtersets.RackToggleEligibilityFilterSet
+    filterset_form = forms.RackToggleEligibilityFilterForm
+    actions = ()
+
+
+class RackToggleListView(ReadDatabaseMixin, generic.ObjectListView):
+    """
+    The toggle history, newest first.
+    """
+
+    queryset = RackToggle.objects.select_related("rack", "rack__site", "user")
+    table = tables.RackToggleTable
+    filterset = filtersets.RackToggleFilterSet
+    filterset_form = forms.RackToggleFilterForm
+    actions = (BulkExport,)
+
+
+class RackToggleView(ReadDatabaseMixin, generic.ObjectView):
+    queryset = RackToggle.objects.select_related("rack", "rack__site", "user")
+
+    def get_extra_context(self, request, instance):
+        from .undo import get_undoable_toggle
+
+        undoable = get_undoable_toggle(instance.rack)
+        return {
+            "can_undo": undoable is not None and undoable.pk == instance.pk,
+        }
+
+
+class RackTogglePlanExportView(View):
+    """
+    Stream the toggle plan of every rack matching the rack filters in the
+    query string as CSV (default) or JSON lines (`?format=jsonl`).
+    """
+
+    http_method_names = ["get"]
+
+    def get(self, request):
+        # Imported on first use to keep worker boot and URLconf loading
+        # cheap; only this view needs it.
+        from . import export
 
-            if remapped_device_positions:
-                for device in devices:
-                    device.snapshot()
+        export_format = request.GET.get("format", "csv")
+        if export_format not in export.EXPORT_FORMATS:
+            return HttpResponseBadRequest(f"Invalid export format: {export_format}")
+        if not request.user.has_perm("dcim.view_rack"):
+            raise PermissionDenied("You do not have permission to view racks.")
 
-                for device in devices:
-                    device.position = None
-                Device.objects.bulk_update(devices, ["position"])
+        racks = filtersets.RackToggleEligibilityFilterSet(
+            request.GET, routing.for_read(Rack.objects.restrict(request.user, "view"))
+        ).qs
+        content_type, _ = export.EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(
+            export.stream_plan(export.iter_plan_rows(racks, user=request.user), export_format),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = f'attachment; filename="rack-toggle-plan.{export_format}"'
+        return response
+
+
+class RackToggleButtonView(View):
+    """
+    Render the rack toggle button fragment loaded lazily by the rack page.
+    """
+
+    http_method_names = ["get"]
 
-                for device in devices:
-                    device.position = remapped_device_positions[device.id]
-                    device.save(update_fields=["position"])
+    def get(self, request, pk):
+        from .template_content import RackConvertToDescendingUnitsButton
 
-            for reservation in reservations:
-                reservation.snapshot()
-                reservation.units = remapped_reservation_units[reservation.id]
-                reservation.save(update_fields=["units"])
+        rack = get_object_or_404(Rack.objects.restrict(request.user, "view"), pk=pk)
+        with metrics.track("button_fragment", rack=rack.pk):
+            return HttpResponse(RackConvertToDescendingUnitsButton.render_fragment(request, rack))
+
+
+class RackToggleUndoView(View):
+    http_method_names = ["post"]
+
+    def post(self, request, pk):
+        from .undo import undo_rack_toggle
 
-            rack.snapshot()
-            rack.desc_units = target_desc_units
-            rack.save(update_fields=["desc_units"])
+        toggle = get_object_or_404(RackToggle.objects.select_related("rack"), pk=pk)
+        rack = toggle.rack
 
-        target_mode_label = "descending" if target_desc_units else "ascending"
+        if not request.user.has_perm("dcim.view_rack", rack):
+            raise PermissionDenied("You do not have permission to view this rack.")
+
+        try:
+            with metrics.track("undo", source="ui", rack=rack.pk):
+                undo_rack_toggle(toggle, user=request.user, request_id=getattr(request, "id", None))
+        except RackLayoutConflict as e:
+            messages.error(request, f"Cannot undo the unit order switch of {rack}: {e}")
+            return redirect(rack.get_absolute_url())
+
+        target_mode_label = "ascending" if toggle.desc_units else "descending"
         messages.success(
             request,
             (
-                f"Switched {rack} to {target_mode_label} units while preserving layout for "
-                f"{len(devices)} devices and {len(reservations)} reservations."
+                f"Restored {rack} to {target_mode_label} units for {len(toggle.device_positions)} devices "
+                f"and {len(toggle.reservation_units)} reservations."
             ),
         )
         return redirect(rack.get_absolute_url())
+
+
+class SuperuserRequiredMixin:
+    permission_denied_message = "Only superusers can access this page."
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_superuser:
+            raise PermissionDenied(self.permission_denied_message)
+        return super().dispatch(request, *args, **kwargs)
+
+
+class MetricsView(SuperuserRequiredMixin, View):
+    """
+    Export the plugin's metrics in the Prometheus text format.
+
+    Only available when `PrometheusSink` is listed in `metrics_sinks`. The
+    metrics carry per-rack labels, so they are limited to superusers.
+    """
+
+    http_method_names = ["get"]
+    permission_denied_message = "Only superusers can read metrics."
+
+    def get(self, request):
+        if not any(isinstance(sink, metrics.PrometheusSink) for sink in metrics.get_sinks()):
+            raise Http404("Prometheus metrics are not enabled.")
+        return HttpResponse(metrics.PrometheusSink.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+class ProfileListView(SuperuserRequiredMixin, View):
+    """
+    List the sampled cProfile captures written by `profiling`.
+    """
+
+    http_method_names = ["get"]
+    permission_denied_message = "Only superusers can access profiles."
+
+    def get(self, request):
+        from . import profiling
+
+        return render(
+            request,
+            "netbox_rack_inverter/profile_list.html",
+            {
+                "profiles": profiling.list_profiles(),
+                "profile_dir": profiling.get_profile_dir(),
+            },
+        )
+
+
+class ProfileDownloadView(SuperuserRequiredMixin, View):
+    """
+    Download a stored profile as a `.pstats` file.
+    """
+
+    http_method_names = ["get"]
+    permission_denied_message = "Only superusers can access profiles."
+
+    def get(self, request, name):
+        from . import profiling
+
+        try:
+            path = profiling.get_profile_path(name)
+        except FileNotFoundError:
+            raise Http404("Profile not found.") from None
+        return FileResponse(open(path, "rb"), as_attachment=True, filename=name)